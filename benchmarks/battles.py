@@ -0,0 +1,69 @@
+""" Runs many simultaneous battles through the battle manager against the null logger and timer
+
+    python -m benchmarks.battles [battle count] [participants per battle]
+"""
+import sys
+import time
+import random
+import bot.api
+from benchmarks.common import data_path
+
+
+class FakeChannel():
+    def __init__(self, id):
+        self.id = id
+
+
+class FakeContext():
+    def __init__(self, id):
+        self.channel = FakeChannel(id)
+        self.author = None
+
+
+def main(count, size):
+    print(f"{count} simultaneous battles of {size} participants")
+    rng = random.Random(0)
+    with data_path(count * size):
+        api = bot.api.API()
+
+        start = time.perf_counter()
+        battles = []
+        for i in range(count):
+            ctx = FakeContext(i)
+            battle = api.battles.get(ctx)
+            battle.new(ctx)
+            for j in range(size):
+                battle.join(api.character.get(f'user{i * size + j}'))
+            battle.start()
+            battles.append(battle)
+        setup = time.perf_counter() - start
+        print(f"{'  setup':<48} {setup * 1000:>12.1f} ms")
+        print(f"{'  peak active battles':<48} {len(api.battles):>12}")
+
+        # Every living participant attacks a random living opponent until each battle is decided
+        start = time.perf_counter()
+        rounds = 0
+        while battles:
+            for battle in battles:
+                if not battle.is_round_wait:
+                    continue
+                alive = [x for x in battle.turn_order if x not in battle.death_order]
+                for name in alive:
+                    if not battle.is_round_wait:
+                        break
+                    target = rng.choice([x for x in alive if x != name])
+                    battle.submit_action(battle.participants[name], 'attack', target=battle.participants[target])
+                rounds += 1
+            battles = [x for x in battles if not x.is_stopped]
+        elapsed = time.perf_counter() - start
+        api.character.close()
+
+    print(f"{'  rounds':<48} {rounds:>12}")
+    print(f"{'  battles per second':<48} {count / elapsed:>12.0f}")
+    print(f"{'  rounds per second':<48} {rounds / elapsed:>12.0f}")
+    print(f"{'  battles left in the manager':<48} {len(api.battles):>12}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 4)
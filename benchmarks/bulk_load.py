@@ -0,0 +1,29 @@
+""" Compares serial and pooled eager loading of user files
+
+    python -m benchmarks.bulk_load [user count]
+"""
+import os
+import sys
+from bot.api.character import CharacterAPI
+from benchmarks.common import data_path, timed
+
+
+def main(count):
+    os.environ['STORAGE'] = 'file'
+    os.environ['LAZY_LOAD'] = 'true'
+    print(f"Eager load of {count} user files ({os.cpu_count()} cpus)")
+    with data_path(count):
+        api = CharacterAPI(None)
+        api.progress_interval = count * 2
+        configs = [(0, False)] + [(x, False) for x in (4, 8)] + [(x, True) for x in (2, 4, 8)]
+        for workers, processes in configs:
+            api.cache = type(api.cache)()
+            label = f"  {'serial' if not workers else ('processes' if processes else 'threads')} x{workers or 1}"
+            with timed(label):
+                api.load_all(workers, processes)
+            assert len(api.cache) == count
+        api.close()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
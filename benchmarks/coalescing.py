@@ -0,0 +1,97 @@
+""" Counts the discord messages battles send with log entries packed together, against one message an entry
+
+    Targets take one embed a send, like the pinned discord.py 1.6 does, so packing never applies and every entry
+    is it's own message. Only a discord.py whose send takes embeds= saves anything.
+
+    python -m benchmarks.coalescing [battle count] [participants per battle]
+"""
+import sys
+import asyncio
+import random
+import discord
+import bot.api
+from bot.components.logging import DiscordLogger, multi_embed
+from bot.components.sender import SendPipeline
+from benchmarks.common import data_path
+
+
+class FakeMessage():
+    edits = 0
+
+    async def edit(self, embed=None):
+        FakeMessage.edits += 1
+
+
+class FakeTarget():
+    """ Channel or user that counts the messages and embeds it's sent, with discord.py 1.6's send """
+    calls = 0
+    embeds = 0
+
+    def __init__(self, id):
+        self.id = id
+        self.name = f'target{id}'
+
+    async def send(self, content=None, *, embed=None):
+        FakeTarget.calls += 1
+        FakeTarget.embeds += 1
+        return FakeMessage()
+
+
+class FakeContext():
+    def __init__(self, id):
+        self.channel = FakeTarget(id)
+        self.author = FakeTarget(-id - 1)
+
+
+async def run(count, size):
+    rng = random.Random(0)
+    logger = DiscordLogger(SendPipeline(rate=1e9, route_rate=1e9, route_burst=10 ** 9))
+    api = bot.api.API(logger=logger)
+
+    # Each command flushes the log once it's done, like the discord hooks do
+    for i in range(count):
+        ctx = FakeContext(i)
+        battle = api.battles.get(ctx)
+        battle.new(ctx)
+        await logger.send_buffer()
+        for j in range(size):
+            battle.join(api.character.get(f'user{i * size + j}'))
+            await logger.send_buffer()
+        battle.start()
+        await logger.send_buffer()
+
+        while not battle.is_stopped:
+            alive = [x for x in battle.turn_order if battle.participants.is_alive(x)]
+            for name in alive:
+                if not battle.is_round_wait:
+                    break
+                target = rng.choice([x for x in alive if x != name])
+                battle.submit_action(battle.participants[name], 'attack', target=battle.participants[target])
+                await logger.send_buffer()
+
+    # Let the status messages publish how their battles ended
+    await asyncio.sleep(0.1)
+    api.character.close()
+    return logger
+
+
+def main(count, size):
+    print(f"{count} battles of {size} participants")
+    print(f"{'  discord.py':<48} {discord.__version__:>12}")
+    print(f"{'  packs embeds':<48} {'yes' if multi_embed(FakeTarget(0)) else 'no':>12}")
+    with data_path(count * size):
+        logger = asyncio.run(run(count, size))
+
+    assert FakeTarget.embeds == logger.entries + logger.live_sends
+    assert FakeMessage.edits == logger.live_edits
+    print(f"{'  log entries':<48} {logger.entries:>12}")
+    print(f"{'  messages sent':<48} {logger.messages:>12}")
+    print(f"{'  api calls saved per battle':<48} {(logger.entries - logger.messages) / count:>12.1f}")
+    print(f"{'  api calls saved':<48} {1 - logger.messages / logger.entries:>12.1%}")
+    print(f"{'  status messages sent':<48} {logger.live_sends:>12}")
+    print(f"{'  status message edits':<48} {logger.live_edits:>12}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 8)
@@ -0,0 +1,71 @@
+""" Compares round resolution throughput of the scalar and batch combat engines in one massive battle
+
+    python -m benchmarks.combat [participant count] [rounds]
+"""
+import sys
+import time
+import random
+import bot.api
+from bot.components import combat
+from benchmarks.common import data_path
+
+
+class FakeContext():
+    channel = None
+    author = None
+
+
+def run(count, rounds, threshold):
+    """ Run a battle where everyone attacks someone random, returning the actions resolved per second """
+    rng = random.Random(0)
+    api = bot.api.API()
+    api.character.progress_interval = count
+    battle = api.battle
+    battle.batch_threshold = threshold
+    battle.new(FakeContext())
+    for i in range(count):
+        battle.join(api.character.get(f'user{i}'))
+    battle.start()
+
+    # Only time resolving the actions, not the rest of the round bookkeeping
+    elapsed = 0.0
+    actions = 0
+    resolve = battle._resolve_round
+    def timed_resolve():
+        nonlocal elapsed
+        start = time.perf_counter()
+        resolve()
+        elapsed += time.perf_counter() - start
+    battle._resolve_round = timed_resolve
+
+    for _ in range(rounds):
+        if not battle.is_round_wait:
+            break
+        alive = [x for x in battle.turn_order if x not in battle.death_order]
+        for name in alive[:-1]:
+            battle.submit_action(battle.participants[name], 'attack', target=battle.participants[rng.choice(alive)])
+        battle.submit_action(battle.participants[alive[-1]], 'defend')
+        actions += len(alive)
+    battle.stop()
+    api.character.close()
+    return actions / elapsed
+
+
+def main(count, rounds):
+    print(f"{rounds} rounds of a {count} participant battle")
+    engines = [('scalar', 0)]
+    if combat.available():
+        engines.append(('batch', 1))
+    else:
+        print("  numpy isn't installed, only the scalar engine can run")
+
+    for label, threshold in engines:
+        with data_path(count):
+            rate = run(count, rounds, threshold)
+        label = f"  {label} actions resolved per second"
+        print(f"{label:<48} {rate:>12.0f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 5)
@@ -0,0 +1,67 @@
+""" Shared helpers for the benchmarks """
+import os
+import time
+import shutil
+import tempfile
+import contextlib
+from bot.components import users, stuff, storage
+
+WEAPONS = [
+    stuff.Sword(name="wood sword", desc="A wooden short sword used for training", power=5, value=50),
+    stuff.Axe(name="bronze axe", desc="A heavy bronze axe that swings wild", power=10, value=150),
+    stuff.Bow(name="short bow", desc="A short bow for hunting small game", power=7, value=100),
+]
+ARMOR = [
+    stuff.Armor(name="cloth", desc="Cloth robes that don't protect from much", toughness=5, value=25),
+    stuff.Armor(name="leather", desc="Hardened leather that turns a glancing blow", toughness=10, value=100),
+]
+
+
+def synthetic_user(i):
+    """ Creates a deterministic user with some gear and inventory """
+    user = users.User.create(f"user{i}")
+    user.level = 1 + i % 50
+    user.experience = i % 1000
+    user.points = i % 5
+    user.give(WEAPONS[i % len(WEAPONS)])
+    user.give(ARMOR[i % len(ARMOR)], 1 + i % 3)
+    user.give(WEAPONS[(i + 1) % len(WEAPONS)])
+    user.equip(WEAPONS[i % len(WEAPONS)])
+    user.earn(i % 977)
+    return user
+
+
+@contextlib.contextmanager
+def data_path(count=0, backend='file'):
+    """ Temporary DATA_PATH holding count synthetic users """
+    path = tempfile.mkdtemp(prefix='rpg_bench_')
+    old = os.environ.get('DATA_PATH')
+    os.environ['DATA_PATH'] = path
+    try:
+        store = storage.create(backend, path)
+        batch = []
+        for i in range(count):
+            batch.append(synthetic_user(i).to_dict())
+            if len(batch) >= 1000:
+                store.write_many(batch)
+                batch = []
+        store.write_many(batch)
+        store.close()
+        yield path
+    finally:
+        if old is None:
+            del os.environ['DATA_PATH']
+        else:
+            os.environ['DATA_PATH'] = old
+        shutil.rmtree(path)
+
+
+@contextlib.contextmanager
+def timed(label, results=None):
+    """ Times the block and prints the result """
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    print(f"{label:<48} {elapsed * 1000:>12.1f} ms")
+    if results is not None:
+        results[label] = elapsed
@@ -0,0 +1,61 @@
+""" Saves, reloads and fires many durable scheduled events
+
+    python -m benchmarks.events [event count]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+from bot.components.schedule import EventStore
+from bot.components.timer import TimerWheel, WheelTimer, VirtualClock
+
+
+def main(count):
+    print(f"{count} scheduled events")
+    path = tempfile.mkdtemp(prefix='rpg_bench_')
+    filename = os.path.join(path, 'events.db')
+    clock = VirtualClock(time.time())
+    fired = []
+    try:
+        # Due times are spread over an hour
+        store = EventStore(filename)
+        wheel = TimerWheel(lambda *args: None, clock=clock, wall=clock, store=store)
+        start = time.perf_counter()
+        for i in range(count):
+            WheelTimer(wheel, 'round_timeout', i * 3600 / count, (i, i), key=f'battle/{i}').start()
+        store.sync()
+        saved = time.perf_counter() - start
+        store.close()
+
+        # Down for half of it
+        clock.advance(1800)
+        store = EventStore(filename)
+        start = time.perf_counter()
+        overdue = store.count(before=clock())
+        counted = time.perf_counter() - start
+
+        wheel = TimerWheel(lambda *args: fired.append(args), clock=clock, wall=clock, store=store)
+        start = time.perf_counter()
+        loaded, _ = wheel.reload()
+        reloaded = time.perf_counter() - start
+
+        start = time.perf_counter()
+        wheel.fast_forward(wheel.resolution)
+        store.sync()
+        burst = time.perf_counter() - start
+        store.close()
+    finally:
+        shutil.rmtree(path)
+
+    print(f"{'  save':<48} {saved * 1000:>12.1f} ms")
+    print(f"{'  count overdue':<48} {counted * 1000:>12.1f} ms")
+    print(f"{'  reload':<48} {reloaded * 1000:>12.1f} ms")
+    print(f"{'  fire overdue':<48} {burst * 1000:>12.1f} ms")
+    print(f"{'  events reloaded':<48} {loaded:>12}")
+    print(f"{'  events overdue':<48} {overdue:>12}")
+    print(f"{'  events fired together on the first tick':<48} {len(fired):>12}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,46 @@
+""" Measures the memory of loading many users with and without shared catalog items
+
+    python -m benchmarks.flyweight [user count]
+"""
+import sys
+import json
+import tracemalloc
+from bot.components import stuff, users
+from benchmarks.common import WEAPONS, ARMOR, synthetic_user
+
+
+def measure(datas):
+    """ Memory held by the users rebuilt from their serialized data """
+    tracemalloc.start()
+    loaded = [users.User.from_dict(x) for x in datas]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return loaded, current
+
+
+def main(count):
+    # Round trip through json like the file backend, so nothing starts out shared
+    datas = [json.loads(json.dumps(synthetic_user(i).to_dict())) for i in range(count)]
+    print(f"Loading {count} users")
+
+    stuff.CATALOG.clear()
+    loaded, before = measure(datas)
+    del loaded
+    label = "  unique item instances"
+    print(f"{label:<48} {before / 1024 / 1024:>12.1f} MB")
+
+    for item in WEAPONS + ARMOR:
+        stuff.register(item)
+    loaded, after = measure(datas)
+    label = "  shared catalog instances"
+    print(f"{label:<48} {after / 1024 / 1024:>12.1f} MB")
+    label = "  saved per user"
+    print(f"{label:<48} {(before - after) / count:>12.0f} bytes")
+
+    distinct = {id(x['item']) for user in loaded for x in user.inventory}
+    label = "  distinct inventory item objects"
+    print(f"{label:<48} {len(distinct):>12}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
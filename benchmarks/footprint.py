@@ -0,0 +1,35 @@
+""" Measures the memory per user and attribute access speed
+
+    python -m benchmarks.footprint [user count]
+"""
+import sys
+import timeit
+import tracemalloc
+from benchmarks.common import synthetic_user
+
+
+def main(count):
+    tracemalloc.start()
+    loaded = [synthetic_user(i) for i in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"Creating {count} users")
+    label = "  bytes per user"
+    print(f"{label:<48} {current / count:>12.0f}")
+
+    # The attributes combat reads the most
+    user = loaded[0]
+    number = 1000000
+    for label, stmt in [
+            ('user.speed.current', lambda: user.speed.current),
+            ('user.body.current', lambda: user.body.current),
+            ('user.life.current -= 0', lambda: setattr(user.life, 'current', user.life.current)),
+            ('user.weapon.power', lambda: user.weapon.power),
+            ('user.defending', lambda: user.defending)]:
+        seconds = timeit.timeit(stmt, number=number)
+        label = f"  {label}"
+        print(f"{label:<48} {seconds / number * 1e9:>12.1f} ns")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,61 @@
+""" Micro benchmarks of inventory operations against the old list scans
+
+    python -m benchmarks.inventory
+"""
+import timeit
+from bot.components import stuff
+from bot.components.inventory import Inventory
+
+
+class ListInventory():
+    """ The previous list of {'item', 'quantity'} dicts, scanned by name """
+    def __init__(self):
+        self.entries = []
+
+    def add(self, item, quantity=1):
+        for entry in self.entries:
+            if entry['item'].name == item.name:
+                entry['quantity'] += quantity
+                return
+        self.entries.append({'item': item, 'quantity': quantity})
+
+    def get(self, name):
+        for entry in self.entries:
+            if entry['item'].name == name:
+                return entry
+        return None
+
+    def remove(self, name, quantity=1):
+        for i, entry in enumerate(self.entries):
+            if entry['item'].name == name:
+                if entry['quantity'] < quantity:
+                    return False
+                entry['quantity'] -= quantity
+                if entry['quantity'] < 1:
+                    del self.entries[i]
+                return True
+        return False
+
+
+def run(size):
+    """ Times stack, lookup and remove of the newest item in an inventory of the given size """
+    items = [stuff.Item(name=f"item {i}", desc="A synthetic item", value=i) for i in range(size)]
+    last = items[-1]
+    for cls in [ListInventory, Inventory]:
+        inventory = cls()
+        for item in items:
+            inventory.add(item, 2)
+
+        number = max(1000, 100000 // size)
+        for label, stmt in [
+                ('stack', lambda: inventory.add(last)),
+                ('lookup', lambda: inventory.get(last.name)),
+                ('remove', lambda: inventory.remove(last.name) and inventory.add(last))]:
+            seconds = timeit.timeit(stmt, number=number)
+            label = f"  {cls.__name__} {label} x{size}"
+            print(f"{label:<48} {seconds / number * 1e6:>12.2f} us")
+
+
+if __name__ == '__main__':
+    for count in [10, 1000, 10000]:
+        run(count)
@@ -0,0 +1,31 @@
+""" Compares mutation throughput when journaling against saving whole characters
+
+    python -m benchmarks.journal [mutation count]
+"""
+import os
+import sys
+import time
+from bot.api.character import CharacterAPI
+from benchmarks.common import data_path
+
+
+def main(count):
+    print(f"{count} gold mutations spread over 100 users")
+    for backend in ['file', 'sqlite', 'journal']:
+        os.environ['STORAGE'] = backend
+        with data_path(100, backend):
+            api = CharacterAPI(None)
+            api.progress_interval = count
+
+            start = time.perf_counter()
+            for i in range(count):
+                api.give_gold(f'user{i % 100}', 1)
+            api.close()
+            elapsed = time.perf_counter() - start
+
+        label = f"  {backend} mutations per second"
+        print(f"{label:<48} {count / elapsed:>12.0f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,35 @@
+""" Measures how fast recorded battles can be replayed and checked offline
+
+    python -m benchmarks.replay [battle count] [participants per battle]
+"""
+import sys
+import time
+from bot import sim, replay
+from bot.components.replay import Replay
+from benchmarks.common import WEAPONS
+
+
+def main(count, size):
+    print(f"{count} recorded battles of {size} participants")
+    loadouts = [sim.Loadout()] + [sim.Loadout(x.to_dict()) for x in WEAPONS]
+    arena = sim.Arena()
+    replays = []
+    for seed in range(count):
+        sim.fight(arena, loadouts, seed, size, defend=0.1, replays=replays)
+
+    rounds = sum(len(Replay.decode(x).rounds) for x in replays)
+    size_avg = sum(len(x) for x in replays) / count
+    print(f"{'  average replay size':<48} {size_avg:>12.0f} bytes")
+    print(f"{'  average rounds':<48} {rounds / count:>12.1f}")
+
+    start = time.perf_counter()
+    matched = sum(replay.verify(x, arena) for x in replays)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'  replays matching':<48} {matched:>12}")
+    print(f"{'  battles replayed per second':<48} {count / elapsed:>12.0f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 2)
@@ -0,0 +1,46 @@
+""" Compares adding a field to one embed for every action against the paginated round report
+
+    python -m benchmarks.reports [participant count]
+"""
+import sys
+import time
+from discord import Embed
+from bot.components.logging import DiscordLogger
+from bot.components.report import RoundReport
+
+
+def main(count):
+    print(f"One round of a {count} participant battle")
+    actions = [(f"user{i}", f"user{(i + 1) % count}", 1 + i % 10) for i in range(count)]
+    deaths = [f"user{i}" for i in range(0, count, 3)]
+
+    # Every action is formatted into one embed, far past what discord accepts
+    start = time.perf_counter()
+    embed = Embed(title="Round 1 results")
+    for source, target, damage in actions:
+        embed.add_field(
+            name=f"{source} attacks {target}", value=f"{source} deals {damage} to {target} with wood sword")
+    for name in deaths:
+        embed.add_field(name=f"{name} dies!", value="It was nice knowing you...")
+    eager = time.perf_counter() - start
+
+    logger = DiscordLogger()
+    start = time.perf_counter()
+    report = RoundReport(1)
+    for source, target, damage in actions:
+        report.attack(source, target, damage, "wood sword")
+    for name in deaths:
+        report.death(name)
+    pages = list(report.pages(logger.entry))
+    paged = time.perf_counter() - start
+
+    print(f"{'  one embed of every action':<48} {eager * 1000:>12.1f} ms")
+    print(f"{'    characters':<48} {len(embed):>12}")
+    print(f"{'  paginated report':<48} {paged * 1000:>12.1f} ms")
+    print(f"{'    embeds':<48} {len(pages):>12}")
+    print(f"{'    largest embed characters':<48} {max(len(x.embed) for x in pages):>12}")
+    print(f"{'  speedup':<48} {eager / paged:>12.1f} x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
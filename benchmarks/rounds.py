@@ -0,0 +1,62 @@
+""" Times the per round bookkeeping of a large battle resolved one action at a time
+
+    python -m benchmarks.rounds [participant count] [rounds]
+"""
+import sys
+import time
+import random
+import bot.api
+from benchmarks.common import data_path
+
+
+class FakeContext():
+    channel = None
+    author = None
+
+
+def main(count, rounds):
+    print(f"{rounds} rounds of a {count} participant battle")
+    rng = random.Random(0)
+    with data_path(count):
+        api = bot.api.API()
+        api.checkpoints = None
+        api.character.progress_interval = count
+        battle = api.battle
+        battle.batch_threshold = 0
+        battle.new(FakeContext())
+        for i in range(count):
+            battle.join(api.character.get(f'user{i}'))
+        battle.start()
+
+        # Only time submitting actions, which includes running the round on the last one
+        elapsed = 0.0
+        played = 0
+        actions = 0
+        for _ in range(rounds):
+            if not battle.is_round_wait:
+                break
+            dead = set(battle.death_order)
+            alive = [x for x in battle.turn_order if x not in dead]
+            submissions = [(battle.participants[x], battle.participants[rng.choice(alive)]) for x in alive]
+
+            start = time.perf_counter()
+            for source, target in submissions:
+                # A few attack each round, so people die slowly and the battle lasts
+                if rng.random() < 0.02:
+                    battle.submit_action(source, 'attack', target=target)
+                else:
+                    battle.submit_action(source, 'defend')
+            elapsed += time.perf_counter() - start
+            played += 1
+            actions += len(submissions)
+        battle.stop()
+        api.character.close()
+
+    print(f"{'  rounds played':<48} {played:>12}")
+    print(f"{'  ms per round':<48} {elapsed * 1000 / played:>12.2f}")
+    print(f"{'  actions per second':<48} {actions / elapsed:>12.0f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 50)
@@ -0,0 +1,64 @@
+""" Compares sending log entries one at a time against the concurrent send pipeline
+
+    python -m benchmarks.sender [target count] [messages per target] [latency ms]
+"""
+import sys
+import time
+import asyncio
+from bot.components.sender import SendPipeline
+
+
+class FakeTarget():
+    """ Channel or user that takes latency seconds to accept each message, and checks they arrive in order """
+    def __init__(self, id, latency):
+        self.id = id
+        self.latency = latency
+        self.received = []
+
+    async def send(self, embed=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.received.append(embed)
+
+
+def batch(count, messages, latency):
+    """ A rounds worth of messages spread over count targets, interleaved like a battle log """
+    targets = [FakeTarget(i + 1, latency) for i in range(count)]
+    return targets, [(x, i) for i in range(messages) for x in targets]
+
+
+async def sequential(count, messages, latency):
+    targets, sends = batch(count, messages, latency)
+    start = time.perf_counter()
+    for target, embed in sends:
+        await target.send(embed=embed)
+    return time.perf_counter() - start, targets, None
+
+
+async def pipelined(count, messages, latency):
+    targets, sends = batch(count, messages, latency)
+    pipeline = SendPipeline()
+    start = time.perf_counter()
+    await asyncio.gather(*[pipeline.send(target, embed=embed) for target, embed in sends])
+    return time.perf_counter() - start, targets, pipeline
+
+
+def main(count, messages, latency):
+    print(f"{count} targets, {messages} messages each, {latency * 1000:.0f} ms a send")
+    for name, run in [('one at a time', sequential), ('send pipeline', pipelined)]:
+        elapsed, targets, pipeline = asyncio.run(run(count, messages, latency))
+        assert all(x.received == list(range(messages)) for x in targets)
+        print(f"  {name}")
+        print(f"{'    elapsed':<48} {elapsed * 1000:>12.1f} ms")
+        print(f"{'    messages a second':<48} {count * messages / elapsed:>12.1f}")
+        if pipeline is not None:
+            stats = pipeline.stats()
+            print(f"{'    peak pending':<48} {stats['peak_pending']:>12}")
+            print(f"{'    peak target queue':<48} {stats['peak_depth']:>12}")
+            print(f"{'    throttled sends':<48} {stats['throttled']:>12}")
+            print(f"{'    total time waiting on limits':<48} {stats['throttled_time'] * 1000:>12.1f} ms")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 40,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 3,
+         float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.05)
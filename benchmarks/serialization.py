@@ -0,0 +1,36 @@
+""" Compares json and compact binary user records
+
+    python -m benchmarks.serialization [user count]
+"""
+import sys
+import json
+from bot.components import binary, stuff
+from benchmarks.common import WEAPONS, ARMOR, synthetic_user, timed
+
+
+def main(count):
+    for item in WEAPONS + ARMOR:
+        stuff.register(item)
+    datas = [synthetic_user(i).to_dict() for i in range(count)]
+    print(f"Serializing {count} users")
+
+    with timed("  json encode"):
+        as_json = [json.dumps(x).encode('utf-8') for x in datas]
+    with timed("  binary encode"):
+        as_binary = [binary.encode(x) for x in datas]
+    with timed("  json decode"):
+        for raw in as_json:
+            json.loads(raw)
+    with timed("  binary decode"):
+        for raw in as_binary:
+            binary.decode(raw)
+
+    json_bytes = sum(len(x) for x in as_json)
+    binary_bytes = sum(len(x) for x in as_binary)
+    print(f"{'  json bytes per user':<48} {json_bytes / count:>12.1f}")
+    print(f"{'  binary bytes per user':<48} {binary_bytes / count:>12.1f}")
+    print(f"{'  size ratio':<48} {binary_bytes / json_bytes:>12.2f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
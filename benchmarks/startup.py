@@ -0,0 +1,40 @@
+""" Compares eager and lazy CharacterAPI startup
+
+    python -m benchmarks.startup [user counts...]
+"""
+import os
+import sys
+import tracemalloc
+from bot.api.character import CharacterAPI
+from benchmarks.common import data_path, timed
+
+
+def boot(lazy):
+    """ Boots a character API and reports the time and memory it took """
+    os.environ['LAZY_LOAD'] = 'true' if lazy else 'false'
+    tracemalloc.start()
+    with timed(f"  {'lazy' if lazy else 'eager'} boot"):
+        api = CharacterAPI(None)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    label = f"  {'lazy' if lazy else 'eager'} resident memory"
+    print(f"{label:<48} {current / 1024 / 1024:>12.1f} MB")
+
+    # The first command against a lazy user pays for it's load
+    with timed(f"  {'lazy' if lazy else 'eager'} first get"):
+        api.get('user1')
+    api.close()
+
+
+def main(counts):
+    for backend in ['file', 'sqlite']:
+        for count in counts:
+            print(f"{backend} storage, {count} users")
+            with data_path(count, backend):
+                os.environ['STORAGE'] = backend
+                boot(lazy=False)
+                boot(lazy=True)
+
+
+if __name__ == '__main__':
+    main([int(x) for x in sys.argv[1:]] or [10000, 100000])
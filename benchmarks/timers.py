@@ -0,0 +1,89 @@
+""" Compares a task per timer against the shared timer wheel for many pending timers
+
+    python -m benchmarks.timers [timer count]
+"""
+import sys
+import time
+import asyncio
+import tracemalloc
+from bot.components import timer
+
+
+class TaskTimer():
+    """ Timer with a task of it's own sleeping until it fires, what the wheel replaced """
+    def __init__(self, client, name, timeout, args=None, kwargs=None, key=None):
+        self.client = client
+        self.name = name
+        self.timeout = timeout
+        self._task = None
+
+    def start(self):
+        self._task = self.client.loop.create_task(self._run())
+
+    def cancel(self):
+        self._task.cancel()
+
+    async def _run(self):
+        await asyncio.sleep(self.timeout)
+        self.client.dispatch(self.name)
+
+
+class Client():
+    """ Just enough of a discord client to dispatch timer events """
+    def __init__(self, loop):
+        self.loop = loop
+        self.fired = 0
+
+    def dispatch(self, name, *args, **kwargs):
+        self.fired += 1
+
+
+async def measure(count, create, trace=False):
+    """ Start count timers that all expire within a second, cancel half of them and wait for the rest """
+    loop = asyncio.get_running_loop()
+    client = Client(loop)
+    factory = create(client, loop)
+
+    # Tracing memory slows everything down, so it's measured on a separate run
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    timers = [factory("benchmark", 0.5 + (i % 100) / 200) for i in range(count)]
+    for x in timers:
+        x.start()
+    scheduled = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0] if trace else 0
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for x in timers[::2]:
+        x.cancel()
+    canceled = time.perf_counter() - start
+
+    while client.fired < count - len(timers[::2]):
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(0)
+    return scheduled, canceled, memory
+
+
+def tasks(client, loop):
+    return timer.TimerFactory(TaskTimer, client)
+
+
+def wheel(client, loop):
+    return timer.TimerFactory(timer.WheelTimer, timer.TimerWheel(client.dispatch, loop))
+
+
+def main(count):
+    print(f"{count} pending timers")
+    for name, create in [('task per timer', tasks), ('timer wheel', wheel)]:
+        scheduled, canceled, _ = asyncio.run(measure(count, create))
+        _, _, memory = asyncio.run(measure(count, create, trace=True))
+        print(f"  {name}")
+        print(f"{'    schedule':<48} {scheduled * 1000:>12.1f} ms")
+        print(f"{'    cancel half':<48} {canceled * 1000:>12.1f} ms")
+        print(f"{'    memory while pending':<48} {memory / 1024 / 1024:>12.1f} MiB")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
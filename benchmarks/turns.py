@@ -0,0 +1,53 @@
+""" Compares sorting every participant each round against the incremental turn order
+
+    python -m benchmarks.turns [participant count] [rounds]
+"""
+import sys
+import time
+import random
+from bot.components.turns import TurnOrder
+
+
+def main(count, rounds):
+    print(f"{rounds} rounds of a {count} participant battle")
+    rng = random.Random(0)
+    speeds = {f'user{i}': rng.randint(1, 100) for i in range(count)}
+
+    # The same deaths and speed changes happen to both
+    events = []
+    alive = list(speeds)
+    for _ in range(rounds):
+        dead = [alive.pop(rng.randrange(len(alive))) for _ in range(min(len(alive) - 1, count // rounds // 2))]
+        changed = [(rng.choice(alive), rng.randint(1, 100)) for _ in range(2)]
+        events.append((dead, changed))
+
+    # Every round sorts everyone, and the dead stay in the order to be skipped
+    current = dict(speeds)
+    start = time.perf_counter()
+    for dead, changed in events:
+        order = [k for k, v in sorted(current.items(), key=lambda x: x[1])]
+        for name, speed in changed:
+            current[name] = speed
+    resort = time.perf_counter() - start
+
+    turns = TurnOrder()
+    for name, speed in speeds.items():
+        turns.add(name, speed)
+    start = time.perf_counter()
+    for dead, changed in events:
+        order = turns.order()
+        for name in dead:
+            turns.remove(name)
+        for name, speed in changed:
+            turns.update(name, speed)
+    incremental = time.perf_counter() - start
+
+    print(f"{'  sort every round':<48} {resort * 1000:>12.1f} ms")
+    print(f"{'  incremental turn order':<48} {incremental * 1000:>12.1f} ms")
+    print(f"{'  speedup':<48} {resort / incremental:>12.1f} x")
+    print(f"{'  participants left':<48} {len(order):>12}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
@@ -1,9 +1,14 @@
 """ Import sub modules for direct API access """
+import os
 import bot.api.battle
 import bot.api.character
+import bot.api.odds
 import bot.api.shop
 import bot.api.errors
+import bot.components.checkpoint
+import bot.components.schedule
 import bot.components.timer
+import bot.components.logging
 
 class API():
     """ Logic handler """
@@ -16,15 +21,33 @@ class API():
             self.logger = logger
 
         # Default to a null timer for testing
+        # Otherwise every timer runs on one shared timer wheel task, instead of a task per timer
         if not client:
+            self.timers = None
             self.timer_factory = bot.components.timer.TimerFactory(
                 bot.components.timer.NullTimer)
         else:
+            # Timers are saved to the event store so they survive a restart. An empty EVENT_DB disables it
+            filename = os.getenv('EVENT_DB', os.path.join(os.getenv('DATA_PATH', ''), 'events.db'))
+            store = bot.components.schedule.EventStore(filename) if filename else None
+            self.timers = bot.components.timer.TimerWheel(client.dispatch, client.loop, store=store)
             self.timer_factory = bot.components.timer.TimerFactory(
-                bot.components.timer.AsyncEventTimer,
-                client)
+                bot.components.timer.WheelTimer,
+                self.timers)
+
+        # In progress battles are checkpointed so they survive a restart. An empty BATTLE_DB disables it
+        filename = os.getenv('BATTLE_DB', os.path.join(os.getenv('DATA_PATH', ''), 'battles.db'))
+        interval = float(os.getenv('CHECKPOINT_INTERVAL', 1.0))
+        self.checkpoints = bot.components.checkpoint.CheckpointStore(filename, interval) if filename else None
 
         # Bot api stuff
-        self.battle = bot.api.battle.BattleAPI(self)
-        self.character = bot.api.character.CharacterAPI(self)
+        # The shop loads first so the item catalog is ready for loading characters
         self.shop = bot.api.shop.ShopAPI(self)
+        self.battles = bot.api.battle.BattleManager(self)
+        self.odds = bot.api.odds.OddsAPI(self)
+        self.character = bot.api.character.CharacterAPI(self)
+
+    @property
+    def battle(self):
+        """ The battle for contexts without a channel """
+        return self.battles.get(None)
@@ -1,7 +1,16 @@
 """ User level battle commands """
+import os
+import time
+import array
+import base64
 import random
+import itertools
+import concurrent.futures
 from statemachine import StateMachine, State
 from bot.api.errors import CommandError
+from bot.components import combat, replay, report
+from bot.components.participants import Participants
+from bot.components.turns import TurnOrder
 
 class BattleAPI(StateMachine):
     """ State Machine Handler """
@@ -30,30 +39,62 @@ class BattleAPI(StateMachine):
 
     stop = stopped.from_(joinable, started, finished, round_started, round_wait, round_running, round_ended)
 
-    def __init__(self, parent):
+    _ids = itertools.count(1)
+
+    def __init__(self, parent, key=None):
         super(BattleAPI, self).__init__()
         self._parent = parent
+        self.key = key
+        self.id = next(self._ids)
         self.ctx = None
 
+        # Every battle rolls from it's own seeded generator, so it can be replayed
+        self.seed = None
+        self.rng = random.Random()
+        self.recorder = None
+        self.replay = None
+        self.replay_path = os.getenv('REPLAY_PATH', os.path.join(os.getenv('DATA_PATH', ''), 'replays'))
+        self.replay_keep = int(os.getenv('REPLAY_KEEP', 1000))
+        self.replay_saved = None
+
         self.round = 0
-        self.participants = {}
+        self.participants = Participants()
+        self.turns = TurnOrder()
         self.actions = {}
         self.turn_order = []
-        self.death_order = []
         self.action_log = None
 
-        # Battle timers
+        # Battle timers, the name and wall clock due time are kept so they can be re-armed after a restart
         self.timer = None
+        self.timer_name = None
+        self.timer_due = None
         self.join_timeout_sec = 120
 
         # Will remind 3 times before forcing all defends on the final 4th call
         self.action_reminder_timeout = 30
         self.action_reminder_loop = 0
 
+        # Round results are listed in full up to a number of embeds, then summarized
+        self.report_summary = os.getenv('ROUND_REPORT', 'full') == 'summary'
+        self.report_pages = int(os.getenv('ROUND_REPORT_PAGES', 4))
+
+        # One status message per battle is kept up to date, edited at most once every interval
+        self.status = None
+        self.status_interval = float(os.getenv('STATUS_INTERVAL', 2.0))
+
+        # Massive battles resolve rounds with the batch combat engine when it's available, 0 disables it
+        self.batch_threshold = int(os.getenv('BATCH_COMBAT_THRESHOLD', '1000'))
+        self.roster = None
+
+    @property
+    def death_order(self):
+        """ Participants in the order they died """
+        return self.participants.death_order
+
     @property
     def unsubmitted_participants(self):
-        """ Get the list of participants who haven't submitted an action for the round """
-        return [x for x in self.turn_order if not x in self.actions]
+        """ Get the list of living participants who haven't submitted an action for the round """
+        return list(self.participants.waiting)
 
     def on_stop(self):
         """ When the current battle stops """
@@ -63,23 +104,43 @@ class BattleAPI(StateMachine):
         log.title("Battle stopped")
         log.buffer(self.ctx.channel)
 
+        # Pending timers belong to this battle only
+        if self.timer and self.timer.is_running():
+            self.timer.cancel()
+        self.timer_name = None
+        self.timer_due = None
+
+        # Leave the status showing how the battle ended
+        if self.status is not None:
+            self.status.close(self._render_status(over=True))
+            self.status = None
+
+        # Participants may be evicted from the character cache and join other battles again
+        for name in self.participants:
+            self._parent.character.unpin(name)
+            self._parent.battles.leave(name)
+        self._parent.battles.remove(self)
+
         # Reset state
         self.ctx = None
         self.round = 0
-        self.participants = {}
+        self.participants = Participants()
+        self.turns = TurnOrder()
         self.actions = {}
         self.turn_order = []
-        self.death_order = []
         self.action_log = None
+        self.roster = None
+        self.recorder = None
 
-    def on_new(self, ctx):
+    def on_new(self, ctx, seed=None):
         """ When a new battle is started """
         # Saving the context is important, because that's how we figure out where to send the logging messages
         self.ctx = ctx
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self.rng = random.Random(self.seed)
 
         # This timer will auto start/stop the battle after timeout depending on participant count
-        self.timer = self._parent.timer_factory("join_timeout", self.join_timeout_sec, args=(ctx,))
-        self.timer.start()
+        self.start_timer("join_timeout", self.join_timeout_sec)
 
         log = self._parent.logger.entry()
         log.title("Battle Started!")
@@ -98,7 +159,19 @@ class BattleAPI(StateMachine):
             log.buffer(self.ctx.channel)
             return
 
-        self.participants[source.name] = source
+        # One battle at a time per user
+        if not self._parent.battles.enter(source.name, self):
+            log = self._parent.logger.entry()
+            log.color("warn")
+            log.title(f"You're already in another battle, {source.name}")
+            log.desc("Finish that battle before joining a new one")
+            log.buffer(self.ctx.channel)
+            return
+
+        # Battles hold onto the user instance, so it must stay the cached one until the battle ends
+        self.participants.add(source)
+        self.turns.add(source.name, source.speed.current)
+        self._parent.character.pin(source.name)
         log = self._parent.logger.entry()
         log.title(f"{source.name} has entered the battle field!")
         log.desc("TODO: User descriptions")
@@ -118,25 +191,27 @@ class BattleAPI(StateMachine):
             return
 
         self.timer.cancel() # Ensure the join timeout is canceled
+        # Battles too big for the replay format play on without one
+        if replay.recordable(count):
+            self.recorder = replay.Recorder(self.seed, self.participants, batch=self._use_batch())
         self.new_round()
 
     def on_enter_round_started(self):
         """ A round has started """
-        # Calculate the turn order and wait for actions
+        # The turn order is kept up to date as people die or change speed, so just take it and wait for actions
         self.round += 1
-        self.turn_order = [k for k, v in sorted(self.participants.items(), key=lambda x: x[1].speed.current)]
+        self.turn_order = self.turns.order()
         self.actions = {}
+        self.participants.start_round(self.turn_order)
 
         # Wait for round actions
-        self.timer = self._parent.timer_factory("round_timeout", self.action_reminder_timeout, args=(self.ctx,))
-        self.timer.start()
+        self.start_timer("round_timeout", self.action_reminder_timeout)
         self.wait_for_actions()
 
     def on_wait_for_actions(self):
         """ Inform the channel and each participant they are waiting for turn inputs """
         # Begin a round log
-        self.action_log = self._parent.logger.entry()
-        self.action_log.title(f"Round {self.round} results")
+        self.action_log = report.RoundReport(self.round, self.report_summary, self.report_pages)
 
         # Continually bug the channel for actions
         self.announce_round_wait()
@@ -160,7 +235,7 @@ class BattleAPI(StateMachine):
             log.buffer(self.ctx.channel)
             return
 
-        if source.name in self.death_order:
+        if self.participants.is_dead(source.name):
             log = self._parent.logger.entry()
             log.color("warn")
             log.title("You're dead!")
@@ -178,7 +253,7 @@ class BattleAPI(StateMachine):
             log.buffer(self.ctx.channel)
             return
 
-        if 'target' in kwargs and kwargs['target'].name in self.death_order:
+        if 'target' in kwargs and self.participants.is_dead(kwargs['target'].name):
             log = self._parent.logger.entry()
             log.color("warn")
             log.title(f"{kwargs['target']} is dead!")
@@ -187,16 +262,11 @@ class BattleAPI(StateMachine):
             log.buffer(self.ctx.channel)
             return
 
-        if action == "attack":
-            self.actions[source.name] = {
-                "action": self._attack,
-                "args": [source, kwargs['target']]
-            }
-        elif action == "defend":
-            self.actions[source.name] = {
-                "action": self._defend,
-                "args": [source]
-            }
+        if action in ("attack", "defend"):
+            self.actions[source.name] = self._action(action, source, kwargs.get('target'))
+            self.participants.submit(source.name)
+            if self.status is not None:
+                self.status.update()
         # elif action == "cast":
         #     self._cast(name, kwargs['spell'], kwargs['target'])
         # elif action == "use":
@@ -212,7 +282,7 @@ class BattleAPI(StateMachine):
 
     def on_enter_round_wait(self):
         """ Automatically run the round when ready """
-        if len(self.actions) == len(self.participants):
+        if self._round_ready():
             self.run_round()
 
     def on_enter_round_running(self):
@@ -221,18 +291,10 @@ class BattleAPI(StateMachine):
         if self.timer and self.timer.is_running():
             self.timer.cancel()
 
-        # Run the actions in turn order for the round
-        for name in self.turn_order:
-            # Dead users skip over their turns
-            if name in self.death_order:
-                continue
-
-            action = self.actions[name]['action']
-            args = self.actions[name]['args']
-            action(*args)
+        self._resolve_round()
 
-        # Finally, send the entire round as a single log entry
-        self.action_log.buffer(self.ctx.channel)
+        # Finally, send the entire round, split over as many embeds as it takes
+        self._parent.logger.report(self.action_log.pages(self._parent.logger.entry), self.ctx.channel)
         self.action_log = None
         self.end_round()
 
@@ -256,8 +318,7 @@ class BattleAPI(StateMachine):
     def on_finish(self, draw=False):
         """ Battle finished """
         # Winner order is the reverse death order
-        alive = [x for x in self.participants if x not in self.death_order]
-        winners = alive + self.death_order[::-1]
+        winners = self.participants.living() + self.death_order[::-1]
         prizes = {}
 
         # Generate standard prizes
@@ -301,6 +362,10 @@ class BattleAPI(StateMachine):
 
         log.buffer(self.ctx.channel)
 
+        if self.recorder is not None:
+            self.replay = self.recorder.finish(self.participants, self.death_order, draw)
+            self._save_replay()
+
         # Payout prizes
         for name in prizes:
             gold = prizes[name]['gold']
@@ -313,63 +378,368 @@ class BattleAPI(StateMachine):
         # Since we do everything when the call is made to change states, we can move directly into stop
         self.stop()
 
-    def announce_round_wait(self):
-        """ Announce to the channel that the bot is waiting for actions """
-        submitted = [x for x in self.actions]
-        waiting_on = [x for x in self.participants if not x in submitted]
-        waiting_on_text = '\n'.join(waiting_on)
+    def on_enter_state(self, state):
+        """ Checkpoint the battle whenever it comes to rest waiting on users, and forget it once it stops """
+        checkpoints = self._parent.checkpoints
+        if checkpoints is None:
+            return
+
+        if state.identifier == 'stopped':
+            checkpoints.delete(self.key)
+        elif state.identifier == 'joinable' or (state.identifier == 'round_wait' and not self._round_ready()):
+            checkpoints.track(self)
+
+    def checkpoint(self):
+        """ Snapshot everything needed to resume the battle as plain values """
+        return {
+            'key': self.key,
+            'id': self.id,
+            'author': getattr(self.ctx.author, 'id', None),
+            'state': self.current_state.identifier,
+            'seed': self.seed,
+            'rng': self._rng_state(),
+            'round': self.round,
+            'participants': {name: user.life.current for name, user in self.participants.items()},
+            'turn_order': self.turn_order,
+            'death_order': self.death_order,
+            'actions': {
+                name: [x['name'], x['args'][1].name if x['name'] == 'attack' else None]
+                for name, x in self.actions.items()},
+            'reminders': self.action_reminder_loop,
+            'timer': [self.timer_name, self.timer_due],
+            'recorder': [base64.b64encode(self.recorder.recorded()).decode(), self.recorder.rounds] if self.recorder else None
+        }
+
+    def restore(self, ctx, data):
+        """ Resume a checkpointed battle in a freshly created battle """
+        # Participants are the cached users again, with the life they had when the battle was saved
+        participants = [(self._parent.character.get(name), life) for name, life in data['participants'].items()]
+        self.ctx = ctx
+        self.id = data['id']
+        self.seed = data['seed']
+        version, internal, gauss = data['rng']
+        self.rng.setstate((version, tuple(array.array('I', base64.b64decode(internal))), gauss))
+
+        for user, life in participants:
+            user.life.current = life
+            self.participants.add(user)
+            self.turns.add(user.name, user.speed.current)
+            self._parent.character.pin(user.name)
+            self._parent.battles.enter(user.name, self)
+
+        self.round = data['round']
+        self.turn_order = data['turn_order']
+        for name in data['death_order']:
+            self._kill(name)
+        self.participants.start_round(self.turn_order)
+        for name, (action, target) in data['actions'].items():
+            self.actions[name] = self._action(action, self.participants[name], self.participants.get(target))
+            self.participants.submit(name)
+        self.action_reminder_loop = data['reminders']
+        if data['recorder']:
+            recorded, rounds = data['recorder']
+            self.recorder = replay.Recorder.resume(self.participants, base64.b64decode(recorded), rounds)
+
+        self.current_state = self.states_map[data['state']]
+        if self.is_round_wait:
+            self.action_log = report.RoundReport(self.round, self.report_summary, self.report_pages)
+
+        # Timers reloaded from the event store carry on, otherwise they only get what was left of their time
+        name, due = data['timer']
+        if self._parent.timers is not None:
+            self.timer = self._parent.timers.find(self.timer_key)
+        if self.timer is not None and self.timer.name == name:
+            self.timer_name = name
+            self.timer_due = due
+        elif name:
+            self.start_timer(name, max(0.0, due - time.time()))
 
         log = self._parent.logger.entry()
-        log.title(f"Waiting for actions from {len(waiting_on)} participants...")
-        log.desc(f"{waiting_on_text}\n\nUse one of the following commands to submit an action:")
-        log.field(title="!attack", desc="!attack <target>\nPhysically attack the target", inline=True)
-        log.field(title="!defend", desc="!defend\nDefending reduces any damage by half", inline=True)
-        # log.field(title="!cast", value="!cast <spell> <target>\nCast a spell you have learned on the target. For more information type !spells", inline=True)
-        # log.field(title="!use", value="!use <item> <target>\nUse an item on a target. For more information type !items", inline=True)
+        log.color("warn")
+        log.title("Battle restored")
+        log.desc(f"The battle with {len(self.participants)} participants was interrupted and picks up where it left off")
         log.buffer(self.ctx.channel)
 
-    def _attack(self, source, target):
-        """ Source attacks target """
-        # Get the relative strength ratio of the two targets
-        physical_ratio = source.body.current / float(target.body.current)
-        if target.defending:
-            physical_ratio /= 2.0
-
-        # Get the variable weapon power
-        if not source.weapon:
-            power = 1.0
+        if self.is_round_wait:
+            if self._round_ready():
+                self.run_round()
+            else:
+                self.announce_round_wait()
+
+    @property
+    def timer_key(self):
+        """ Each battle has one timer running at a time """
+        return f"battle/{self.key}"
+
+    def start_timer(self, name, timeout):
+        """ Start the battles timer, firing the named event with this battles key and id after timeout seconds """
+        self.timer = self._parent.timer_factory(name, timeout, args=(self.key, self.id), key=self.timer_key)
+        self.timer.start()
+        self.timer_name = name
+        self.timer_due = time.time() + timeout
+
+    def announce_round_wait(self):
+        """ Show who the bot is waiting for actions from in the battles status message """
+        if self.status is None:
+            self.status = self._parent.logger.live(self.ctx.channel, self._render_status, self.status_interval)
+        self.status.update()
+
+    def _render_status(self, over=False):
+        """ The battles status message as it is right now """
+        log = self._parent.logger.entry()
+        living = len(self.participants.alive)
+        waiting_on = self.unsubmitted_participants
+        if over:
+            log.color("success")
+            log.title(f"Battle over after {self.round} rounds")
+            log.desc(f"{living} of {len(self.participants)} participants survived")
         else:
-            factor = random.uniform(source.weapon.min_factor, source.weapon.max_factor)
-            power = source.weapon.power * factor
+            log.title(f"Round {self.round}: waiting for actions from {len(waiting_on)} participants...")
+            desc = f"{living - len(waiting_on)} of {living} living participants have submitted an action."
+            if self.action_reminder_loop:
+                desc += f"\nReminder {self.action_reminder_loop} of 3, anyone left after that is forced to defend."
+            log.desc(desc + "\n\nUse one of the following commands to submit an action:")
+            log.field(title="!attack", desc="!attack <target>\nPhysically attack the target", inline=True)
+            log.field(title="!defend", desc="!defend\nDefending reduces any damage by half", inline=True)
+            # log.field(title="!cast", value="!cast <spell> <target>\nCast a spell you have learned on the target. For more information type !spells", inline=True)
+            # log.field(title="!use", value="!use <item> <target>\nUse an item on a target. For more information type !items", inline=True)
+            if waiting_on:
+                log.field(title="Waiting on", desc=report.clip(waiting_on))
+        if self.death_order:
+            log.field(title="Dead", desc=report.clip(self.death_order))
+        return log
+
+    def _rng_state(self):
+        """ The generators state, with it's hundreds of integers packed into a string """
+        version, internal, gauss = self.rng.getstate()
+        return [version, base64.b64encode(array.array('I', internal).tobytes()).decode(), gauss]
+
+    def _round_ready(self):
+        """ Has everyone still alive submitted an action? The dead can't submit actions, so only wait on the living """
+        return not self.participants.waiting
+
+    def speed_changed(self, name):
+        """ A participants speed changed, they move in the turn order from the next round """
+        self.turns.update(name, self.participants[name].speed.current)
+
+    def _kill(self, name):
+        """ A participant dies, returns False if they were already dead """
+        if not self.participants.kill(name):
+            return False
+        self.turns.remove(name)
+        return True
+
+    def _action(self, name, source, target=None):
+        """ Queue entry for an action """
+        if name == "attack":
+            return {"name": name, "action": self._attack, "args": [source, target]}
+        return {"name": name, "action": self._defend, "args": [source]}
 
-        # Damage is relative to power and physical strength ratio
-        # TODO: Misses, Saves, Crits
-        damage = max(1, int(power * physical_ratio))
+    def _attack(self, source, target):
+        """ Source attacks target """
+        damage = self._damage(source, target)
         target.life.current -= damage
 
         # TODO: Custom weapon messages?
-        self.action_log.field(
-            title=f"{source.name} attacks {target.name}",
-            desc=f"{source.name} deals {damage} to {target.name} with {source.weapon.name if source.weapon else 'EMPTY'}")
+        self.action_log.attack(source.name, target.name, damage, source.weapon.name if source.weapon else None)
 
-        if not target.is_alive():
-            self.death_order.append(target.name)
+        # Corpses can still be hit, but they only die once
+        if not target.is_alive() and self._kill(target.name):
             # TODO: Custom death messages?
-            self.action_log.field(
-                title=f"{target.name} dies!",
-                desc="It was nice knowing you..."
-            )
+            self.action_log.death(target.name)
+
+    def _damage(self, source, target):
+        """ Roll the damage of source attacking target """
+        # TODO: Misses, Saves, Crits
+        power = combat.roll(self.rng, source.weapon)
+        return combat.damage(power, source.body.current, target.body.current, target.defending)
 
     def _defend(self, source):
         """ Source defends """
         source.defending = True
-        self.action_log.field(
-            title=f"{source.name} defends for the turn",
-            desc=f"{source.name} takes half damage for the rest of the round"
-        )
+        self.action_log.defend(source.name)
+
+    def _use_batch(self):
+        """ Should rounds be resolved with the batch combat engine? """
+        return bool(self.batch_threshold and len(self.participants) >= self.batch_threshold and combat.available())
+
+    def _resolve_round(self):
+        """ Run the actions in turn order for the round """
+        if self.recorder is not None:
+            self.recorder.round(self.turn_order, self.actions)
+        if self._use_batch():
+            self._run_batch()
+            return
+
+        dead = self.participants.dead
+        for name in self.turn_order:
+            # Dead users skip over their turns
+            if name in dead:
+                continue
+
+            action = self.actions[name]['action']
+            args = self.actions[name]['args']
+            action(*args)
+
+    def _run_batch(self):
+        """ Resolve the whole round at once, summarizing it rather than logging every action """
+        if self.roster is None:
+            self.roster = combat.Roster(self.participants, self.death_order)
+        result = self.roster.resolve(self.turn_order, self.actions, self.rng.getrandbits(64))
+        for name in result.deaths:
+            self._kill(name)
+
+        self.action_log.totals(result.attacks, result.defends, result.damage, result.deaths)
+
+    def _save_replay(self):
+        """ Keep the finished battles replay on disk for auditing, written off the event loop """
+        if not self.replay_path:
+            return
+
+        name = f"{time.strftime('%Y%m%d_%H%M%S')}_{self.seed:016x}.replay"
+        self.replay_saved = self._parent.battles.writer.submit(
+            replay.save, self.replay_path, self.replay, name, self.replay_keep)
 
     def _defend_all(self):
         """ Everyone who has no action, will be forced to defend """
         for name in self.unsubmitted_participants:
             source = self.participants[name]
             self.submit_action(source, "defend")
+
+
+class RestoredChannel():
+    """ Stands in for a restored battles channel when there's no discord client to find it """
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.name = str(channel_id)
+
+    async def send(self, *args, **kwargs):
+        pass
+
+
+class RestoredMessage():
+    """ Restored battles have no command message to react to """
+    async def add_reaction(self, emoji):
+        pass
+
+
+class RestoredContext():
+    """ Context of a battle restored after a restart. The author is None when they couldn't be found """
+    def __init__(self, channel, author=None):
+        self.channel = channel
+        self.author = author
+        self.message = RestoredMessage()
+
+
+class BattleManager():
+    """ Runs many independent battles, one per channel """
+    def __init__(self, parent):
+        self._parent = parent
+        self.battles = {}
+        self.members = {}
+
+        # Replays are written by one background thread, so saving them never blocks a command
+        self.writer = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    @staticmethod
+    def key(ctx):
+        """ Battles are keyed by the channel they're in """
+        channel = getattr(ctx, 'channel', None)
+        return getattr(channel, 'id', None)
+
+    def get(self, ctx):
+        """ Get the battle for the context's channel, creating a stopped one if there isn't one yet
+
+            Only starting a new battle should create one, stopped battles are forgotten again by on_stop
+        """
+        key = self.key(ctx)
+        battle = self.battles.get(key)
+        if battle is None:
+            battle = BattleAPI(self._parent, key)
+            self.battles[key] = battle
+        return battle
+
+    def current(self, ctx):
+        """ Get the battle in the context's channel, there must be one """
+        battle = self.find(ctx)
+        if battle is None:
+            raise CommandError("There's no battle in this channel. Start one with !battle")
+        return battle
+
+    def find(self, ctx, battle_id=None):
+        """ Get the battle for the context's channel if it exists, and optionally if it's still the given battle """
+        return self.by_key(self.key(ctx), battle_id)
+
+    def by_key(self, key, battle_id=None):
+        """ Get the battle with a key if it exists, and optionally if it's still the given battle """
+        battle = self.battles.get(key)
+        if battle is None or (battle_id is not None and battle.id != battle_id):
+            return None
+        return battle
+
+    def remove(self, battle):
+        """ Forget a stopped battle """
+        if self.battles.get(battle.key) is battle:
+            del self.battles[battle.key]
+
+    def enter(self, name, battle):
+        """ Records a user joining a battle, fails if they're in a different one """
+        current = self.members.get(name.lower())
+        if current is not None and current is not battle:
+            return False
+        self.members[name.lower()] = battle
+        return True
+
+    def leave(self, name):
+        """ Records a user leaving their battle """
+        self.members.pop(name.lower(), None)
+
+    def battle_of(self, name):
+        """ Get the battle a user is taking part in, if any """
+        return self.members.get(name.lower())
+
+    def speed_changed(self, name):
+        """ A users speed changed, updating the turn order of the battle they're in """
+        battle = self.battle_of(name)
+        if battle is not None and name in battle.participants:
+            battle.speed_changed(name)
+
+    def restore(self, resolve_channel=None, resolve_user=None):
+        """ Resume every checkpointed battle, returning them
+
+            resolve_channel finds the channel for a battle key, battles whose channel is gone are dropped.
+            resolve_user finds who started the battle by their id.
+        """
+        checkpoints = self._parent.checkpoints
+        if checkpoints is None:
+            return []
+
+        restored = []
+        for data in checkpoints.load_all():
+            key = data['key']
+            channel = resolve_channel(key) if resolve_channel else RestoredChannel(key)
+            if channel is None or key in self.battles:
+                checkpoints.delete(key)
+                continue
+
+            author_id = data.get('author')
+            author = resolve_user(author_id) if resolve_user and author_id is not None else None
+
+            battle = BattleAPI(self._parent, key)
+            self.battles[key] = battle
+            try:
+                battle.restore(RestoredContext(channel, author), data)
+            except CommandError:
+                # Somebody taking part no longer exists
+                self.remove(battle)
+                checkpoints.delete(key)
+                continue
+            restored.append(battle)
+        return restored
+
+    def close(self):
+        """ Finish writing any replays """
+        self.writer.shutdown(wait=True)
+
+    def __len__(self):
+        return len(self.battles)
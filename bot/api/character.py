@@ -1,6 +1,10 @@
 """ Passive character commands """
 import os
-from bot.components import users
+import sys
+import asyncio
+import concurrent.futures
+from bot.components import users, storage
+from bot.components.cache import LRUCache
 from bot.api.errors import CommandError
 
 class CharacterAPI():
@@ -9,53 +13,204 @@ class CharacterAPI():
     def __init__(self, parent):
         self._parent = parent
 
-        self.cache = {}
-        self.load_all()
-
-    def load_all(self):
-        """ Loads all existing users from disk """
-        for entry in os.scandir(os.getenv('DATA_PATH')):
-            if entry.is_file():
-                file_no_ext = os.path.splitext(entry.name)[0]
-                parts = file_no_ext.split("_")
-                category = parts[0]
-
-                if category == 'user':
-                    fullpath = os.path.join(os.getenv('DATA_PATH'), entry.name)
-                    user = users.User.load(fullpath)
-                    lowercase = user.name.lower()
-                    self.cache[lowercase] = user
-                else:
-                    continue
+        self.storage = storage.create()
+
+        # Least recently used users are saved and dropped once the cache is full. A size of 0 is unbounded
+        self.cache = LRUCache(int(os.getenv('CACHE_SIZE', 0)), on_evict=self._evicted)
+
+        # Lazy mode only indexes stored users at startup, and loads them on their first use
+        self.lazy = os.getenv('LAZY_LOAD', 'false').lower() in ('1', 'true', 'yes')
+        self.index = set()
+        self.progress_interval = 1000
+
+        # Write-behind mode coalesces saves into periodic batches. An interval of 0 saves every change immediately
+        self.flush_interval = float(os.getenv('WRITE_BEHIND_INTERVAL', 0))
+        self.flush_threshold = int(os.getenv('WRITE_BEHIND_THRESHOLD', 50))
+        self.dirty = set()
+        self.flushed_writes = 0
+        self.coalesced_writes = 0
+        self._flush_event = None
+
+        # A single writer thread keeps batches in order and off the event loop
+        self._writer = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+        if self.lazy:
+            self.index_all()
+        else:
+            self.load_all()
+
+    def index_all(self):
+        """ Index all existing users in storage without loading them """
+        self.index = set(self.storage.keys())
+
+    def load_all(self, workers=None, processes=None):
+        """ Loads all existing users from storage, optionally reading them with a pool of workers """
+        if workers is None:
+            workers = int(os.getenv('LOAD_WORKERS', 0))
+        if processes is None:
+            processes = os.getenv('LOAD_PROCESSES', 'false').lower() in ('1', 'true', 'yes')
+
+        total = self.storage.count()
+        loaded = 0
+        for data in self.storage.read_all(workers, processes):
+            user = users.User.from_dict(data)
+            lowercase = user.name.lower()
+            self.cache[lowercase] = user
+            self.index.add(self.storage.key(user.name))
+
+            loaded += 1
+            if loaded % self.progress_interval == 0 or loaded == total:
+                self._report_progress(loaded, total)
+
+    def _report_progress(self, loaded, total):
+        """ Report boot progress to stdout """
+        sys.stdout.write(f"Loaded {loaded}/{total} characters\n")
+        sys.stdout.flush()
+
+    def exists(self, username):
+        """ Checks for a user in cache or storage without loading it """
+        return username.lower() in self.cache or self.storage.key(username) in self.index
 
     def create_missing(self, names):
         """ Create any missing characters in the name list """
         for name in names:
             # Skip existing characters
-            lowercase = name.lower()
-            if lowercase in self.cache:
+            if self.exists(name):
                 continue
 
             self.create(name)
 
     def create(self, username):
         """ Creates a new user and saves to disk """
-        lowercase = username.lower()
-        if lowercase in self.cache:
+        if self.exists(username):
             raise CommandError(f"Can't create {username} character because it already exists")
 
         user = users.User.create(username)
+        lowercase = username.lower()
+        self.index.add(self.storage.key(username))
+
+        # Saved or marked dirty before it's cached, so it's never lost if something else gets evicted for it
+        if self.flush_interval:
+            self.dirty.add(lowercase)
+        elif hasattr(self.storage, 'append'):
+            self._journal(username, [('put', user.to_dict())])
+            self.flushed_writes += 1
+        else:
+            self.storage.write(user.to_dict())
+            self.flushed_writes += 1
         self.cache[lowercase] = user
-        self.save(username)
+        self._check_threshold()
 
         return user
 
+    @property
+    def pending_writes(self):
+        """ Number of users with changes waiting to be flushed """
+        return len(self.dirty)
+
     def save(self, username):
-        """ Saves the username to disk """
+        """ Saves the username to storage, or marks it dirty in write-behind mode """
         user = self.get(username)
-        underscored_name = user.name.replace(' ', '_')
-        filename = os.path.join(os.getenv('DATA_PATH'), f'user_{underscored_name}.json')
-        user.save(filename)
+        if not self.flush_interval:
+            self.storage.write(user.to_dict())
+            self.flushed_writes += 1
+            return
+
+        lowercase = user.name.lower()
+        if lowercase in self.dirty:
+            self.coalesced_writes += 1
+        self.dirty.add(lowercase)
+        self._check_threshold()
+
+    def record(self, username, *changes):
+        """ Persist a users mutations, as journal appends when the storage supports it or by saving the user """
+        # Anything that changed them may change who they'd beat
+        if self._parent is not None:
+            self._parent.odds.invalidate(username)
+
+        if not hasattr(self.storage, 'append'):
+            self.save(username)
+            return
+
+        user = self.get(username)
+        self._journal(user.name, changes)
+
+    def _journal(self, name, changes):
+        """ Queue journal appends on the writer, so commands never wait on it's fsyncs or compactions """
+        def append():
+            for change in changes:
+                self.storage.append(name, *change)
+        self._writer.submit(append).add_done_callback(self._journal_failed)
+
+    @staticmethod
+    def _journal_failed(future):
+        """ Nothing waits on appends, so report the ones that failed """
+        if future.exception() is not None:
+            sys.stderr.write(f"Failed to journal a change: {future.exception()}\n")
+
+    def flush(self):
+        """ Synchronously writes every dirty user and anything journaled, returns the number of users written """
+        datas = self._take_dirty()
+        self._writer.submit(self.storage.write_many, datas).result()
+        if hasattr(self.storage, 'sync'):
+            self._writer.submit(self.storage.sync).result()
+        self.flushed_writes += len(datas)
+        return len(datas)
+
+    async def flush_loop(self):
+        """ Background task flushing dirty users every interval or when the threshold is hit """
+        self._flush_event = asyncio.Event()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._flush_event.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._flush_event.clear()
+
+                if not self.dirty:
+                    continue
+                # Shielded so a shutdown mid-flush can't cancel a batch that's already left the dirty set
+                datas = self._take_dirty()
+                await asyncio.shield(asyncio.wrap_future(self._writer.submit(self.storage.write_many, datas)))
+                self.flushed_writes += len(datas)
+        finally:
+            self._flush_event = None
+
+    def close(self):
+        """ Flush everything still pending and release storage """
+        self.flush()
+        self._writer.shutdown(wait=True)
+        self.storage.close()
+
+    def pin(self, username):
+        """ Keep a user in cache until it's unpinned, such as while it's in battle """
+        self.cache.pin(username.lower())
+
+    def unpin(self, username):
+        """ Allow a pinned user to be evicted again """
+        self.cache.unpin(username.lower())
+
+    def _evicted(self, lowercase, user):
+        """ Saves dirty users as they're evicted from cache """
+        if lowercase in self.dirty:
+            self.dirty.discard(lowercase)
+            self._writer.submit(self.storage.write, user.to_dict()).result()
+            self.flushed_writes += 1
+
+    def _check_threshold(self):
+        """ Too many pending changes, flush early """
+        if self.flush_interval and len(self.dirty) >= self.flush_threshold:
+            if self._flush_event:
+                self._flush_event.set()
+            else:
+                self.flush()
+
+    def _take_dirty(self):
+        """ Serialize and clear the dirty set """
+        datas = [self.cache.peek(x).to_dict() for x in self.dirty if x in self.cache]
+        self.dirty = set()
+        return datas
 
     def get(self, username):
         """ Gets the named user instance prefering cache over disk"""
@@ -67,14 +222,13 @@ class CharacterAPI():
 
         try:
             return self.load(username)
-        except FileNotFoundError:
+        except KeyError:
             raise CommandError(f"Could not find {username} in cache or on disk")
 
     def load(self, username):
-        """ Instantiate the named user instance from disk """
-        underscored_name = username.replace(' ', '_')
-        filename = os.path.join(os.getenv('DATA_PATH'), f'user_{underscored_name}.json')
-        user = users.User.load(filename)
+        """ Instantiate the named user instance from storage """
+        # Read on the writer so it sees everything queued before it
+        user = users.User.from_dict(self._writer.submit(self.storage.read, username).result())
 
         lowercase = username.lower()
         self.cache[lowercase] = user
@@ -84,12 +238,11 @@ class CharacterAPI():
         """ Save then unload a user from cache """
         # Load and save the user first
         user = self.get(username)
-        underscored_name = user.name.replace(' ', '_')
-        filename = os.path.join(os.getenv('DATA_PATH'), f'user_{underscored_name}.json')
-        user.save(filename)
+        self._writer.submit(self.storage.write, user.to_dict()).result()
 
         # Ensure the user is unloaded
         lowercase = username.lower()
+        self.dirty.discard(lowercase)
         del self.cache[lowercase]
 
     def stats(self, username):
@@ -129,17 +282,15 @@ class CharacterAPI():
         """ Equip an item by name"""
         target = self.get(username)
 
-        item = None
-        for entry in target.inventory:
-            if entry['item'].name == name:
-                item = entry['item']
-        if item is None:
+        entry = target.inventory.get(name)
+        if entry is None:
             raise CommandError(f"Could not find {name} in {target.name}'s inventory")
+        item = entry['item']
 
         if not target.equip(item):
             raise CommandError(f"Could not equip {name}")
 
-        self.save(username)
+        self.record(username, ('equip', name))
 
     def unequip(self, username, slot):
         """ Unequip anything in a slot """
@@ -147,7 +298,7 @@ class CharacterAPI():
         if not target.unequip(slot):
             raise CommandError(f"Invalid equipment slot: {slot}")
 
-        self.save(username)
+        self.record(username, ('unequip', slot))
 
     def give_xp(self, ctx, username, xp):
         """ Give a character experience by username, returns a True if it triggers a level up """
@@ -167,7 +318,8 @@ class CharacterAPI():
             levels += 1
             target.level_up()
 
-        if levels:
+        # Restored battles may not know who to message
+        if levels and ctx.author is not None:
             log = self._parent.logger.entry()
             log.title(f"You've gained {levels} level(s)!")
             log.desc(f"Each level gives you 5 additional points you can spend to increase your base stats. You currently have {target.points} points to spend.")
@@ -179,7 +331,7 @@ class CharacterAPI():
                    `!restart`""")
             log.buffer(ctx.author)
 
-        self.save(username)
+        self.record(username, ('gain_xp', xp), *[('level_up',)] * levels)
 
     def give_gold(self, username, gold):
         """ Give a character gold by username """
@@ -192,7 +344,7 @@ class CharacterAPI():
 
         target = self.get(username)
         target.earn(gold)
-        self.save(username)
+        self.record(username, ('earn', gold))
 
     def spend_points(self, username, stat_name, points=1):
         """ Spend stat points for a given username """
@@ -212,10 +364,12 @@ class CharacterAPI():
             raise CommandError(f"You can't spend more points than you have! ({target.points} points)")
 
         target.upgrade(stat_name_lower, points)
-        self.save(username)
+        self.record(username, ('upgrade', stat_name_lower, points))
+        self._parent.battles.speed_changed(target.name)
 
     def restart_points(self, username):
         """ Nullifies all spent stat points and puts them back into the pool to start over """
         target = self.get(username)
         target.restart()
-        self.save(username)
+        self.record(username, ('restart',))
+        self._parent.battles.speed_changed(target.name)
@@ -0,0 +1,108 @@
+""" Win probability estimates """
+import os
+import asyncio
+import concurrent.futures
+from bot.components import odds
+from bot.components.cache import LRUCache
+from bot.api.errors import CommandError
+
+class OddsAPI():
+    """ Estimates who's likely to win by simulating battles, caching results by the fighters fingerprints """
+    def __init__(self, parent):
+        self._parent = parent
+
+        # Entries are keyed by stats and gear, and dropped when CharacterAPI changes someone in them
+        self.cache = LRUCache(int(os.getenv('ODDS_CACHE_SIZE', 1000)), on_evict=self._evicted)
+        self.invalidations = 0
+        self._keys = {}
+
+        # Simulations stop after the budget, and anything not back by the timeout is given up on
+        self.trials = int(os.getenv('ODDS_TRIALS', 2000))
+        self.budget = float(os.getenv('ODDS_BUDGET', 0.25))
+        self.timeout = float(os.getenv('ODDS_TIMEOUT', 2.0))
+
+        # Simulations run in a worker process so they never hold up the event loop, and identical requests share one
+        self._executor = None
+        self._running = {}
+
+    def estimate(self, users):
+        """ Win chances of the users fighting each other, simulated right here """
+        key = tuple(odds.fighter(x) for x in users)
+        try:
+            return self.cache[key][1]
+        except KeyError:
+            pass
+
+        result = odds.simulate(key, self.trials, self.budget)
+        self._store(key, users, result)
+        return result
+
+    async def estimate_async(self, users):
+        """ Win chances of the users fighting each other, simulated off the event loop """
+        key = tuple(odds.fighter(x) for x in users)
+        try:
+            return self.cache[key][1]
+        except KeyError:
+            pass
+
+        future = self._running.get(key)
+        if future is None:
+            if self._executor is None:
+                self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=1)
+            loop = asyncio.get_running_loop()
+            future = asyncio.ensure_future(loop.run_in_executor(
+                self._executor, odds.simulate, key, self.trials, self.budget))
+            self._running[key] = future
+            future.add_done_callback(lambda _: self._running.pop(key, None))
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise CommandError("Working out the odds took too long, try again in a moment")
+
+        self._store(key, users, result)
+        return result
+
+    async def matchup(self, first, second):
+        """ Users and odds of a fight between two characters """
+        users = [self._parent.character.get(first), self._parent.character.get(second)]
+        if users[0] is users[1]:
+            raise CommandError("Pick two different characters to work out the odds for")
+        return users, await self.estimate_async(users)
+
+    async def battle(self, battle):
+        """ Users and odds of everyone still alive in a battle """
+        users = [battle.participants[x] for x in battle.participants.living()]
+        return users, await self.estimate_async(users)
+
+    def invalidate(self, username):
+        """ Forget every estimate a user is part of, their stats or gear changed """
+        for key in list(self._keys.get(username.lower(), ())):
+            value = self.cache.peek(key)
+            if value is not None:
+                del self.cache[key]
+                self._evicted(key, value)
+                self.invalidations += 1
+        self._keys.pop(username.lower(), None)
+
+    def close(self):
+        """ Stop the simulation worker """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _store(self, key, users, result):
+        """ Cache a result, indexed by everyone in it """
+        names = [x.name.lower() for x in users]
+        self.cache[key] = (names, result)
+        for name in names:
+            self._keys.setdefault(name, set()).add(key)
+
+    def _evicted(self, key, value):
+        """ Keep the name index from growing with entries that are gone, evicted or invalidated """
+        for name in value[0]:
+            keys = self._keys.get(name)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys[name]
@@ -26,21 +26,21 @@ class ShopAPI():
 
                 fullpath = os.path.join(os.getenv('DATA_PATH'), entry.name)
                 if category == 'sword':
-                    self.weapons.append(stuff.Sword.load(fullpath))
+                    self.weapons.append(stuff.register(stuff.Sword.load(fullpath)))
                 elif category == 'axe':
-                    self.weapons.append(stuff.Axe.load(fullpath))
+                    self.weapons.append(stuff.register(stuff.Axe.load(fullpath)))
                 elif category == 'bow':
-                    self.weapons.append(stuff.Bow.load(fullpath))
+                    self.weapons.append(stuff.register(stuff.Bow.load(fullpath)))
                 elif category == 'armor':
-                    self.armor.append(stuff.Armor.load(fullpath))
+                    self.armor.append(stuff.register(stuff.Armor.load(fullpath)))
                 elif category == 'accessory':
-                    self.accessories.append(stuff.Accessory.load(fullpath))
+                    self.accessories.append(stuff.register(stuff.Accessory.load(fullpath)))
                 else:
                     continue
 
     def create(self, **kwargs):
         """ Creates the appropriate instance from the saved dictionary """
-        new = stuff.factory(**kwargs)
+        new = stuff.register(stuff.factory(**kwargs))
         if isinstance(new, stuff.Weapon):
             self.weapons.append(new)
         elif isinstance(new, stuff.Armor):
@@ -189,16 +189,13 @@ class ShopAPI():
         target.give(item, quantity)
 
         # Save the character
-        self._parent.character.save(target.name)
+        self._parent.character.record(target.name, ('spend', cost), ('give', item.to_dict(), quantity))
 
     def sell(self, target, name, quantity=1):
         """ Sell x item's from a users inventory """
         # Ensure user has enough to sell
-        value = 0
-        for entry in target.inventory:
-            if entry['item'].name == name:
-                value = entry['item'].value * quantity
-                break
+        entry = target.inventory.get(name)
+        value = entry['item'].value * quantity if entry else 0
 
         # Do the transaction
         if not target.drop(name, quantity):
@@ -206,4 +203,4 @@ class ShopAPI():
         target.earn(value)
 
         # Save the character
-        self._parent.character.save(target.name)
+        self._parent.character.record(target.name, ('drop', name, quantity), ('earn', value))
@@ -0,0 +1,159 @@
+""" Compact versioned binary format for serialized users
+
+    Layout (little endian)
+        header      4s magic, B version
+        stats       I level, I experience, I points, I body, I mind, I agility, q gold
+        name        H length, utf-8 bytes
+        equipment   weapon, armor and accessory items
+        spells      H count, items
+        inventory   H count, (item, I quantity) pairs
+
+    Items are a B tag followed by it's data
+        0 empty slot
+        1 catalog reference, H length, utf-8 catalog name
+        2 inline item, I length, marshalled attribute dictionary
+"""
+import struct
+import marshal
+from bot.components import stuff
+
+MAGIC = b'RPGU'
+VERSION = 1
+
+HEADER = struct.Struct('<4sB')
+STATS = struct.Struct('<IIIIIIq')
+SHORT = struct.Struct('<H')
+LONG = struct.Struct('<I')
+TAG = struct.Struct('<B')
+
+EMPTY = 0
+CATALOG = 1
+INLINE = 2
+
+SLOTS = ['weapon', 'armor', 'accessory']
+
+
+def is_binary(raw):
+    """ Detects the binary format by it's magic bytes """
+    return raw[:len(MAGIC)] == MAGIC
+
+
+def encode(data):
+    """ Encode a serialized user dictionary """
+    out = [
+        HEADER.pack(MAGIC, VERSION),
+        STATS.pack(
+            data['level'], data['experience'], data['points'],
+            data['body_points'], data['mind_points'], data['agility_points'],
+            data['gold']),
+        pack_string(data['name'])
+    ]
+
+    for slot in SLOTS:
+        out.append(pack_item(data.get(slot)))
+
+    out.append(SHORT.pack(len(data['spells'])))
+    for item in data['spells']:
+        out.append(pack_item(item))
+
+    out.append(SHORT.pack(len(data['inventory'])))
+    for entry in data['inventory']:
+        out.append(pack_item(entry['item']))
+        out.append(LONG.pack(entry['quantity']))
+
+    return b''.join(out)
+
+
+def decode(raw):
+    """ Decode bytes back into a serialized user dictionary """
+    magic, version = HEADER.unpack_from(raw, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a binary user record")
+    if version != VERSION:
+        raise ValueError(f"Unsupported binary user version {version}")
+    offset = HEADER.size
+
+    level, experience, points, body, mind, agility, gold = STATS.unpack_from(raw, offset)
+    offset += STATS.size
+    name, offset = unpack_string(raw, offset)
+
+    data = {
+        'name'           : name,
+        'level'          : level,
+        'experience'     : experience,
+        'points'         : points,
+        'body_points'    : body,
+        'mind_points'    : mind,
+        'agility_points' : agility,
+        'gold'           : gold
+    }
+
+    for slot in SLOTS:
+        data[slot], offset = unpack_item(raw, offset)
+
+    count, = SHORT.unpack_from(raw, offset)
+    offset += SHORT.size
+    data['spells'] = []
+    for _ in range(count):
+        item, offset = unpack_item(raw, offset)
+        data['spells'].append(item)
+
+    count, = SHORT.unpack_from(raw, offset)
+    offset += SHORT.size
+    data['inventory'] = []
+    for _ in range(count):
+        item, offset = unpack_item(raw, offset)
+        quantity, = LONG.unpack_from(raw, offset)
+        offset += LONG.size
+        data['inventory'].append({'item': item, 'quantity': quantity})
+
+    return data
+
+
+def pack_string(value):
+    """ Length prefixed utf-8 string """
+    raw = value.encode('utf-8')
+    return SHORT.pack(len(raw)) + raw
+
+
+def unpack_string(raw, offset):
+    """ Length prefixed utf-8 string """
+    length, = SHORT.unpack_from(raw, offset)
+    offset += SHORT.size
+    return raw[offset:offset + length].decode('utf-8'), offset + length
+
+
+def pack_item(item, catalog=True):
+    """ Catalog items are stored by reference, anything unique or modified is stored inline """
+    if not item:
+        return TAG.pack(EMPTY)
+
+    known = stuff.CATALOG.get(item['name']) if catalog else None
+    if known is not None and known.to_dict() == item:
+        return TAG.pack(CATALOG) + pack_string(item['name'])
+
+    raw = marshal.dumps(item)
+    return TAG.pack(INLINE) + LONG.pack(len(raw)) + raw
+
+
+def unpack_item(raw, offset):
+    """ Rebuild an items attribute dictionary """
+    tag, = TAG.unpack_from(raw, offset)
+    offset += TAG.size
+
+    if tag == EMPTY:
+        return None, offset
+
+    if tag == CATALOG:
+        name, offset = unpack_string(raw, offset)
+        try:
+            return stuff.CATALOG[name].to_dict(), offset
+        except KeyError:
+            raise KeyError(f"Saved item {name} is no longer in the catalog")
+
+    if tag == INLINE:
+        length, = LONG.unpack_from(raw, offset)
+        offset += LONG.size
+        return marshal.loads(raw[offset:offset + length]), offset + length
+
+    raise ValueError(f"Bad item tag {tag}")
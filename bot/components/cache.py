@@ -0,0 +1,109 @@
+""" Caching tools """
+from collections import OrderedDict
+
+
+class LRUCache():
+    """ Dictionary like cache that evicts the least recently used entries past it's max size """
+    def __init__(self, max_size=0, on_evict=None):
+        self.max_size = max_size # 0 is unbounded
+        self.on_evict = on_evict
+        self.pinned = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._data = OrderedDict()
+
+    def __getitem__(self, key):
+        """ Get an entry, marking it as the most recently used """
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            raise
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key, default=None):
+        """ Get an entry without counting it as a use or changing when it's evicted """
+        return self._data.get(key, default)
+
+    def __setitem__(self, key, value):
+        """ Add or replace an entry, then evict anything over the limit """
+        self._data[key] = value
+        self._data.move_to_end(key)
+        self._evict(keep=key)
+
+    def __delitem__(self, key):
+        del self._data[key]
+
+    def __contains__(self, key):
+        """ Checks for an entry without counting it as a use """
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def keys(self):
+        return self._data.keys()
+
+    def values(self):
+        return self._data.values()
+
+    def items(self):
+        return self._data.items()
+
+    def pin(self, key):
+        """ Pinned entries are never evicted """
+        self.pinned.add(key)
+
+    def unpin(self, key):
+        """ Allow a pinned entry to be evicted again """
+        self.pinned.discard(key)
+        self._evict()
+
+    def stats(self):
+        """ Cache usage metrics for sizing """
+        lookups = self.hits + self.misses
+        return {
+            'size'     : len(self._data),
+            'max_size' : self.max_size,
+            'pinned'   : len(self.pinned),
+            'hits'     : self.hits,
+            'misses'   : self.misses,
+            'evictions': self.evictions,
+            'hit_rate' : self.hits / lookups if lookups else 0.0
+        }
+
+    def _evict(self, keep=None):
+        """ Evict the least recently used unpinned entries until under the limit
+
+            The entry being added is never evicted, the cache grows past it's limit instead when everything else
+            is pinned.
+        """
+        if not self.max_size:
+            return
+
+        # Pinned entries get skipped over by moving them to the back of the line
+        skipped = 0
+        while len(self._data) > self.max_size and skipped < len(self._data):
+            key = next(iter(self._data))
+            if key in self.pinned or key == keep:
+                self._data.move_to_end(key)
+                skipped += 1
+                continue
+
+            value = self._data.pop(key)
+            self.evictions += 1
+            if self.on_evict:
+                self.on_evict(key, value)
+
+        # Skipped pinned entries moved behind the one being added, which is still the most recently used
+        if keep is not None and keep in self._data:
+            self._data.move_to_end(keep)
@@ -0,0 +1,117 @@
+""" Crash safe checkpoints of in progress battles """
+import json
+import asyncio
+import sqlite3
+import threading
+import concurrent.futures
+
+
+class CheckpointStore():
+    """ Small SQLite store holding the latest checkpoint of each battle
+
+        Saves are queued and written by a single background thread, so they never block the event loop.
+        Checkpoints for the same battle that queue up before the writer gets to them are coalesced into
+        the latest one, and everything queued is written in one transaction.
+
+        With an interval, battles are only marked dirty as they change and snapshotted once per interval,
+        so a massive battle isn't snapshotted again for every action submitted.
+    """
+    def __init__(self, filename, interval=0.0):
+        self.filename = filename
+        self.interval = interval
+        self.dirty = {}
+        self.saved = set()
+        self.writes = 0
+        self.coalesced = 0
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._scheduled = False
+        self._writer = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+        self._db = sqlite3.connect(filename, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS battles (key TEXT PRIMARY KEY, data TEXT NOT NULL)')
+        self._db.commit()
+
+    def track(self, battle):
+        """ Checkpoint a battle that changed, or mark it dirty in interval mode """
+        if not self.interval:
+            self.save(battle.key, battle.checkpoint())
+            return
+
+        if battle.key in self.dirty:
+            self.coalesced += 1
+        self.dirty[battle.key] = battle
+
+    def flush(self):
+        """ Snapshot every dirty battle and queue their writes, returns the number snapshotted """
+        dirty = self.dirty
+        self.dirty = {}
+        for key, battle in dirty.items():
+            self.save(key, battle.checkpoint())
+        return len(dirty)
+
+    async def flush_loop(self):
+        """ Background task snapshotting dirty battles every interval """
+        while True:
+            await asyncio.sleep(self.interval)
+            self.flush()
+
+    def save(self, key, data):
+        """ Queue a battle checkpoint of plain values, replacing the previous one """
+        self.saved.add(key)
+        self._queue(json.dumps(key), data)
+
+    def delete(self, key):
+        """ Queue removing a battle that has ended """
+        # Battles that ended before their first snapshot have nothing to remove
+        self.dirty.pop(key, None)
+        if key in self.saved:
+            self.saved.discard(key)
+            self._queue(json.dumps(key), None)
+
+    def sync(self):
+        """ Wait for every queued write to finish """
+        self._writer.submit(int).result()
+
+    def load_all(self):
+        """ Every saved checkpoint """
+        self.sync()
+        result = [json.loads(x[0]) for x in self._db.execute('SELECT data FROM battles')]
+        self.saved.update(x['key'] for x in result)
+        return result
+
+    def close(self):
+        """ Finish writing and release the database """
+        self.flush()
+        self.sync()
+        self._writer.shutdown(wait=True)
+        self._db.close()
+
+    def _queue(self, key, data):
+        """ Queue a write, only scheduling the writer if it isn't already going to run """
+        with self._lock:
+            if key in self._pending:
+                self.coalesced += 1
+            self._pending[key] = data
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._writer.submit(self._flush)
+
+    def _flush(self):
+        """ Write everything queued so far in a single transaction """
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            self._scheduled = False
+
+        with self._db:
+            for key, data in pending.items():
+                if data is None:
+                    self._db.execute('DELETE FROM battles WHERE key = ?', (key,))
+                else:
+                    self._db.execute('INSERT OR REPLACE INTO battles VALUES (?, ?)', (key, json.dumps(data)))
+        self.writes += len(pending)
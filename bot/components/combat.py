@@ -0,0 +1,181 @@
+""" Batch combat engine for massive battles
+
+    Resolves a whole round of queued actions with NumPy arrays instead of one action at a time. The
+    damage of every attack is known up front, since the only things that change mid round are who is
+    alive and who is defending, and defending only depends on the turn order.
+
+    The round is then resolved in waves. Each wave assumes every remaining attacker survives long
+    enough to act, and finds the attack that kills each target. Everything before the first turn taken
+    by someone who was already dead is exact, so it's committed and the next wave starts from there
+    without the dead attacker.
+
+    NumPy is optional, battles fall back to resolving actions one at a time without it.
+"""
+import random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def available():
+    """ Is the batch engine usable? """
+    return numpy is not None
+
+
+def roll(rng, weapon):
+    """ Power of an attack rolled from the weapon, unarmed attacks have a fixed power of 1 """
+    if not weapon:
+        return 1.0
+    return weapon.power * rng.uniform(weapon.min_factor, weapon.max_factor)
+
+
+def damage(power, source_body, target_body, defending=False):
+    """ Damage of an attack relative to it's power and the physical strength ratio, halved against defenders """
+    ratio = source_body / float(target_body)
+    if defending:
+        ratio /= 2.0
+    return max(1, int(power * ratio))
+
+
+class RoundResult():
+    """ What happened during a batch resolved round """
+    __slots__ = ('attacks', 'defends', 'damage', 'deaths')
+
+    def __init__(self):
+        self.attacks = 0
+        self.defends = 0
+        self.damage = 0
+        self.deaths = []
+
+
+class Roster():
+    """ Battle participants stats as arrays
+
+        Stats, gear and even life can change between rounds, such as upgrading body restoring life, so they're
+        gathered again at the start of every round. Life changes are written back to the users as they happen.
+    """
+    def __init__(self, participants, dead=()):
+        if numpy is None:
+            raise RuntimeError("The batch combat engine requires numpy")
+
+        self.names = list(participants)
+        self.users = [participants[name] for name in self.names]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.dead = set(dead)
+        count = len(self.names)
+
+        self.is_dead = numpy.zeros(count, bool)
+        self.is_dead[[self.index[name] for name in self.dead]] = True
+        self.refresh()
+
+    def refresh(self):
+        """ Gather everyone's current life, strength and gear """
+        count = len(self.users)
+        self.life = numpy.fromiter((x.life.current for x in self.users), numpy.int64, count)
+        self.body = numpy.fromiter((x.body.current for x in self.users), numpy.float64, count)
+
+        # Unarmed attacks have a fixed power of 1
+        weapons = [x.weapon for x in self.users]
+        self.armed = numpy.fromiter((x is not None for x in weapons), bool, count)
+        self.power = numpy.fromiter((x.power if x else 1.0 for x in weapons), numpy.float64, count)
+        self.low = numpy.fromiter((x.min_factor if x else 1.0 for x in weapons), numpy.float64, count)
+        self.high = numpy.fromiter((x.max_factor if x else 1.0 for x in weapons), numpy.float64, count)
+
+    def resolve(self, turn_order, actions, seed=None):
+        """ Resolve a rounds submitted {'name', 'args'} actions and write the results back to the users
+
+            The weapon rolls are seeded by seed, or from the random module when not given
+        """
+        rng = numpy.random.default_rng(random.getrandbits(64) if seed is None else seed)
+        self.refresh()
+
+        # Queue up the living actors in turn order
+        index = self.index
+        source = []
+        target = []
+        for name in turn_order:
+            if name in self.dead or name not in actions:
+                continue
+            action = actions[name]
+            source.append(index[name])
+            target.append(index[action['args'][1].name] if action['name'] == 'attack' else -1)
+
+        result = RoundResult()
+        count = len(self.names)
+        turns = len(source)
+        source = numpy.array(source, numpy.int64)
+        target = numpy.array(target, numpy.int64)
+        attacking = target >= 0
+        target[~attacking] = source[~attacking]
+        position = numpy.arange(turns)
+
+        # Everyone acts once a round, so a defend covers every attack that comes after it's turn
+        defend_turn = numpy.full(count, turns)
+        defend_turn[source[~attacking]] = position[~attacking]
+
+        # The same rules as roll() and damage(), for every attack at once
+        power = numpy.where(
+            self.armed[source],
+            self.power[source] * rng.uniform(self.low[source], self.high[source]),
+            1.0)
+        ratio = self.body[source] / self.body[target]
+        ratio = numpy.where(defend_turn[target] < position, ratio / 2.0, ratio)
+        damage = numpy.maximum(1, (power * ratio).astype(numpy.int64))
+        damage[~attacking] = 0
+
+        acts = numpy.full(count, -1)
+        acts[source] = position
+        life = self.life
+        is_dead = self.is_dead
+        valid = numpy.ones(turns, bool)
+        start = 0
+        while start < turns:
+            live = numpy.flatnonzero(valid[start:] & attacking[start:]) + start
+            if not live.size:
+                break
+
+            # Running damage per target, in turn order
+            turn = live[numpy.argsort(target[live], kind='stable')]
+            hit = target[turn]
+            total = numpy.cumsum(damage[turn])
+            firsts = numpy.r_[0, numpy.flatnonzero(numpy.diff(hit)) + 1]
+            sizes = numpy.diff(numpy.r_[firsts, hit.size])
+            total -= numpy.repeat(total[firsts] - damage[turn[firsts]], sizes)
+
+            # The first attack to bring each living target to 0 kills it
+            kills = (total >= life[hit]) & ~is_dead[hit]
+            victims, first = numpy.unique(hit[kills], return_index=True)
+            death_turn = turn[kills][first]
+
+            # Nothing from the first turn of someone who's already dead on can be trusted
+            too_late = acts[victims] > death_turn
+            cutoff = acts[victims][too_late].min() if too_late.any() else turns
+
+            # Commit the exact part of the wave
+            done = live[live < cutoff]
+            life -= numpy.bincount(target[done], damage[done], count).astype(numpy.int64)
+            numpy.maximum(life, 0, out=life)
+            result.damage += int(damage[done].sum())
+
+            final = death_turn < cutoff
+            victims = victims[final]
+            death_turn = death_turn[final]
+            for i in numpy.argsort(death_turn, kind='stable'):
+                result.deaths.append(self.names[victims[i]])
+            is_dead[victims] = True
+            valid[acts[victims][acts[victims] > death_turn]] = False
+
+            start = cutoff
+        self.dead.update(result.deaths)
+
+        # Write everything back
+        result.attacks = int((valid & attacking).sum())
+        for i in source[valid & ~attacking].tolist():
+            self.users[i].defending = True
+            result.defends += 1
+        for i in numpy.unique(target[valid & attacking]).tolist():
+            self.users[i].life.current = int(life[i])
+
+        return result
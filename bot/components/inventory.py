@@ -0,0 +1,49 @@
+""" Inventory container """
+
+
+class Inventory():
+    """ Inventory entries of {'item', 'quantity'} keyed by item name, in the order they were first added """
+    __slots__ = ('_entries',)
+
+    def __init__(self):
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        """ Iterates the entries in display order """
+        return iter(self._entries.values())
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __getitem__(self, index):
+        """ Positional access for display, use get for lookups by name """
+        return list(self._entries.values())[index]
+
+    def get(self, name):
+        """ Get an entry by item name """
+        return self._entries.get(name)
+
+    def add(self, item, quantity=1):
+        """ Stack items onto an existing entry or create a new one """
+        entry = self._entries.get(item.name)
+        if entry is not None:
+            entry['quantity'] += quantity
+            return entry
+
+        entry = {'item': item, 'quantity': quantity}
+        self._entries[item.name] = entry
+        return entry
+
+    def remove(self, name, quantity=1):
+        """ Remove items by name, dropping the entry when none are left """
+        entry = self._entries.get(name)
+        if entry is None or entry['quantity'] < quantity:
+            return False
+
+        entry['quantity'] -= quantity
+        if entry['quantity'] < 1:
+            del self._entries[name]
+        return True
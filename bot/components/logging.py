@@ -1,9 +1,157 @@
 """ Logging tools """
 import sys
+import asyncio
+import inspect
 import functools
+import contextlib
+import contextvars
+from collections import deque
 from datetime import datetime
 from discord import Embed
 from bot.api.errors import CommandError
+from bot.components.sender import SendPipeline
+
+
+# Discord allows up to 10 embeds a message, with up to 6000 characters between them
+MAX_EMBEDS = 10
+MAX_MESSAGE_SIZE = 6000
+
+
+def pack(embeds, max_embeds=MAX_EMBEDS, max_size=MAX_MESSAGE_SIZE):
+    """ Splits embeds into as few messages as discord allows, keeping their order """
+    messages = []
+    current = []
+    size = 0
+    for embed in embeds:
+        length = len(embed)
+        if current and (len(current) >= max_embeds or size + length > max_size):
+            messages.append(current)
+            current = []
+            size = 0
+        current.append(embed)
+        size += length
+    if current:
+        messages.append(current)
+    return messages
+
+
+_multi_embed = {}
+
+def multi_embed(target):
+    """ Can target send more than one embed a message?
+
+        Not with the pinned discord.py 1.6, it's send only takes one. Until it's upgraded every entry is sent as
+        it's own message, and packing only applies to targets whose send takes embeds=.
+    """
+    kind = type(target)
+    if kind not in _multi_embed:
+        _multi_embed[kind] = 'embeds' in inspect.signature(target.send).parameters
+    return _multi_embed[kind]
+
+
+async def send_embeds(target, embeds):
+    """ Sends a list of embeds to a channel or user as one message, it has to support them all """
+    if len(embeds) == 1:
+        return await target.send(embed=embeds[0])
+    return await target.send(embeds=embeds)
+
+
+class LogScope():
+    """ Entries finished during one command, waiting to be sent """
+    def __init__(self):
+        self.ready = deque()
+
+
+# The scope of the command running in the current task, each task has it's own
+_scope = contextvars.ContextVar('log_scope', default=None)
+
+
+class LiveMessage():
+    """ A message that's sent once and then edited in place whenever it changes
+
+        Updates only mark it as changed, and it's rendered and edited at most once an interval, so a burst of
+        changes costs one edit. Closing it publishes the final version straight away and stops any more updates.
+    """
+    def __init__(self, logger, target, render, interval):
+        self.logger = logger
+        self.target = target
+        self.render = render
+        self.interval = interval
+        self.message = None
+        self.final = None
+        self.closed = False
+        self.dirty = False
+        self.published = None
+        self.task = None
+        self._wake = None
+
+        self.updates = 0
+        self.sends = 0
+        self.edits = 0
+
+    def update(self):
+        """ Something shown changed, publish it with the next edit """
+        if self.closed:
+            return
+        self.updates += 1
+        self.dirty = True
+        self._start()
+
+    def close(self, entry=None):
+        """ Publish the final version, given or rendered right now, and stop updating """
+        if self.closed:
+            return
+        self.final = entry or self.render()
+        self.closed = True
+        self.dirty = True
+        if self._wake is not None:
+            self._wake.set()
+        self._start()
+
+    def _start(self):
+        """ Publish from a task of it's own, the message isn't owned by any one command """
+        if self.task is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._wake = asyncio.Event()
+        self.task = loop.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self.dirty:
+                delay = 0 if self.published is None else self.published + self.interval - loop.time()
+                if delay > 0 and not self.closed:
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+
+                self.dirty = False
+                entry = self.final if self.closed else self.render()
+                await self._publish(entry.embed)
+                self.published = loop.time()
+        finally:
+            self.task = None
+
+    async def _publish(self, embed):
+        pipeline = self.logger.pipeline
+        try:
+            if self.message is None:
+                self.message = await pipeline.submit(self.target, functools.partial(self.target.send, embed=embed))
+                self.sends += 1
+                self.logger.live_sends += 1
+            else:
+                await pipeline.submit(self.target, functools.partial(self.message.edit, embed=embed))
+                self.edits += 1
+                self.logger.live_edits += 1
+        except Exception as error: # pylint: disable=broad-except
+            # Most likely the message was deleted, so send a new one next time
+            print(f"Failed to publish a live message: {error}")
+            self.message = None
 
 
 class NullLogger():
@@ -20,8 +168,21 @@ class NullLogger():
         def buffer(self, ctx):
             pass
 
+    class NullLive():
+        def update(self):
+            pass
+        def close(self, entry=None):
+            pass
+
     def entry(self):
         return self.NullEntry()
+    def live(self, target, render, interval):
+        return self.NullLive()
+    def report(self, pages, target):
+        pass
+    @contextlib.contextmanager
+    def scope(self):
+        yield None
     async def send_buffer(self):
         pass
 
@@ -37,9 +198,10 @@ class DiscordLogger():
             "success": 0x43b581
         }
 
-        def __init__(self):
+        def __init__(self, logger=None):
             self.embed = Embed(color=self.colors['default'])
             self.ready = False
+            self.logger = logger
 
         def color(self, name):
             """ Set the embed color """
@@ -60,31 +222,83 @@ class DiscordLogger():
             self.embed.add_field(name=title, value=desc, inline=inline)
 
         def buffer(self, target):
-            """ Marks the embed as ready to send to the channel """
-            self.ready = True
+            """ Marks the embed as ready to send to the channel, with the current commands log """
             self.target = target
+            if not self.ready and self.logger is not None:
+                self.logger.current().ready.append(self)
+            self.ready = True
 
-    def __init__(self):
-        self.buffer = []
+    def __init__(self, pipeline=None):
+        self.root = LogScope()
         self.timer = None
+        self.pipeline = pipeline or SendPipeline()
+        self.entries = 0
+        self.messages = 0
+        self.live_sends = 0
+        self.live_edits = 0
 
     def entry(self):
         """ Request a new logging entry """
-        instance = self.EmbedEntry()
-        self.buffer.append(instance)
-        return instance
+        return self.EmbedEntry(self)
 
-    async def send_buffer(self):
-        """ Sends off any finished entries in the logging cache """
-        # Loop backwards, because we're deleting entries as we go
-        for entry in list(self.buffer):
-            if entry.ready:
-                await entry.target.send(embed=entry.embed)
-                try:
-                    self.buffer.remove(entry)
-                except ValueError:
-                    print("Attempted to remove a non existent embed entry in the logger. It may have been sent out twice!")
-                continue
+    def live(self, target, render, interval):
+        """ Message sent to target once and edited in place, render returns an entry with it's current contents """
+        return LiveMessage(self, target, render, interval)
+
+    def report(self, pages, target):
+        """ Buffer every page of a multi page report to target, pages is an iterable rendering them as they're taken """
+        for entry in pages:
+            entry.buffer(target)
+
+    def current(self):
+        """ Log of the command running right now, or the shared one outside of commands """
+        return _scope.get() or self.root
+
+    @contextlib.contextmanager
+    def scope(self):
+        """ Gives everything inside it it's own log, so sending it never sends anything from other commands
+
+            Entries left unsent at the end move to the log around it.
+        """
+        parent = self.current()
+        scope = LogScope()
+        token = _scope.set(scope)
+        try:
+            yield scope
+        finally:
+            _scope.reset(token)
+            parent.ready.extend(scope.ready)
+
+    async def send_buffer(self, scope=None):
+        """ Sends off the finished entries of the current commands log, or of the given scope
+
+            Entries for the same target go out in the order they were finished, packed into as few messages as
+            they fit in when the target can send several embeds at once, while different targets are sent to at the
+            same time.
+        """
+        queue = (scope or self.current()).ready
+        if not queue:
+            return
+        ready = [queue.popleft() for _ in range(len(queue))]
+
+        targets = {}
+        for entry in ready:
+            key = self.pipeline.route(entry.target)
+            if key not in targets:
+                targets[key] = (entry.target, [])
+            targets[key][1].append(entry.embed)
+
+        futures = []
+        for target, embeds in targets.values():
+            for message in pack(embeds, MAX_EMBEDS if multi_embed(target) else 1):
+                futures.append(self.pipeline.submit(target, functools.partial(send_embeds, target, message)))
+        self.entries += len(ready)
+        self.messages += len(futures)
+
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
 
 def log_all(func):
     """ Command wrapper to automatically log everything """
@@ -99,25 +313,31 @@ def log_all(func):
 
     @functools.wraps(func)
     async def wrapper(self, ctx, *args, **kwargs):
-        try:
-            log_out(func.__name__, ctx.author.name, *args, **kwargs)
-            return await func(self, ctx, *args, **kwargs)
-        except CommandError as error:
-            out = self.api.logger.entry()
-            out.color('error')
-            out.title('Command Error')
-            out.desc(str(error))
-            out.buffer(ctx.author)
-            await self.api.logger.send_buffer()
-            await ctx.message.add_reaction(u'❌')
-            return
-        except Exception as error:
-            out = self.api.logger.entry()
-            out.color('error')
-            out.title('Unhandled Exception')
-            out.desc(str(error))
-            out.buffer(ctx.channel)
-            await self.api.logger.send_buffer()
-            await ctx.message.add_reaction(u'❌')
-            raise error
+        # Every command gets it's own log, so it only ever sends what it logged itself
+        with self.api.logger.scope():
+            try:
+                log_out(func.__name__, getattr(ctx.author, 'name', None), *args, **kwargs)
+                return await func(self, ctx, *args, **kwargs)
+            except CommandError as error:
+                out = self.api.logger.entry()
+                out.color('error')
+                out.title('Command Error')
+                out.desc(str(error))
+                if ctx.author is not None:
+                    out.buffer(ctx.author)
+                await self.api.logger.send_buffer()
+                await ctx.message.add_reaction(u'❌')
+                return
+            except Exception as error:
+                out = self.api.logger.entry()
+                out.color('error')
+                out.title('Unhandled Exception')
+                out.desc(str(error))
+                out.buffer(ctx.channel)
+                await self.api.logger.send_buffer()
+                await ctx.message.add_reaction(u'❌')
+                raise error
+            finally:
+                # Send anything the command logged but didn't send itself
+                await self.api.logger.send_buffer()
     return wrapper
@@ -0,0 +1,90 @@
+""" Fast win probability estimates from simulated battles
+
+    Each trial plays a battle out with the same attack rules as a real one, where every living participant
+    attacks a random opponent on their turn. Fighters are plain tuples, so they're cheap to hash, compare and
+    send to another process.
+"""
+import time
+import random
+from collections import namedtuple
+from bot.components import combat
+
+Fighter = namedtuple('Fighter', ['life', 'body', 'speed', 'weapon'])
+Weapon = namedtuple('Weapon', ['power', 'min_factor', 'max_factor'])
+
+MAX_ROUNDS = 1000
+
+
+def fighter(user):
+    """ Fingerprint of everything about a user that decides how they fight """
+    weapon = user.weapon
+    return Fighter(
+        user.life.current,
+        user.body.current,
+        user.speed.current,
+        Weapon(weapon.power, weapon.min_factor, weapon.max_factor) if weapon else None)
+
+
+class Odds():
+    """ Estimated chance of each fighter winning """
+    __slots__ = ('wins', 'draws', 'trials', 'elapsed')
+
+    def __init__(self, wins, draws, trials, elapsed):
+        self.wins = wins
+        self.draws = draws
+        self.trials = trials
+        self.elapsed = elapsed
+
+    @property
+    def chances(self):
+        """ Win probability of each fighter """
+        return [x / self.trials for x in self.wins] if self.trials else [0.0] * len(self.wins)
+
+
+def simulate(fighters, trials, budget=None, seed=0):
+    """ Play up to trials battles, stopping early once budget seconds have passed """
+    rng = random.Random(seed)
+    count = len(fighters)
+
+    # Slowest go first with ties going to whoever joined first, like a real battle
+    order = sorted(range(count), key=lambda i: fighters[i].speed)
+    body = [x.body for x in fighters]
+    weapons = [x.weapon for x in fighters]
+
+    wins = [0] * count
+    draws = 0
+    played = 0
+    start = time.perf_counter()
+    deadline = None if budget is None else start + budget
+    timed_out = False
+    while played < trials:
+        life = [x.life for x in fighters]
+        alive = [i for i in range(count) if life[i] > 0]
+        for _ in range(MAX_ROUNDS):
+            if len(alive) < 2:
+                break
+            # One battle can run long, so the budget is checked every round
+            if deadline is not None and time.perf_counter() > deadline:
+                timed_out = True
+                break
+            for i in order:
+                if life[i] <= 0 or len(alive) < 2:
+                    continue
+                target = rng.choice(alive)
+                while target == i:
+                    target = rng.choice(alive)
+
+                life[target] -= combat.damage(combat.roll(rng, weapons[i]), body[i], body[target])
+                if life[target] <= 0:
+                    alive.remove(target)
+
+        # A battle cut short by the budget isn't counted
+        if timed_out:
+            break
+        if len(alive) == 1:
+            wins[alive[0]] += 1
+        else:
+            draws += 1
+        played += 1
+
+    return Odds(wins, draws, played, time.perf_counter() - start)
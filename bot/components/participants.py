@@ -0,0 +1,50 @@
+""" Battle participant registry """
+
+
+class Participants(dict):
+    """ Battle participants by name in join order, keeping who's alive, dead and still to act up to date
+
+        Every change is applied incrementally, so liveness checks are O(1) and listing the living, the dead or
+        who's still waiting on only costs the size of that list.
+    """
+    def __init__(self):
+        super().__init__()
+        self.alive = set()
+        self.dead = set()
+        self.death_order = []
+        self.waiting = {} # Living participants without an action this round, in turn order
+
+    def add(self, user):
+        """ A user joins """
+        self[user.name] = user
+        self.alive.add(user.name)
+
+    def kill(self, name):
+        """ A participant dies, returns False if they were already dead """
+        if name in self.dead:
+            return False
+        self.dead.add(name)
+        self.alive.discard(name)
+        self.death_order.append(name)
+        self.waiting.pop(name, None)
+        return True
+
+    def start_round(self, turn_order):
+        """ Every living participant is waiting to act again """
+        alive = self.alive
+        self.waiting = dict.fromkeys(x for x in turn_order if x in alive)
+
+    def submit(self, name):
+        """ A participant has acted this round """
+        self.waiting.pop(name, None)
+
+    def is_alive(self, name):
+        return name in self.alive
+
+    def is_dead(self, name):
+        return name in self.dead
+
+    def living(self):
+        """ The living in join order """
+        alive = self.alive
+        return [x for x in self if x in alive]
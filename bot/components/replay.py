@@ -0,0 +1,221 @@
+""" Compact binary battle replays
+
+    Battles are deterministic given their seed, who took part and the actions they submitted, so
+    that's all a replay needs to re-run one and check the outcome.
+
+    Layout (little endian)
+        header          4s magic, B version, Q seed, B flags, I participant count
+        participants    name, I level, I body, I mind and I agility points,
+                        i life, i body and i speed at the start, weapon, armor and accessory
+        rounds          I action count, then B kind, I source and I target per action in turn order
+        end             I 0xFFFFFFFF, I round count, B draw, I death count, I participant per death,
+                        i life left per participant
+
+    Names are length prefixed utf-8 and gear is always stored inline, so replays don't depend on
+    the item catalog staying the same. Version 1 replays used H for every count and index, and still load.
+"""
+import os
+import struct
+from bot.components import binary, users
+
+MAGIC = b'RPGR'
+VERSION = 2
+
+PARTICIPANT = struct.Struct('<IIIIiii')
+BYTE = struct.Struct('<B')
+LIFE = struct.Struct('<i')
+
+
+class Format():
+    """ Structs of a replay version, which differ in the size of counts and indexes """
+    def __init__(self, index):
+        self.index = index
+        self.header = struct.Struct(f'<4sBQB{index}')
+        self.action = struct.Struct(f'<B{index}{index}')
+        self.count = struct.Struct(f'<{index}')
+        self.end = (1 << (8 * self.count.size)) - 1
+        self.no_target = self.end
+
+FORMATS = {1: Format('H'), 2: Format('I')}
+CURRENT = FORMATS[VERSION]
+
+# The largest index is reserved for the end of the rounds and attacks without a target
+MAX_PARTICIPANTS = CURRENT.end - 1
+
+ATTACK = 1
+DEFEND = 2
+KINDS = {'attack': ATTACK, 'defend': DEFEND}
+NAMES = {v: k for k, v in KINDS.items()}
+
+BATCH = 0x01 # Rounds were resolved with the batch combat engine
+
+SLOTS = ['weapon', 'armor', 'accessory']
+
+
+def recordable(count):
+    """ Can a battle with count participants be recorded? """
+    return count <= MAX_PARTICIPANTS
+
+
+def save(path, raw, name, keep=0):
+    """ Write a replay into path, then delete the oldest replays past the newest keep. 0 keeps them all """
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, name), 'wb') as file:
+        file.write(raw)
+
+    if keep:
+        # Replays are named by when they finished, so they sort oldest first
+        saved = sorted(x for x in os.listdir(path) if x.endswith('.replay'))
+        for old in saved[:-keep]:
+            os.remove(os.path.join(path, old))
+
+
+class Recorder():
+    """ Records a battle as it's played """
+    def __init__(self, seed, participants, batch=False):
+        self.index = {name: i for i, name in enumerate(participants)}
+        self.rounds = 0
+        if not recordable(len(participants)):
+            raise ValueError(f"Replays can't record more than {MAX_PARTICIPANTS} participants")
+        self._out = [CURRENT.header.pack(MAGIC, VERSION, seed, BATCH if batch else 0, len(participants))]
+
+        for user in participants.values():
+            data = user.to_dict()
+            self._out.append(binary.pack_string(user.name))
+            self._out.append(PARTICIPANT.pack(
+                data['level'], data['body_points'], data['mind_points'], data['agility_points'],
+                user.life.current, user.body.current, user.speed.current))
+            for slot in SLOTS:
+                self._out.append(binary.pack_item(data.get(slot), catalog=False))
+
+    def round(self, turn_order, actions):
+        """ Record the actions submitted for a round in turn order """
+        out = []
+        for name in turn_order:
+            action = actions.get(name)
+            if action is None:
+                continue
+            target = action['args'][1].name if action['name'] == 'attack' else None
+            out.append(CURRENT.action.pack(
+                KINDS[action['name']], self.index[name], CURRENT.no_target if target is None else self.index[target]))
+
+        self.rounds += 1
+        self._out.append(CURRENT.count.pack(len(out)))
+        self._out.extend(out)
+
+    def recorded(self):
+        """ Everything recorded so far, so an unfinished battle can be resumed """
+        return b''.join(self._out)
+
+    @classmethod
+    def resume(cls, participants, recorded, rounds):
+        """ Continue recording a battle from what was recorded before """
+        recorder = cls.__new__(cls)
+        recorder.index = {name: i for i, name in enumerate(participants)}
+        recorder.rounds = rounds
+        recorder._out = [recorded]
+        return recorder
+
+    def finish(self, participants, death_order, draw=False):
+        """ Record the outcome, returning the finished replay """
+        count = CURRENT.count
+        self._out.append(count.pack(CURRENT.end) + count.pack(self.rounds) + BYTE.pack(draw))
+        self._out.append(count.pack(len(death_order)))
+        self._out.extend(count.pack(self.index[x]) for x in death_order)
+        self._out.extend(LIFE.pack(x.life.current) for x in participants.values())
+        return b''.join(self._out)
+
+
+class Replay():
+    """ A decoded battle replay """
+    def __init__(self, seed, batch, participants, rounds, death_order, draw, life):
+        self.seed = seed
+        self.batch = batch
+        self.participants = participants # (user dictionary, {life, body, speed}) in join order
+        self.rounds = rounds # [(action name, source index, target index or None), ...] per round
+        self.death_order = death_order # Participant indexes
+        self.draw = draw
+        self.life = life # Life left at the end, in join order
+
+    def __eq__(self, other):
+        return isinstance(other, Replay) and vars(self) == vars(other)
+
+    @property
+    def names(self):
+        return [x[0]['name'] for x in self.participants]
+
+    def create_users(self):
+        """ Rebuild the participants as they were when the battle started """
+        result = []
+        for data, start in self.participants:
+            user = users.User.from_dict(data)
+            user.life.current = start['life']
+            user.body.current = start['body']
+            user.speed.current = start['speed']
+            result.append(user)
+        return result
+
+    @classmethod
+    def decode(cls, raw):
+        """ Decode a replay from bytes """
+        magic, version = struct.unpack_from('<4sB', raw, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a battle replay")
+        if version not in FORMATS:
+            raise ValueError(f"Unsupported replay version {version}")
+        layout = FORMATS[version]
+        _, _, seed, flags, count = layout.header.unpack_from(raw, 0)
+        offset = layout.header.size
+
+        participants = []
+        for _ in range(count):
+            name, offset = binary.unpack_string(raw, offset)
+            level, body, mind, agility, life, body_now, speed = PARTICIPANT.unpack_from(raw, offset)
+            offset += PARTICIPANT.size
+            data = {
+                'name'           : name,
+                'level'          : level,
+                'experience'     : 0,
+                'points'         : 0,
+                'body_points'    : body,
+                'mind_points'    : mind,
+                'agility_points' : agility,
+                'gold'           : 0,
+                'inventory'      : [],
+                'spells'         : []
+            }
+            for slot in SLOTS:
+                data[slot], offset = binary.unpack_item(raw, offset)
+            participants.append((data, {'life': life, 'body': body_now, 'speed': speed}))
+
+        rounds = []
+        while True:
+            actions, = layout.count.unpack_from(raw, offset)
+            offset += layout.count.size
+            if actions == layout.end:
+                break
+
+            current = []
+            for _ in range(actions):
+                kind, source, target = layout.action.unpack_from(raw, offset)
+                offset += layout.action.size
+                current.append((NAMES[kind], source, None if target == layout.no_target else target))
+            rounds.append(current)
+
+        _, = layout.count.unpack_from(raw, offset) # Round count, the rounds themselves are authoritative
+        offset += layout.count.size
+        draw, = BYTE.unpack_from(raw, offset)
+        offset += BYTE.size
+        deaths, = layout.count.unpack_from(raw, offset)
+        offset += layout.count.size
+        death_order = list(struct.unpack_from(f'<{deaths}{layout.index}', raw, offset))
+        offset += deaths * layout.count.size
+        life = list(struct.unpack_from(f'<{count}i', raw, offset))
+
+        return cls(seed, bool(flags & BATCH), participants, rounds, death_order, bool(draw), life)
+
+    @classmethod
+    def load(cls, filename):
+        """ Load a replay file """
+        with open(filename, 'rb') as file:
+            return cls.decode(file.read())
@@ -0,0 +1,131 @@
+""" Round reports split over as many embeds as they need """
+import heapq
+
+# Discord embed limits
+MAX_FIELDS = 25
+MAX_SIZE = 6000
+MAX_NAME = 256
+MAX_VALUE = 1024
+
+ATTACK = 0
+DEFEND = 1
+DEATH = 2
+
+
+class RoundReport():
+    """ Everything that happened in a round, kept as plain tuples until it's sent
+
+        Nothing is formatted while the round runs. Pages are rendered one at a time as they're taken, and once a
+        round has more pages than max_pages the rest is summarized, so huge battles never build text that's never
+        sent. Totals are counted as the round goes, so the summary is as cheap as the full report is long.
+    """
+    def __init__(self, round, summary=False, max_pages=4):
+        self.round = round
+        self.summary = summary
+        self.max_pages = max_pages
+        self.events = []
+        self.attacks = 0
+        self.defends = 0
+        self.damage = 0
+        self.dealt = {}
+        self.deaths = []
+
+    def attack(self, source, target, damage, weapon=None):
+        """ Source hit target for damage """
+        self.events.append((ATTACK, source, target, damage, weapon))
+        self.attacks += 1
+        self.damage += damage
+        self.dealt[source] = self.dealt.get(source, 0) + damage
+
+    def defend(self, source):
+        """ Source defended for the round """
+        self.events.append((DEFEND, source))
+        self.defends += 1
+
+    def death(self, name):
+        """ Someone died """
+        self.events.append((DEATH, name))
+        self.deaths.append(name)
+
+    def totals(self, attacks, defends, damage, deaths):
+        """ Counts for a round that was resolved all at once, without each action """
+        self.summary = True
+        self.attacks += attacks
+        self.defends += defends
+        self.damage += damage
+        self.deaths.extend(deaths)
+
+    def pages(self, entry):
+        """ Render the report as logging entries made by entry(), one per embed as they're needed """
+        if self.summary:
+            yield self._summary(entry, 0)
+            return
+
+        page = None
+        count = 0
+        fields = 0
+        size = 0
+        for i, event in enumerate(self.events):
+            name, value = self._field(event)
+            if page is None or fields >= MAX_FIELDS or size + len(name) + len(value) > MAX_SIZE:
+                if page is not None:
+                    yield page
+                if count == self.max_pages:
+                    yield self._summary(entry, i)
+                    return
+                count += 1
+                title = f"Round {self.round} results" + (f" ({count})" if count > 1 else "")
+                page = entry()
+                page.title(title)
+                fields = 0
+                size = len(title)
+            page.field(title=name, desc=value)
+            fields += 1
+            size += len(name) + len(value)
+
+        if page is None:
+            page = entry()
+            page.title(f"Round {self.round} results")
+            page.desc("Nothing happened")
+        yield page
+
+    def _field(self, event):
+        """ Title and description of a single event """
+        if event[0] == ATTACK:
+            _, source, target, damage, weapon = event
+            return (
+                f"{source} attacks {target}"[:MAX_NAME],
+                f"{source} deals {damage} to {target} with {weapon or 'EMPTY'}"[:MAX_VALUE])
+        if event[0] == DEFEND:
+            return (
+                f"{event[1]} defends for the turn"[:MAX_NAME],
+                f"{event[1]} takes half damage for the rest of the round"[:MAX_VALUE])
+        return (f"{event[1]} dies!"[:MAX_NAME], "It was nice knowing you...")
+
+    def _summary(self, entry, shown):
+        """ Totals for the round, after the first shown events were already reported in full """
+        page = entry()
+        page.title(f"Round {self.round} summary")
+        if shown:
+            page.desc(f"{len(self.events) - shown} more events were too many to list")
+        page.field(
+            title=f"{self.attacks} attacks and {self.defends} defends",
+            desc=f"{self.damage} total damage dealt")
+        if self.dealt:
+            top = heapq.nlargest(10, self.dealt.items(), key=lambda x: x[1])
+            page.field(title="Most damage dealt", desc=clip([f"{name}: {value}" for name, value in top], '\n'))
+        if self.deaths:
+            page.field(title=f"{len(self.deaths)} participants died!", desc=clip(self.deaths))
+        return page
+
+
+def clip(names, separator=', ', limit=MAX_VALUE):
+    """ Joined names cut short to fit in an embed field """
+    text = ''
+    for i, name in enumerate(names):
+        more = f"and {len(names) - i} more"
+        part = f"{separator if text else ''}{name}"
+        if len(text) + len(part) + len(more) + len(separator) > limit:
+            return f"{text}{separator}{more}" if text else more
+        text += part
+    return text
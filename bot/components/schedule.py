@@ -0,0 +1,90 @@
+""" Durable store of scheduled events """
+import json
+import sqlite3
+import threading
+import concurrent.futures
+
+
+class EventStore():
+    """ SQLite table of pending events indexed by their wall clock due time
+
+        Each event has a unique key, scheduling a key again replaces it's event. Writes are queued and run on a
+        single background thread in batches, changes to the same key queued together only write the latest.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.writes = 0
+        self.coalesced = 0
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._scheduled = False
+        self._writer = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+        self._db = sqlite3.connect(filename, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('''CREATE TABLE IF NOT EXISTS events (
+            key TEXT PRIMARY KEY, due REAL NOT NULL, name TEXT NOT NULL, args TEXT NOT NULL, kwargs TEXT NOT NULL)''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS events_due ON events (due)')
+        self._db.commit()
+
+    def save(self, key, due, name, args=(), kwargs=None):
+        """ Queue an event with json serializable arguments """
+        self._queue(key, (due, name, json.dumps(list(args)), json.dumps(kwargs or {})))
+
+    def delete(self, key):
+        """ Queue removing an event that fired or was canceled """
+        self._queue(key, None)
+
+    def sync(self):
+        """ Wait for every queued write to finish """
+        self._writer.submit(int).result()
+
+    def load(self, before=None):
+        """ Pending events as (key, due, name, args, kwargs) in due order, optionally only those due before a time """
+        self.sync()
+        if before is None:
+            rows = self._db.execute('SELECT key, due, name, args, kwargs FROM events ORDER BY due')
+        else:
+            rows = self._db.execute(
+                'SELECT key, due, name, args, kwargs FROM events WHERE due < ? ORDER BY due', (before,))
+        return [(key, due, name, json.loads(args), json.loads(kwargs)) for key, due, name, args, kwargs in rows]
+
+    def count(self, before=None):
+        """ Number of pending events, optionally only those due before a time """
+        self.sync()
+        if before is None:
+            return self._db.execute('SELECT COUNT(*) FROM events').fetchone()[0]
+        return self._db.execute('SELECT COUNT(*) FROM events WHERE due < ?', (before,)).fetchone()[0]
+
+    def close(self):
+        """ Finish writing and release the database """
+        self.sync()
+        self._writer.shutdown(wait=True)
+        self._db.close()
+
+    def _queue(self, key, event):
+        """ Queue a write, only scheduling the writer if it isn't already going to run """
+        with self._lock:
+            if key in self._pending:
+                self.coalesced += 1
+            self._pending[key] = event
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._writer.submit(self._flush)
+
+    def _flush(self):
+        """ Write everything queued so far in a single transaction """
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            self._scheduled = False
+
+        deleted = [(key,) for key, event in pending.items() if event is None]
+        saved = [(key, *event) for key, event in pending.items() if event is not None]
+        with self._db:
+            self._db.executemany('DELETE FROM events WHERE key = ?', deleted)
+            self._db.executemany('INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?)', saved)
+        self.writes += len(pending)
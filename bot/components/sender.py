@@ -0,0 +1,144 @@
+""" Outbound discord message pipeline """
+import time
+import asyncio
+import functools
+from collections import deque
+
+
+class TokenBucket():
+    """ Rate limiter allowing bursts of capacity, refilled at rate tokens a second
+
+        Tokens are reserved up front, so callers queue up behind each other instead of racing for the next one.
+    """
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+
+    def reserve(self):
+        """ Take a token, returns how many seconds to wait before it can be used """
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refill(self):
+        """ Seconds until the bucket is full again """
+        tokens = min(self.capacity, self.tokens + (self.clock() - self.updated) * self.rate)
+        return (self.capacity - tokens) / self.rate
+
+
+class SendPipeline():
+    """ Sends messages to many targets at once, in order for each target
+
+        Every target has it's own queue drained by it's own task while it has anything to send. Sends wait on the
+        targets route bucket and then the global bucket, so they stay under discords rate limits: 5 messages per 5
+        seconds per channel and 50 requests a second overall.
+    """
+    def __init__(self, rate=50.0, route_rate=1.0, route_burst=5, clock=time.monotonic, sleep=asyncio.sleep):
+        self.route_rate = route_rate
+        self.route_burst = route_burst
+        self.clock = clock
+        self.sleep = sleep
+        self.bucket = TokenBucket(rate, rate, clock)
+        self.routes = {}
+        self.queues = {}
+        self.workers = {}
+
+        # Backpressure metrics
+        self.sent = 0
+        self.failed = 0
+        self.pending = 0
+        self.peak_pending = 0
+        self.peak_depth = 0
+        self.throttled = 0
+        self.throttled_time = 0.0
+
+    @staticmethod
+    def route(target):
+        """ Messages to the same channel or user share a rate limit """
+        return getattr(target, 'id', None) or id(target)
+
+    def send(self, target, **kwargs):
+        """ Queue target.send(**kwargs), returns a future with the sent message """
+        return self.submit(target, functools.partial(target.send, **kwargs))
+
+    def submit(self, target, request):
+        """ Queue a coroutine function that makes one request to target, returns a future with it's result """
+        future = asyncio.get_running_loop().create_future()
+        key = self.route(target)
+        queue = self.queues.get(key)
+        if queue is None:
+            queue = self.queues[key] = deque()
+        queue.append((request, future))
+
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        self.peak_depth = max(self.peak_depth, len(queue))
+        if key not in self.workers:
+            self.workers[key] = asyncio.ensure_future(self._drain(key))
+        return future
+
+    def stats(self):
+        """ Pipeline metrics """
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'pending': self.pending,
+            'peak_pending': self.peak_pending,
+            'peak_depth': self.peak_depth,
+            'active_targets': len(self.workers),
+            'throttled': self.throttled,
+            'throttled_time': self.throttled_time
+        }
+
+    async def _drain(self, key):
+        """ Send everything queued for one target, one at a time """
+        queue = self.queues[key]
+        route = self.routes.get(key)
+        if route is None:
+            route = self.routes[key] = TokenBucket(self.route_rate, self.route_burst, self.clock)
+
+        try:
+            while queue:
+                request, future = queue.popleft()
+                await self._wait(route.reserve())
+                await self._wait(self.bucket.reserve())
+                try:
+                    result = await request()
+                except Exception as error: # pylint: disable=broad-except
+                    self.failed += 1
+                    if not future.done():
+                        future.set_exception(error)
+                else:
+                    self.sent += 1
+                    if not future.done():
+                        future.set_result(result)
+                finally:
+                    self.pending -= 1
+        finally:
+            del self.workers[key]
+            del self.queues[key]
+
+            # A full bucket is no different from a new one, so idle targets don't keep theirs
+            delay = route.refill()
+            if delay <= 0:
+                del self.routes[key]
+            else:
+                asyncio.get_running_loop().call_later(delay, self._forget, key)
+
+    def _forget(self, key):
+        """ Drop the bucket of a target that's idle and has refilled """
+        route = self.routes.get(key)
+        if route is not None and key not in self.workers and route.refill() <= 0:
+            del self.routes[key]
+
+    async def _wait(self, delay):
+        """ Wait out a rate limit """
+        if delay > 0:
+            self.throttled += 1
+            self.throttled_time += delay
+            await self.sleep(delay)
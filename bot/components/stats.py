@@ -2,6 +2,8 @@
 
 class CoreStat():
     """ Core stats are what go up and down to modify the character """
+    __slots__ = ('_points', '_current', '_derived')
+
     def __init__(self, points=0):
         points = int(points)
         if points < 0:
@@ -98,6 +100,8 @@ class CoreStat():
 
 class DerivedStat():
     """ Derived stats are based off core stats, and change when their core changes """
+    __slots__ = ('_factor', '_offset', '_base', '_current')
+
     def __init__(self, base, factor=1.0, offset=0):
         self._factor = factor
         self._offset = offset
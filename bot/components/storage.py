@@ -0,0 +1,483 @@
+""" Character storage backends """
+import os
+import json
+import time
+import marshal
+import sqlite3
+import threading
+import concurrent.futures
+from bot.components import binary, users
+
+
+class FileStorage():
+    """ Stores every character in it's own user_<name>.json or compact user_<name>.bin file """
+    def __init__(self, path, compact=False):
+        self.path = path
+        self.compact = compact
+        self.extension = '.bin' if compact else '.json'
+        self.files = {}
+
+    @staticmethod
+    def key(name):
+        """ Normalized index key for a character name """
+        return name.replace(' ', '_').lower()
+
+    def filename(self, name):
+        """ Get the full path of the file a character is stored in """
+        # Prefer the indexed file so lookups don't depend on the name's case
+        try:
+            return self.files[self.key(name)]
+        except KeyError:
+            pass
+
+        return self._new_filename(name)
+
+    def count(self):
+        """ Count the number of stored characters """
+        return len(list(self._scan()))
+
+    def keys(self):
+        """ Index every stored character by file name alone, without reading any of them """
+        self.files = {}
+        for _ in self._scan():
+            pass
+
+        return list(self.files)
+
+    def read(self, name):
+        """ Read a single characters data """
+        try:
+            return _read_file(self.filename(name))
+        except FileNotFoundError:
+            raise KeyError(name)
+
+    def read_all(self, workers=0, processes=False):
+        """ Read every stored characters data, spreading the reads and decoding across a pool of workers """
+        paths = list(self._scan())
+        if not workers:
+            for fullpath in paths:
+                yield _read_file(fullpath)
+            return
+
+        # Threads overlap the disk reads, processes also decode in parallel
+        if processes:
+            pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+            chunksize = max(1, len(paths) // (workers * 16))
+        else:
+            pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+            chunksize = 1
+
+        with pool:
+            yield from pool.map(_read_file, paths, chunksize=chunksize)
+
+    def write(self, data):
+        """ Write a single characters data """
+        key = self.key(data['name'])
+        filename = self._new_filename(data['name'])
+        if self.compact:
+            atomic_write(filename, binary.encode(data))
+        else:
+            atomic_write(filename, json.dumps(data).encode('utf-8'))
+
+        # Switching formats replaces the old file as each character is saved
+        old = self.files.get(key)
+        self.files[key] = filename
+        if old and old != filename:
+            try:
+                os.remove(old)
+            except FileNotFoundError:
+                pass
+
+    def write_many(self, datas):
+        """ Write many characters data """
+        for data in datas:
+            self.write(data)
+
+    def close(self):
+        """ Nothing to release for plain files """
+
+    def _new_filename(self, name):
+        """ Full path for a character file in the configured format """
+        underscored_name = name.replace(' ', '_')
+        return os.path.join(self.path, f'user_{underscored_name}{self.extension}')
+
+    def _scan(self):
+        """ Find and index every user file in the data path """
+        for entry in os.scandir(self.path):
+            if entry.is_file():
+                file_no_ext = os.path.splitext(entry.name)[0]
+                parts = file_no_ext.split("_")
+                category = parts[0]
+
+                if category == 'user':
+                    fullpath = os.path.join(self.path, entry.name)
+                    self.files[self.key(file_no_ext[len('user_'):])] = fullpath
+                    yield fullpath
+
+
+class SqliteStorage():
+    """ Stores every character as indexed rows in a single SQLite database """
+    schema = """
+        CREATE TABLE IF NOT EXISTS users (
+            key            TEXT PRIMARY KEY,
+            name           TEXT NOT NULL,
+            level          INTEGER NOT NULL,
+            experience     INTEGER NOT NULL,
+            points         INTEGER NOT NULL,
+            body_points    INTEGER NOT NULL,
+            mind_points    INTEGER NOT NULL,
+            agility_points INTEGER NOT NULL,
+            gold           INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS equipment (
+            user TEXT NOT NULL REFERENCES users(key) ON DELETE CASCADE,
+            slot TEXT NOT NULL,
+            item TEXT NOT NULL,
+            PRIMARY KEY (user, slot)
+        );
+        CREATE TABLE IF NOT EXISTS inventory (
+            user     TEXT NOT NULL REFERENCES users(key) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            item     TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            PRIMARY KEY (user, position)
+        );
+        CREATE TABLE IF NOT EXISTS spells (
+            user     TEXT NOT NULL REFERENCES users(key) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            item     TEXT NOT NULL,
+            PRIMARY KEY (user, position)
+        );
+    """
+    columns = ['name', 'level', 'experience', 'points', 'body_points', 'mind_points', 'agility_points', 'gold']
+    slots = ['weapon', 'armor', 'accessory']
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.lock = threading.RLock()
+
+        # Writes may come from the character API's background writer thread
+        self.conn = sqlite3.connect(filename, check_same_thread=False)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(self.schema)
+
+    @staticmethod
+    def key(name):
+        """ Normalized index key for a character name """
+        return name.lower()
+
+    def count(self):
+        """ Count the number of stored characters """
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def keys(self):
+        """ Index every stored character by it's primary key alone """
+        with self.lock:
+            return [x for x, in self.conn.execute("SELECT key FROM users")]
+
+    def read(self, name):
+        """ Read a single characters data """
+        key = self.key(name)
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(self.columns)} FROM users WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                raise KeyError(name)
+
+            return self._build(key, row)
+
+    def read_all(self, workers=0, processes=False): # pylint: disable=unused-argument
+        """ Read every stored characters data. A single connection reads serially regardless of workers """
+        with self.lock:
+            rows = self.conn.execute(f"SELECT key, {', '.join(self.columns)} FROM users").fetchall()
+        for row in rows:
+            with self.lock:
+                data = self._build(row[0], row[1:])
+            yield data
+
+    def write(self, data):
+        """ Write a single characters data in one transaction """
+        self.write_many([data])
+
+    def write_many(self, datas):
+        """ Write many characters data in one transaction """
+        with self.lock, self.conn:
+            for data in datas:
+                self._write(data)
+
+    def close(self):
+        """ Close the database connection """
+        with self.lock:
+            self.conn.close()
+
+    def _build(self, key, row):
+        """ Rebuild the serialized character dictionary from it's rows """
+        data = dict(zip(self.columns, row))
+        for slot in self.slots:
+            data[slot] = None
+        for slot, item in self.conn.execute("SELECT slot, item FROM equipment WHERE user = ?", (key,)):
+            data[slot] = json.loads(item)
+
+        data['inventory'] = [
+            {'item': json.loads(item), 'quantity': quantity}
+            for item, quantity in self.conn.execute(
+                "SELECT item, quantity FROM inventory WHERE user = ? ORDER BY position", (key,))]
+        data['spells'] = [
+            json.loads(item)
+            for item, in self.conn.execute(
+                "SELECT item FROM spells WHERE user = ? ORDER BY position", (key,))]
+
+        return data
+
+    def _write(self, data):
+        """ Upsert a character and replace all of it's child rows """
+        key = self.key(data['name'])
+        values = [data[x] for x in self.columns]
+        updates = ', '.join(f"{x} = excluded.{x}" for x in self.columns)
+        self.conn.execute(
+            f"INSERT INTO users (key, {', '.join(self.columns)}) VALUES (?, {', '.join('?' * len(self.columns))}) "
+            f"ON CONFLICT(key) DO UPDATE SET {updates}",
+            [key] + values)
+
+        self.conn.execute("DELETE FROM equipment WHERE user = ?", (key,))
+        self.conn.execute("DELETE FROM inventory WHERE user = ?", (key,))
+        self.conn.execute("DELETE FROM spells WHERE user = ?", (key,))
+        self.conn.executemany(
+            "INSERT INTO equipment (user, slot, item) VALUES (?, ?, ?)",
+            [(key, slot, json.dumps(data[slot])) for slot in self.slots if data.get(slot)])
+        self.conn.executemany(
+            "INSERT INTO inventory (user, position, item, quantity) VALUES (?, ?, ?, ?)",
+            [(key, i, json.dumps(x['item']), x['quantity']) for i, x in enumerate(data['inventory'])])
+        self.conn.executemany(
+            "INSERT INTO spells (user, position, item) VALUES (?, ?, ?)",
+            [(key, i, json.dumps(x)) for i, x in enumerate(data['spells'])])
+
+
+class JournalStorage():
+    """ Appends every character mutation to a journal that's periodically compacted into a snapshot """
+    def __init__(self, path):
+        self.snapshot_file = os.path.join(path, 'characters.snapshot')
+        self.journal_file = os.path.join(path, 'characters.journal')
+        self.lock = threading.RLock()
+
+        # Appends are fsynced in batches, by count or time since the last sync
+        self.fsync_batch = int(os.getenv('JOURNAL_FSYNC_BATCH', 64))
+        self.fsync_interval = float(os.getenv('JOURNAL_FSYNC_INTERVAL', 1.0))
+        self.compact_every = int(os.getenv('JOURNAL_COMPACT_EVERY', 10000))
+        self.unsynced = 0
+        self.appended = 0
+        self.last_sync = time.monotonic()
+
+        # Snapshot data by key, with the journaled mutations since the snapshot on top
+        self.seq = 0
+        self.snapshot = {}
+        self.pending = {}
+        self.file = None
+        self._recover()
+
+    @staticmethod
+    def key(name):
+        """ Normalized index key for a character name """
+        return name.lower()
+
+    def count(self):
+        """ Count the number of stored characters """
+        return len(self.keys())
+
+    def keys(self):
+        """ Every character in the snapshot or journal """
+        with self.lock:
+            return list(set(self.snapshot) | set(self.pending))
+
+    def read(self, name):
+        """ Read a single characters data, replaying it's journal on top of it's snapshot """
+        key = self.key(name)
+        with self.lock:
+            if key not in self.snapshot and key not in self.pending:
+                raise KeyError(name)
+            return self._materialize(key)
+
+    def read_all(self, workers=0, processes=False): # pylint: disable=unused-argument
+        """ Read every stored characters data """
+        for key in self.keys():
+            with self.lock:
+                data = self._materialize(key)
+            yield data
+
+    def write(self, data):
+        """ Journal a whole character, used for new characters """
+        self.append(data['name'], 'put', data)
+
+    def write_many(self, datas):
+        """ Journal many whole characters """
+        for data in datas:
+            self.write(data)
+
+    def append(self, name, op, *args):
+        """ Journal a single mutation as one small sequential append """
+        key = self.key(name)
+        with self.lock:
+            self.seq += 1
+            self.file.write(json.dumps([self.seq, key, op, args]) + '\n')
+            self.pending.setdefault(key, []).append((op, list(args)))
+            self.unsynced += 1
+            self.appended += 1
+
+            if self.unsynced >= self.fsync_batch or time.monotonic() - self.last_sync >= self.fsync_interval:
+                self.sync()
+            if self.appended >= self.compact_every:
+                self.compact()
+
+    def sync(self):
+        """ Flush and fsync the journal """
+        with self.lock:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+            self.last_sync = time.monotonic()
+
+    def compact(self):
+        """ Folds the journal into a new snapshot, then starts an empty journal """
+        with self.lock:
+            for key in list(self.pending):
+                self.snapshot[key] = self._materialize(key)
+            self.pending = {}
+
+            # The snapshot records the last sequence it holds, so a crash before truncating never replays twice
+            state = {'seq': self.seq, 'users': self.snapshot}
+            atomic_write(self.snapshot_file, marshal.dumps(state), sync=True)
+
+            if self.file:
+                self.file.close()
+            self.file = open(self.journal_file, 'w')
+            self.unsynced = 0
+            self.appended = 0
+
+    def close(self):
+        """ Compact anything journaled and close the journal """
+        with self.lock:
+            if self.pending:
+                self.compact()
+            self.file.close()
+
+    def _recover(self):
+        """ Load the latest snapshot and replay the journal on top of it """
+        try:
+            with open(self.snapshot_file, 'rb') as file:
+                state = marshal.load(file)
+            self.seq = state['seq']
+            self.snapshot = state['users']
+        except FileNotFoundError:
+            pass
+
+        try:
+            good = 0
+            with open(self.journal_file, 'rb') as file:
+                for line in file:
+                    if not line.endswith(b'\n'):
+                        break # A crash tore the final append
+                    try:
+                        seq, key, op, args = json.loads(line)
+                    except ValueError:
+                        break
+                    good += len(line)
+                    if seq <= self.seq:
+                        continue
+                    self.seq = seq
+                    self.pending.setdefault(key, []).append((op, args))
+
+            # Cut off a torn append, otherwise the next one is joined onto it and lost along with it
+            if good < os.path.getsize(self.journal_file):
+                os.truncate(self.journal_file, good)
+        except FileNotFoundError:
+            pass
+
+        if self.pending:
+            self.compact()
+        else:
+            self.file = open(self.journal_file, 'a')
+
+    def _materialize(self, key):
+        """ Apply a characters journaled mutations to it's snapshot """
+        data = self.snapshot.get(key)
+        user = None
+        for op, args in self.pending.get(key, []):
+            if op == 'put':
+                data = args[0]
+                user = None
+                continue
+
+            if user is None:
+                user = users.User.from_dict(data)
+            user.apply(op, *args)
+
+        return user.to_dict() if user else data
+
+
+def atomic_write(filename, raw, sync=False):
+    """ Writes a temporary file then swaps it in, so a crash never leaves a truncated file behind """
+    directory, basename = os.path.split(filename)
+    temp = os.path.join(directory, f'.{basename}.tmp')
+    with open(temp, 'wb') as file:
+        file.write(raw)
+        if sync:
+            file.flush()
+            os.fsync(file.fileno())
+    os.replace(temp, filename)
+
+
+def _read_file(filename):
+    """ Read and decode a single json or binary user file, module level so process pools can use it """
+    with open(filename, 'rb') as file:
+        raw = file.read()
+
+    if binary.is_binary(raw):
+        return binary.decode(raw)
+    return json.loads(raw)
+
+
+def import_files(source, target):
+    """ One shot copy of every character in a file store into another store """
+    count = 0
+    batch = []
+    for data in source.read_all():
+        batch.append(data)
+        if len(batch) >= 500:
+            target.write_many(batch)
+            count += len(batch)
+            batch = []
+
+    target.write_many(batch)
+    count += len(batch)
+    return count
+
+
+def create(backend=None, path=None):
+    """ Creates the configured storage backend (STORAGE environment variable, file by default) """
+    backend = backend or os.getenv('STORAGE', 'file')
+    path = path or os.getenv('DATA_PATH')
+
+    compact = os.getenv('USER_FORMAT', 'json') == 'binary'
+    if backend == 'file':
+        return FileStorage(path, compact)
+
+    if backend == 'journal':
+        store = JournalStorage(path)
+
+        # Switching backends imports the existing character files the first time
+        if store.count() == 0:
+            import_files(FileStorage(path), store)
+        return store
+
+    if backend == 'sqlite':
+        filename = os.getenv('STORAGE_DB') or os.path.join(path, 'characters.db')
+        store = SqliteStorage(filename)
+
+        # Switching backends imports the existing character files the first time
+        if store.count() == 0:
+            import_files(FileStorage(path), store)
+        return store
+
+    raise KeyError(f"Bad storage backend {backend}")
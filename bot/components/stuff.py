@@ -7,13 +7,39 @@ import random
 class Stuff():
     _prefix = None
 
+    # Every serialized attribute, subclasses extend it with their own slots
+    _fields = ('name', 'desc', 'category', 'value')
+    __slots__ = _fields + ('_frozen',)
+
     """ Base class, do not use directly """
     def __init__(self, **kwargs):
+        object.__setattr__(self, '_frozen', False)
         self.name = kwargs['name']
         self.desc = kwargs['desc']
         self.category = kwargs['category']
         self.value = kwargs.get('value', 0)
 
+    def __setattr__(self, name, value):
+        """ Shared catalog instances can't be modified """
+        if self._frozen:
+            raise AttributeError(f"{self.name} is a shared catalog item, use modified() to change a copy")
+        super(Stuff, self).__setattr__(name, value)
+
+    def freeze(self):
+        """ Makes this instance immutable so it can be shared """
+        object.__setattr__(self, '_frozen', True)
+        return self
+
+    def to_dict(self):
+        """ Serialize this item's attributes """
+        return {x: getattr(self, x) for x in self._fields}
+
+    def modified(self, **changes):
+        """ Creates a unique, unshared copy with some attributes changed """
+        kwargs = self.to_dict()
+        kwargs.update(changes)
+        return build(**kwargs)
+
     @classmethod
     def load(cls, filename):
         """ Load object from disk """
@@ -25,18 +51,21 @@ class Stuff():
 
     def save(self, filename):
         """ Saves this user to disk """
-        data = json.dumps(self.__dict__)
+        data = json.dumps(self.to_dict())
         with open(filename, 'w') as file:
             file.write(data)
 
     def __eq__(self, other):
         """ Test equality by attribute dict """
-        return self.__dict__ == other.__dict__
+        return self.to_dict() == other.to_dict()
 
 
 # EQUIPMENT
 class Gear(Stuff):
     """ Base class, do not use directly """
+    __slots__ = ('slot',)
+    _fields = Stuff._fields + __slots__
+
     def __init__(self, **kwargs):
         kwargs['category'] = "gear"
         super(Gear, self).__init__(**kwargs)
@@ -45,6 +74,9 @@ class Gear(Stuff):
 
 class Weapon(Gear):
     """ Base class, do not use directly """
+    __slots__ = ('type', 'power', 'min_factor', 'max_factor')
+    _fields = Gear._fields + __slots__
+
     def __init__(self, **kwargs):
         kwargs['slot'] = "weapon"
         super(Weapon, self).__init__(**kwargs)
@@ -54,16 +86,17 @@ class Weapon(Gear):
         self.min_factor = kwargs['min_factor']
         self.max_factor = kwargs['max_factor']
 
-    def calc_power(self):
-        """ Calculates the random weapon power fluctuation """
+    def calc_power(self, rng=random):
+        """ Calculates the random weapon power fluctuation, using the battles generator when given """
         low = int(self.power * self.min_factor)
         high = int(self.power * self.max_factor)
-        power = random.randint(low, high)
+        power = rng.randint(low, high)
 
         return power
 
 class Sword(Weapon):
     _prefix = "sword"
+    __slots__ = ()
 
     def __init__(self, **kwargs):
         kwargs['type'] = "sword"
@@ -73,6 +106,7 @@ class Sword(Weapon):
 
 class Axe(Weapon):
     _prefix = "axe"
+    __slots__ = ()
 
     def __init__(self, **kwargs):
         kwargs['type'] = "axe"
@@ -83,6 +117,7 @@ class Axe(Weapon):
 
 class Bow(Weapon):
     _prefix = "bow"
+    __slots__ = ()
 
     def __init__(self, **kwargs):
         kwargs['type'] = "bow"
@@ -92,6 +127,8 @@ class Bow(Weapon):
 
 class Armor(Gear):
     _prefix = "armor"
+    __slots__ = ('toughness',)
+    _fields = Gear._fields + __slots__
 
     def __init__(self, **kwargs):
         kwargs['slot'] = "armor"
@@ -101,6 +138,7 @@ class Armor(Gear):
 
 class Accessory(Gear):
     _prefix = "accessory"
+    __slots__ = ()
 
     def __init__(self, **kwargs):
         kwargs['slot'] = "accessory"
@@ -109,6 +147,7 @@ class Accessory(Gear):
 # Items
 class Item(Stuff):
     _prefix = "item"
+    __slots__ = ()
 
     def __init__(self, **kwargs):
         kwargs['category'] = "item"
@@ -117,13 +156,30 @@ class Item(Stuff):
 # Spells
 class Spell(Stuff):
     _prefix = "spell"
+    __slots__ = ()
 
     def __init__(self, **kwargs):
         kwargs['category'] = "spell"
         super(Spell, self).__init__(**kwargs)
 
 
+# Catalog of every item for sale, by name. Catalog instances are frozen and shared by everyone holding one
+CATALOG = {}
+
+def register(item):
+    """ Adds an item to the catalog so saves can reference it and loads can share it """
+    CATALOG[item.name] = item.freeze()
+    return item
+
 def factory(**kwargs):
+    """ Gets the shared catalog instance for the given dictionary, or creates a unique one """
+    known = CATALOG.get(kwargs.get('name'))
+    if known is not None and known.to_dict() == kwargs:
+        return known
+
+    return build(**kwargs)
+
+def build(**kwargs):
     """ Creates the appropriate instance from the given dictionary """
     # Weapons
     if kwargs['category'] == "gear":
@@ -1,4 +1,7 @@
+import math
+import time
 import asyncio
+import itertools
 
 class NullTimer():
     """ Empty timer class for mocking """
@@ -11,41 +14,200 @@ class NullTimer():
     def is_running(self):
         return False
 
-class AsyncEventTimer():
-    """ Timer that fires a discord event asynchronously on timeout """
-    def __init__(self, client, name, timeout, args=None, kwargs=None):
-        self.client  = client
+class VirtualClock():
+    """ Clock that only moves when told to, so tests can fast forward timers deterministically """
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        """ Move time forward """
+        self.now += seconds
+
+
+class TimerWheel():
+    """ Hashed timer wheel running every timer on a single task
+
+        Time is split into ticks of resolution seconds, and each timer is hashed into the slot of the tick it's due
+        on. Scheduling and canceling are O(1) set operations, and each tick only looks at one slot. Timers due more
+        than a full turn of the wheel away share slots with sooner ones, and are skipped until their turn comes.
+        Everything that expires together is fired as one batch, in the order it was due.
+
+        Keyed timers replace any running timer with the same key, and with a store they're also saved with their
+        wall clock due time so they can be reloaded after a restart.
+    """
+    def __init__(self, dispatch, loop=None, resolution=0.1, slots=512, clock=time.monotonic, store=None, wall=time.time):
+        self.dispatch = dispatch
+        self.loop = loop
+        self.resolution = resolution
+        self.clock = clock
+        self.origin = clock()
+        self.store = store
+        self.wall = wall
+        self.tick = 0
+        self.slots = [set() for _ in range(slots)]
+        self.keyed = {}
+        self.count = 0
+        self.fired = 0
+        self._order = itertools.count()
+        self._task = None
+        self._wakeup = None
+
+    def schedule(self, timer, persist=True):
+        """ Start a timer, it fires on the first tick at or after it's timeout """
+        if timer.due is not None:
+            self._remove(timer)
+
+        if timer.key is not None:
+            current = self.keyed.get(timer.key)
+            if current is not None and current is not timer:
+                self._remove(current)
+            self.keyed[timer.key] = timer
+            if self.store is not None and persist:
+                self.store.save(timer.key, self.wall() + timer.timeout, timer.name, timer.args, timer.kwargs)
+
+        due = math.ceil(self._ticks(self.clock() - self.origin + timer.timeout))
+        timer.due = max(due, self.tick + 1)
+        timer.order = next(self._order)
+        self.slots[timer.due % len(self.slots)].add(timer)
+        self.count += 1
+
+        if self.loop is not None and (self._task is None or self._task.done()):
+            self._task = self.loop.create_task(self.run())
+        elif self._wakeup is not None:
+            self._wakeup.set()
+
+    def cancel(self, timer):
+        """ Stop a timer that hasn't fired yet """
+        if timer.due is None:
+            return
+        self._remove(timer)
+        self._forget(timer)
+
+    def find(self, key):
+        """ Get the running timer with a key """
+        return self.keyed.get(key)
+
+    def reload(self):
+        """ Schedule every event saved in the store, returns how many were loaded and how many are overdue
+
+            Overdue events are due on the very next tick, so they all fire together in one batch
+        """
+        now = self.wall()
+        loaded = overdue = 0
+        for key, due, name, args, kwargs in self.store.load():
+            if key in self.keyed:
+                continue
+            self.schedule(WheelTimer(self, name, max(0.0, due - now), tuple(args), kwargs, key), persist=False)
+            loaded += 1
+            overdue += due <= now
+        return loaded, overdue
+
+    def poll(self):
+        """ Fire every timer that's due by now, returns the number fired """
+        target = math.floor(self._ticks(self.clock() - self.origin))
+        if target <= self.tick:
+            return 0
+
+        expired = []
+        if target - self.tick >= len(self.slots):
+            # Fell a whole turn or more behind, so every slot has to be checked anyway
+            slots = self.slots
+        else:
+            slots = [self.slots[x % len(self.slots)] for x in range(self.tick + 1, target + 1)]
+        for slot in slots:
+            if slot:
+                due = [x for x in slot if x.due <= target]
+                slot.difference_update(due)
+                expired.extend(due)
+        self.tick = target
+
+        expired.sort(key=lambda x: (x.due, x.order))
+        self.count -= len(expired)
+        for timer in expired:
+            timer.due = None
+            self._forget(timer)
+        for timer in expired:
+            self.dispatch(timer.name, *timer.args, **timer.kwargs)
+        self.fired += len(expired)
+        return len(expired)
+
+    def fast_forward(self, seconds):
+        """ Advance a virtual clock and fire whatever came due """
+        self.clock.advance(seconds)
+        return self.poll()
+
+    def _remove(self, timer):
+        """ Take a timer off the wheel """
+        self.slots[timer.due % len(self.slots)].discard(timer)
+        timer.due = None
+        self.count -= 1
+
+    def _forget(self, timer):
+        """ Drop a keyed timer that's done running """
+        if timer.key is not None and self.keyed.get(timer.key) is timer:
+            del self.keyed[timer.key]
+            if self.store is not None:
+                self.store.delete(timer.key)
+
+    def _ticks(self, seconds):
+        """ Seconds in ticks, rounded so float error can't push a timer into the next tick """
+        return round(seconds / self.resolution, 4)
+
+    async def run(self):
+        """ The single task driving every timer, sleeping while there are none """
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                if not self.count:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                await asyncio.sleep(self.resolution)
+                self.poll()
+        finally:
+            self._wakeup = None
+
+    def __len__(self):
+        return self.count
+
+
+class WheelTimer():
+    """ Timer that fires a discord event from a timer wheel on timeout """
+    def __init__(self, wheel, name, timeout, args=None, kwargs=None, key=None):
+        self.wheel   = wheel
         self.name    = name
         self.timeout = timeout
         self.args    = args or tuple()
         self.kwargs  = kwargs or {}
-        self._task   = None
+        self.key     = key
+        self.due     = None
+        self.order   = None
 
     def start(self):
         """ Start the timer """
-        self._task = self.client.loop.create_task(self._run())
+        self.wheel.schedule(self)
 
     def cancel(self):
         """ Cancel a timer that hasn't triggered yet """
         if not self.is_running():
             raise Exception("You can't cancel a timer that isn't running")
 
-        self._task.cancel()
+        self.wheel.cancel(self)
 
     def is_running(self):
         """ Is the timer running? """
-        return self._task is not None and not self._task.done()
-
-    async def _run(self):
-        """ asynchronous call that is run when the timeout occurs """
-        await asyncio.sleep(self.timeout)
-        self.client.dispatch(self.name, *self.args, **self.kwargs)
+        return self.due is not None
 
 class TimerFactory():
     def __init__(self, timer_class, client=None):
         self.timer_class = timer_class
         self.client = client
 
-    def __call__(self, name, timeout, args=None, kwargs=None):
-        """ Reconfigure timer instance for a new timing event """
-        return self.timer_class(self.client, name, timeout, args, kwargs)
+    def __call__(self, name, timeout, args=None, kwargs=None, key=None):
+        """ Reconfigure timer instance for a new timing event, bound to the client or timer wheel
+
+            Keyed timers replace the running timer with the same key, and survive restarts when the wheel has a store
+        """
+        return self.timer_class(self.client, name, timeout, args, kwargs, key)
@@ -0,0 +1,61 @@
+""" Battle turn order """
+import bisect
+
+
+class TurnOrder():
+    """ Living participants in the order they take their turns, slowest first
+
+        Ties go to whoever joined first, so the order is always deterministic. The order is kept sorted as people
+        join, die or change speed instead of being sorted again every round, and the same snapshot is handed out
+        until something changes. Every turn is a (speed, join index) key on a timeline, so speed based extra turns
+        could later be more keys for the same participant.
+    """
+    def __init__(self):
+        self.keys = [] # Sorted (speed, join index)
+        self.names = [] # Names matching keys
+        self.entries = {}
+        self._joined = 0
+        self._snapshot = None
+
+    def add(self, name, speed):
+        """ Someone joins the battle """
+        key = (speed, self._joined)
+        self._joined += 1
+        self._insert(name, key)
+
+    def remove(self, name):
+        """ Someone dies or leaves, they take no more turns """
+        key = self.entries.pop(name, None)
+        if key is None:
+            return
+        i = bisect.bisect_left(self.keys, key)
+        del self.keys[i]
+        del self.names[i]
+        self._snapshot = None
+
+    def update(self, name, speed):
+        """ Someone's speed changed, moving them in the order """
+        key = self.entries.get(name)
+        if key is None or key[0] == speed:
+            return
+        self.remove(name)
+        self._insert(name, (speed, key[1]))
+
+    def order(self):
+        """ Names in turn order, the same list until the order changes so don't modify it """
+        if self._snapshot is None:
+            self._snapshot = list(self.names)
+        return self._snapshot
+
+    def _insert(self, name, key):
+        i = bisect.bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.names.insert(i, name)
+        self.entries[name] = key
+        self._snapshot = None
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def __len__(self):
+        return len(self.names)
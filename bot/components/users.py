@@ -3,11 +3,22 @@ import os
 import json
 from bot.components.stats import CoreStat, DerivedStat
 import bot.components.stuff as stuff
+from bot.components import binary
+from bot.components.inventory import Inventory
 
 
 ### CLASS DEFINITIONS
 class User():
     """ User object """
+    # Mutations that can be replayed from a journal as is
+    journaled = {'earn', 'spend', 'drop', 'unequip', 'upgrade', 'restart', 'gain_xp', 'level_up'}
+
+    __slots__ = (
+        'name', 'level', 'experience', 'points',
+        'body', 'mind', 'agility', 'life', 'mana', 'speed',
+        'weapon', 'armor', 'accessory', 'spells', 'inventory', '_gold',
+        'defending')
+
     def __init__(self, name):
         # Meta data
         self.name = name
@@ -28,7 +39,7 @@ class User():
         self.armor = None
         self.accessory = None
         self.spells = []
-        self.inventory = []
+        self.inventory = Inventory()
         self._gold = 100 # Starting gold
 
         # Battle statuses
@@ -49,10 +60,17 @@ class User():
 
     @classmethod
     def load(cls, filename):
-        """ Load user from disk """
-        with open(filename, 'r') as file:
-            data = json.load(file)
+        """ Load user from disk, detecting json or binary files """
+        with open(filename, 'rb') as file:
+            raw = file.read()
+
+        if binary.is_binary(raw):
+            return cls.from_dict(binary.decode(raw))
+        return cls.from_dict(json.loads(raw))
 
+    @classmethod
+    def from_dict(cls, data):
+        """ Rebuild a user from it's serialized dictionary """
         this = cls(data["name"])
         this.level = data["level"]
         this.experience = data["experience"]
@@ -69,8 +87,7 @@ class User():
 
         for entry in data["inventory"]:
             item = stuff.factory(**entry["item"])
-            new_entry = {"item": item, "quantity": entry["quantity"]}
-            this.inventory.append(new_entry)
+            this.inventory.add(item, entry["quantity"])
         for kwargs in data["spells"]:
             this.spells.append(stuff.factory(**kwargs))
 
@@ -78,12 +95,42 @@ class User():
 
         return this
 
-    def save(self, filename):
-        """ Saves this user to disk """
+    def save(self, filename, compact=False):
+        """ Saves this user to disk as json, or the compact binary format """
+        if compact:
+            with open(filename, 'wb') as file:
+                file.write(binary.encode(self.to_dict()))
+            return
+
         data = UserEncoder().encode(self)
         with open(filename, 'w') as file:
             file.write(data)
 
+    def to_dict(self):
+        """ Serialize this user into a dictionary of plain values """
+        # Convert the inventory item objects to kwarg values for later construction
+        inventory = []
+        for entry in self.inventory:
+            new_entry = entry.copy()
+            new_entry['item'] = entry['item'].to_dict()
+            inventory.append(new_entry)
+
+        return {
+            'name'           : self.name,
+            'level'          : self.level,
+            'experience'     : self.experience,
+            'points'         : self.points,
+            'body_points'    : self.body._points,
+            'mind_points'    : self.mind._points,
+            'agility_points' : self.agility._points,
+            'weapon'         : self.weapon.to_dict() if self.weapon else None,
+            'armor'          : self.armor.to_dict() if self.armor else None,
+            'accessory'      : self.accessory.to_dict() if self.accessory else None,
+            'spells'         : [x.to_dict() for x in self.spells],
+            'inventory'      : inventory,
+            'gold'           : self.gold
+        }
+
     def restore(self):
         """ Restores this user back to base line """
         self.body.restore()
@@ -115,35 +162,14 @@ class User():
         if not isinstance(item, stuff.Stuff):
             return False
 
-        # Increment quantity if you already have it
-        for entry in self.inventory:
-            if entry['item'].name == item.name:
-                entry['quantity'] += quantity
-                return True
-
-        # Create a new entry with the quantity given
-        entry = {'item': item, 'quantity': quantity}
-        self.inventory.append(entry)
+        # Stacks onto the existing entry if you already have it
+        self.inventory.add(item, quantity)
         return True
 
     def drop(self, name, quantity=1):
         """ Drop items from your inventory forever """
-        # Early out if user doesn't have the item to drop
-        idx = None
-        for i in range(len(self.inventory)):
-            if self.inventory[i]['item'].name == name:
-                idx = i
-                break
-        if idx is None or self.inventory[idx]['quantity'] < quantity:
-            return False
-
-        # Remove item completely if it's the last one dropped
-        if self.inventory[idx]['quantity'] == quantity:
-            del self.inventory[idx]
-        else:
-            self.inventory[idx]['quantity'] -= quantity
-
-        return True
+        # Fails if user doesn't have enough of the item to drop
+        return self.inventory.remove(name, quantity)
 
     def equip(self, item):
         """ Equip the item """
@@ -164,17 +190,7 @@ class User():
             return False
 
         # Remove the equipped item from the inventory if it exists, it's still okay if it didn't
-        idx = None
-        for i in range(len(self.inventory)):
-            if self.inventory[i]['item'].name == item.name:
-                idx = i
-                break
-        if idx is None:
-            return True
-
-        self.inventory[idx]['quantity'] -= 1
-        if self.inventory[idx]['quantity'] < 1:
-            del self.inventory[idx]
+        self.inventory.remove(item.name, 1)
         return True
 
     def unequip(self, slot_name):
@@ -240,6 +256,20 @@ class User():
 
         return False
 
+    def apply(self, op, *args):
+        """ Replays a journaled mutation """
+        if op == 'give':
+            item, quantity = args
+            return self.give(stuff.factory(**item), quantity)
+        if op == 'equip':
+            name, = args
+            entry = self.inventory.get(name)
+            return self.equip(entry['item'] if entry else None)
+        if op in self.journaled:
+            return getattr(self, op)(*args)
+
+        raise KeyError(f"Bad journal operation {op}")
+
     def is_alive(self):
         """ Checks if this user is dead or alive """
         return self.life.current > 0
@@ -261,28 +291,7 @@ class UserEncoder(json.JSONEncoder):
     """ A custom JSON encoder that understands our user objects """
     def default(self, obj):
         if isinstance(obj, User):
-            # Convert the inventory item objects to kwarg values for later construction
-            inventory = []
-            for entry in obj.inventory:
-                new_entry = entry.copy()
-                new_entry['item'] = entry['item'].__dict__
-                inventory.append(new_entry)
-
-            return {
-                'name'           : obj.name,
-                'level'          : obj.level,
-                'experience'     : obj.experience,
-                'points'         : obj.points,
-                'body_points'    : obj.body._points,
-                'mind_points'    : obj.mind._points,
-                'agility_points' : obj.agility._points,
-                'weapon'         : obj.weapon.__dict__ if obj.weapon else None,
-                'armor'          : obj.armor.__dict__ if obj.armor else None,
-                'accessory'      : obj.accessory.__dict__ if obj.accessory else None,
-                'spells'         : [x.__dict__ for x in obj.spells],
-                'inventory'      : inventory,
-                'gold'           : obj.gold
-            }
+            return obj.to_dict()
 
         else:
             return json.JSONEncoder.default(self, obj)
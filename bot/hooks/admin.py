@@ -13,13 +13,13 @@ class Admin(commands.Cog):
         """ Manage a battle instance """
         # No arguments indicates starting a battle
         if not command:
-            self.api.battle.new(ctx)
+            self.api.battles.get(ctx).new(ctx)
             await ctx.message.add_reaction(u'👍')
         elif command == "start":
-            self.api.battle.start()
+            self.api.battles.current(ctx).start()
             await ctx.message.add_reaction(u'👍')
         elif command == "stop":
-            self.api.battle.stop()
+            self.api.battles.current(ctx).stop()
             await ctx.message.add_reaction(u'👍')
 
         # Bad command
@@ -1,7 +1,6 @@
 """ Battle commands """
 from discord.ext import commands
 from bot.components.logging import log_all
-from bot.components.timer import AsyncEventTimer as Timer
 
 class Battle(commands.Cog):
     """ Battle commands """
@@ -12,7 +11,8 @@ class Battle(commands.Cog):
     @log_all
     async def list(self, ctx):
         """ List battle participants """
-        if self.api.battle.is_stopped:
+        battle = self.api.battles.current(ctx)
+        if battle.is_stopped:
             out = self.api.logger.entry()
             out.color("warn")
             out.title(f"No active battle")
@@ -23,23 +23,58 @@ class Battle(commands.Cog):
             return
 
         # Seperate the living and the dead
-        dead_list = self.api.battle.death_order
-        alive_list = list(set(self.api.battle.participants).symmetric_difference(set(dead_list)))
+        dead_list = battle.death_order
+        alive_list = list(battle.participants.alive)
 
         # Output
         out = self.api.logger.entry()
-        out.title(f"Battle participants ({len(self.api.battle.participants)})")
+        out.title(f"Battle participants ({len(battle.participants)})")
         out.field("Alive", ", ".join(alive_list) if alive_list else "None")
         out.field("Dead", ", ".join(dead_list) if dead_list else "None")
         out.buffer(ctx.channel)
         await self.api.logger.send_buffer()
         await ctx.message.add_reaction(u'👍')
 
+    @commands.command()
+    @log_all
+    async def odds(self, ctx, first=None, second=None):
+        """ Estimate who would win between two characters, or everyone still alive in the battle """
+        if first is None:
+            battle = self.api.battles.find(ctx)
+            if battle is None or battle.is_stopped or len(battle.participants.alive) < 2:
+                out = self.api.logger.entry()
+                out.color("warn")
+                out.title("No active battle")
+                out.desc("There's no battle to work out the odds for. Try `!odds <name> <name>` instead")
+                out.buffer(ctx.author)
+                await self.api.logger.send_buffer()
+                await ctx.message.add_reaction(u'❌')
+                return
+            users, result = await self.api.odds.battle(battle)
+            title = "Battle odds"
+        else:
+            users, result = await self.api.odds.matchup(first, second or ctx.author.name)
+            title = f"{users[0].name} vs {users[1].name}"
+
+        # Only the favourites fit in a single message
+        ranked = sorted(zip(users, result.chances), key=lambda x: -x[1])
+        out = self.api.logger.entry()
+        out.title(title)
+        out.desc(f"Based on {result.trials:,} simulated battles where everyone attacks")
+        for user, chance in ranked[:10]:
+            out.field(user.name, f"{chance:.1%}", inline=True)
+        if len(ranked) > 10:
+            out.field("Everyone else", f"{sum(x[1] for x in ranked[10:]):.1%}")
+        out.buffer(ctx.channel)
+        await self.api.logger.send_buffer()
+        await ctx.message.add_reaction(u'👍')
+
     @commands.command()
     @log_all
     async def join(self, ctx):
         """ Join an active battle that's waiting for participants """
-        if not self.api.battle.is_joinable:
+        battle = self.api.battles.current(ctx)
+        if not battle.is_joinable:
             log = self.api.logger.entry()
             log.color("warn")
             log.title("There is no battle ready to join")
@@ -50,7 +85,7 @@ class Battle(commands.Cog):
             return
 
         user = self.api.character.get(ctx.author.name)
-        self.api.battle.join(user)
+        battle.join(user)
         await ctx.message.add_reaction(u'👍')
         await self.api.logger.send_buffer()
 
@@ -58,7 +93,8 @@ class Battle(commands.Cog):
     @log_all
     async def attack(self, ctx, target_name):
         """ Attack a target while in battle """
-        if not self.api.battle.is_round_wait:
+        battle = self.api.battles.current(ctx)
+        if not battle.is_round_wait:
             log = self.api.logger.entry()
             log.color("warn")
             log.title("There is no battle round waiting for turn actions")
@@ -71,7 +107,7 @@ class Battle(commands.Cog):
         source = self.api.character.get(ctx.author.name)
         target = self.api.character.get(target_name)
 
-        self.api.battle.submit_action(source, 'attack', target=target)
+        battle.submit_action(source, 'attack', target=target)
         await ctx.message.add_reaction(u'👍')
         await self.api.logger.send_buffer()
 
@@ -79,7 +115,8 @@ class Battle(commands.Cog):
     @log_all
     async def defend(self, ctx):
         """ Defend for the round while in battle """
-        if not self.api.battle.is_round_wait:
+        battle = self.api.battles.current(ctx)
+        if not battle.is_round_wait:
             log = self.api.logger.entry()
             log.color("warn")
             log.title("There is no battle round waiting for turn actions")
@@ -90,7 +127,7 @@ class Battle(commands.Cog):
             return
 
         source = self.api.character.get(ctx.author.name)
-        self.api.battle.submit_action(source, 'defend')
+        battle.submit_action(source, 'defend')
         await ctx.message.add_reaction(u'👍')
         await self.api.logger.send_buffer()
 
@@ -128,17 +165,33 @@ class Battle(commands.Cog):
         await ctx.message.add_reaction(u'❌')
 
     @commands.Cog.listener()
-    @log_all
-    async def on_join_timeout(self, ctx):
+    async def on_join_timeout(self, key, battle_id=None):
         """ Handles a battle timing out while waiting for participants """
-        count = len(self.api.battle.participants)
+        # The battle may have been stopped or replaced since the timer started
+        battle = self.api.battles.by_key(key, battle_id)
+        if battle is None or not battle.is_joinable:
+            return
+        await self.join_timed_out(battle.ctx, battle)
+
+    @commands.Cog.listener()
+    async def on_round_timeout(self, key, battle_id=None):
+        """ Handles a battle round timing out while waiting for actions """
+        battle = self.api.battles.by_key(key, battle_id)
+        if battle is None or not battle.is_round_wait:
+            return
+        await self.round_timed_out(battle.ctx, battle)
+
+    @log_all
+    async def join_timed_out(self, ctx, battle):
+        """ Start the battle when enough participants joined in time, otherwise stop it """
+        count = len(battle.participants)
         log = self.api.logger.entry()
         if not count >= 2:
             log.color("error")
             log.title("Battle timed out")
             log.desc("Not enough participants joined the battle in the required time")
             log.buffer(ctx.channel)
-            self.api.battle.stop()
+            battle.stop()
             await self.api.logger.send_buffer()
             return
 
@@ -146,41 +199,35 @@ class Battle(commands.Cog):
         log.title("Battle timed out")
         log.desc(f"The window to join the battle has ended, the battle will now begin with {count} participants")
         log.buffer(ctx.channel)
-        self.api.battle.start()
+        battle.start()
         await self.api.logger.send_buffer()
 
-    @commands.Cog.listener()
     @log_all
-    async def on_round_timeout(self, ctx):
+    async def round_timed_out(self, ctx, battle):
         """ Remind users to give battle commands, force actions after a set amount of reminders """
         # After 3 reminders, the 4th reminder will force all defend actions
-        self.api.battle.action_reminder_loop += 1
-        count = len(self.api.battle.unsubmitted_participants)
-        log = self.api.logger.entry()
-        if self.api.battle.action_reminder_loop >= 4:
+        battle.action_reminder_loop += 1
+        count = len(battle.unsubmitted_participants)
+        if battle.action_reminder_loop >= 4:
+            # Reset the reminder before the next round is checkpointed
+            battle.action_reminder_loop = 0
+
             # Make everyone defend
-            self.api.battle._defend_all()
+            battle._defend_all()
 
             # Report the issue
+            log = self.api.logger.entry()
             log.color("error")
             log.title("Round timed out")
             log.desc(f"{count} participants will be forced to defend for the turn")
             log.buffer(ctx.channel)
             await self.api.logger.send_buffer()
-
-            # Reset the reminder
-            self.api.battle.action_reminder_loop = 0
             return
 
-        log.color("warn")
-        log.title("Waiting for participants")
-        desc = f"The following {count} participants still haven't submitted an action for the round.\n"
-        desc += "If no actions are submitted they will be forced to defend.\n\n"
-        desc += ', '.join([f"**{x}**" for x in self.api.battle.unsubmitted_participants])
-        log.desc(desc)
-        log.buffer(ctx.channel)
-        await self.api.logger.send_buffer()
+        # Reminders update the battles status message instead of posting a new one
+        battle.announce_round_wait()
 
         # Restart the timer
-        self.api.battle.timer = self.api.timer_factory("round_timeout", self.api.battle.action_reminder_timeout, args=(ctx,))
-        self.api.battle.timer.start()
+        battle.start_timer("round_timeout", battle.action_reminder_timeout)
+        if self.api.checkpoints:
+            self.api.checkpoints.track(battle)
@@ -0,0 +1,84 @@
+""" Re-runs recorded battles offline to confirm their results
+
+    python -m bot.replay data/replays/*.replay
+    python -m bot.replay --verbose disputed.replay
+"""
+import sys
+import argparse
+from bot import sim
+from bot.components.replay import Replay
+
+
+def run(record, arena=None):
+    """ Re-run a decoded replay at full speed, returning the finished battle """
+    battle = sim.SimBattle(arena or sim.Arena())
+    battle.batch_threshold = 1 if record.batch else 0
+    battle.new(sim.Context(), seed=record.seed)
+
+    participants = record.create_users()
+    for user in participants:
+        battle.join(user)
+    battle.start()
+
+    for number, actions in enumerate(record.rounds, 1):
+        for name, source, target in actions:
+            if not battle.is_round_wait:
+                raise ValueError(f"The battle ended before round {number} finished")
+            kwargs = {'target': participants[target]} if target is not None else {}
+            battle.submit_action(participants[source], name, **kwargs)
+
+    if battle.replay is None:
+        raise ValueError("The battle never finished")
+    return battle
+
+
+def verify(raw, arena=None):
+    """ Does re-running the replay give exactly the same battle? Older replay versions are compared decoded """
+    record = Replay.decode(raw)
+    return Replay.decode(run(record, arena).replay) == record
+
+
+def main(argv=None):
+    """ Command line entry point """
+    parser = argparse.ArgumentParser(prog="python -m bot.replay", description=__doc__.splitlines()[0].strip())
+    parser.add_argument('files', nargs='+', help="Replay files to check")
+    parser.add_argument('--verbose', action='store_true', help="Show how each battle played out")
+    args = parser.parse_args(argv)
+
+    arena = sim.Arena()
+    failed = 0
+    for filename in args.files:
+        with open(filename, 'rb') as file:
+            raw = file.read()
+        record = Replay.decode(raw)
+
+        try:
+            battle = run(record, arena)
+            ok = Replay.decode(battle.replay) == record
+        except ValueError as error:
+            battle = None
+            ok = False
+            print(f"{filename}: {error}")
+
+        failed += not ok
+        print(f"{filename}: {'ok' if ok else 'MISMATCH'}, seed {record.seed:016x}, "
+              f"{len(record.participants)} participants, {len(record.rounds)} rounds")
+
+        if args.verbose:
+            names = record.names
+            recorded = [names[x] for x in record.death_order]
+            print(f"  recorded deaths  {', '.join(recorded) or 'none'}")
+            if battle is not None:
+                replayed = Replay.decode(battle.replay)
+                print(f"  replayed deaths  {', '.join(names[x] for x in replayed.death_order) or 'none'}")
+                dealt = {}
+                for name, damage in battle.hits:
+                    dealt[name] = dealt.get(name, 0) + damage
+                for name in names:
+                    print(f"  {name:<32} {dealt.get(name, 0):>8} damage dealt")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,6 +3,7 @@ import os
 import discord
 from discord.ext import commands
 import bot.components.logging
+import bot.components.sender
 import bot.components.timer
 import bot.hooks
 import bot.api
@@ -12,7 +13,10 @@ class BotService():
     def __init__(self):
         # Discord components
         self.client = commands.Bot(command_prefix='!', intents=discord.Intents.all())
-        self.logger = bot.components.logging.DiscordLogger()
+        self.logger = bot.components.logging.DiscordLogger(bot.components.sender.SendPipeline(
+            rate=float(os.getenv('SEND_RATE', 50)),
+            route_rate=float(os.getenv('SEND_ROUTE_RATE', 1.0)),
+            route_burst=int(os.getenv('SEND_ROUTE_BURST', 5))))
 
         # API instance to handle discord calls and logic
         self.api = bot.api.API(self.client, self.logger)
@@ -26,18 +30,49 @@ class BotService():
 
         # Manually connect event listeners
         self.client.event(self.on_ready)
+        self.flusher = None
+        self.checkpointer = None
+        self.restored = False
 
     def start(self, token):
         """ Start the bot service """
         if not token:
             raise TypeError("Token can not be None")
 
-        self.client.run(token, bot=True)
+        try:
+            self.client.run(token, bot=True)
+        finally:
+            # Never lose write-behind changes or battle checkpoints on shutdown
+            self.api.character.close()
+            self.api.battles.close()
+            self.api.odds.close()
+            if self.api.checkpoints:
+                self.api.checkpoints.close()
+            if self.api.timers.store:
+                self.api.timers.store.close()
 
     async def on_ready(self):
         """ Triggers when the bot is ready """
         print("Connected!")
 
+        # Start the write-behind flusher once, on_ready fires again on reconnects
+        if self.api.character.flush_interval and self.flusher is None:
+            self.flusher = self.client.loop.create_task(self.api.character.flush_loop())
+
+        # Dirty battles are snapshotted on their own interval
+        if self.api.checkpoints and self.api.checkpoints.interval and self.checkpointer is None:
+            self.checkpointer = self.client.loop.create_task(self.api.checkpoints.flush_loop())
+
         # Create new characters for all members who don't have one
         all_members = [x.name for x in self.client.get_all_members()]
         self.api.character.create_missing(all_members)
+
+        # Resume timers and battles interrupted by a restart once, in the channels they were running in
+        # Overdue timers fire together on the first tick, once the battles they belong to are back
+        if not self.restored:
+            self.restored = True
+            if self.api.timers.store:
+                loaded, overdue = self.api.timers.reload()
+                print(f"Reloaded {loaded} scheduled events, {overdue} overdue")
+            self.api.battles.restore(self.client.get_channel, self.client.get_user)
+            await self.logger.send_buffer()
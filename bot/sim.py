@@ -0,0 +1,391 @@
+""" Headless battle simulator for balancing weapons and stats
+
+    Runs seeded battles through the real battle rules without discord, spread over a process pool.
+    Battles are streamed out as JSON lines or CSV rows as each chunk finishes, and the win rates,
+    damage distributions and round counts are summarized at the end.
+
+    python -m bot.sim --battles 1000000 --output results.jsonl
+    python -m bot.sim --size 4 --loadout "steel axe:body=3" --loadout "wood sword:agility=5" --output results.csv
+"""
+import os
+import sys
+import csv
+import json
+import random
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import bot.api.battle
+import bot.api.shop
+from bot.components import users, stuff, logging, timer
+
+UNARMED = "unarmed"
+STATS = ('body', 'mind', 'agility')
+
+
+class Context():
+    """ Battles only need a context to know where to log """
+    channel = None
+    author = None
+
+
+class Arena():
+    """ Stands in for the bot API, battles run against the null logger and timer and nothing is saved """
+    def __init__(self):
+        self.logger = logging.NullLogger()
+        self.timer_factory = timer.TimerFactory(timer.NullTimer)
+        self.battles = bot.api.battle.BattleManager(self)
+        self.character = self
+        self.checkpoints = None # Simulated battles are never resumed
+        self.timers = None
+
+    # There's no character cache or prizes outside of the bot
+    def pin(self, name):
+        pass
+
+    def unpin(self, name):
+        pass
+
+    def give_gold(self, name, gold):
+        pass
+
+    def give_xp(self, ctx, name, experience):
+        pass
+
+
+class SimBattle(bot.api.battle.BattleAPI):
+    """ Battle that records the damage rolled and how it ended """
+    def __init__(self, parent):
+        super(SimBattle, self).__init__(parent)
+        self.batch_threshold = 0 # Every attack has to be rolled one at a time to be recorded
+        self.replay_path = None
+        self.hits = []
+        self.result = None
+
+    def _damage(self, source, target):
+        damage = super(SimBattle, self)._damage(source, target)
+        self.hits.append((source.name, damage))
+        return damage
+
+    def on_finish(self, draw=False):
+        alive = self.participants.living()
+        self.result = {'rounds': self.round, 'draw': draw, 'placing': alive + self.death_order[::-1]}
+        super(SimBattle, self).on_finish(draw)
+
+
+class Loadout():
+    """ A weapon and the stat points spent on whoever uses it """
+    def __init__(self, weapon=None, **points):
+        self.weapon = weapon # Serialized weapon, so loadouts can be sent to worker processes
+        self.points = {k: v for k, v in points.items() if v}
+        self._item = None
+
+    def __getstate__(self):
+        """ Workers build their own weapon instance """
+        state = dict(self.__dict__)
+        state['_item'] = None
+        return state
+
+    @classmethod
+    def parse(cls, spec, weapons):
+        """ Parse a 'weapon name:body=3,agility=2' spec, using the named weapon from the weapon list """
+        name, _, rest = spec.partition(':')
+        name = name.strip().lower()
+
+        weapon = None
+        if name != UNARMED:
+            match = [x for x in weapons if x.name == name]
+            if not match:
+                raise KeyError(f"There's no weapon named {name}")
+            weapon = match[0].to_dict()
+
+        points = {}
+        for part in filter(None, rest.split(',')):
+            stat, _, value = part.partition('=')
+            stat = stat.strip().lower()
+            if stat not in STATS:
+                raise KeyError(f"Unknown stat {stat}, use one of {', '.join(STATS)}")
+            points[stat] = int(value)
+
+        return cls(weapon, **points)
+
+    @property
+    def label(self):
+        """ Readable name for reports """
+        name = self.weapon['name'] if self.weapon else UNARMED
+        if not self.points:
+            return name
+        return name + ':' + ','.join(f"{k}={v}" for k, v in sorted(self.points.items()))
+
+    def create(self, name):
+        """ Create a fresh character using this loadout """
+        user = users.User.create(name)
+        for stat, points in self.points.items():
+            user.points += points
+            user.upgrade(stat, points)
+        if self.weapon:
+            if self._item is None:
+                self._item = stuff.factory(**self.weapon)
+            user.equip(self._item)
+        return user
+
+
+class Tally():
+    """ Running totals that can be merged across processes """
+    def __init__(self, bucket=10):
+        self.bucket = bucket
+        self.battles = 0
+        self.draws = 0
+        self.rounds = Counter()
+        self.loadouts = {}
+
+    def _loadout(self, label):
+        entry = self.loadouts.get(label)
+        if entry is None:
+            entry = self.loadouts[label] = {
+                'battles': 0, 'wins': 0, 'draws': 0, 'attacks': 0, 'damage': 0, 'histogram': Counter()}
+        return entry
+
+    def add(self, row, hits):
+        """ Count a finished battle, and it's (loadout, damage) hits """
+        self.battles += 1
+        self.draws += row['draw']
+        self.rounds[row['rounds']] += 1
+
+        for label in row['loadouts']:
+            self._loadout(label)['battles'] += 1
+
+        # A draw is shared by the first two to finish
+        if row['draw']:
+            for index in row['placing'][:2]:
+                self._loadout(row['loadouts'][index])['draws'] += 1
+        else:
+            self._loadout(row['loadouts'][row['placing'][0]])['wins'] += 1
+
+        for label, damage in hits:
+            entry = self._loadout(label)
+            entry['attacks'] += 1
+            entry['damage'] += damage
+            entry['histogram'][damage // self.bucket * self.bucket] += 1
+
+    def merge(self, other):
+        """ Add another tally into this one """
+        self.battles += other.battles
+        self.draws += other.draws
+        self.rounds.update(other.rounds)
+        for label, theirs in other.loadouts.items():
+            entry = self._loadout(label)
+            for key in ('battles', 'wins', 'draws', 'attacks', 'damage'):
+                entry[key] += theirs[key]
+            entry['histogram'].update(theirs['histogram'])
+
+    def summary(self):
+        """ Summarized results as a dictionary """
+        loadouts = {}
+        for label, entry in sorted(self.loadouts.items()):
+            loadouts[label] = {
+                'battles'     : entry['battles'],
+                'wins'        : entry['wins'],
+                'draws'       : entry['draws'],
+                'win_rate'    : entry['wins'] / entry['battles'] if entry['battles'] else 0.0,
+                'attacks'     : entry['attacks'],
+                'mean_damage' : entry['damage'] / entry['attacks'] if entry['attacks'] else 0.0,
+                'damage'      : {str(k): v for k, v in sorted(entry['histogram'].items())}
+            }
+
+        return {
+            'battles'  : self.battles,
+            'draws'    : self.draws,
+            'bucket'   : self.bucket,
+            'rounds'   : {str(k): v for k, v in sorted(self.rounds.items())},
+            'loadouts' : loadouts
+        }
+
+
+def fight(arena, loadouts, seed, size=2, defend=0.0, replays=None):
+    """ Run a single seeded battle where everyone attacks a random survivor, or sometimes defends
+
+        Returns the battle row, and the (loadout, damage) of every hit. The battles replay is added
+        to the replays list when given.
+    """
+    rng = random.Random(seed)
+    picks = [loadouts[rng.randrange(len(loadouts))] for _ in range(size)]
+
+    battle = SimBattle(arena)
+    battle.new(Context(), seed=rng.getrandbits(64))
+    for i, loadout in enumerate(picks):
+        battle.join(loadout.create(f"p{i}"))
+    battle.start()
+
+    while battle.is_round_wait:
+        alive = [x for x in battle.turn_order if battle.participants.is_alive(x)]
+        for name in alive:
+            source = battle.participants[name]
+            if rng.random() < defend:
+                battle.submit_action(source, 'defend')
+            else:
+                target = rng.choice([x for x in alive if x != name])
+                battle.submit_action(source, 'attack', target=battle.participants[target])
+
+    if replays is not None:
+        replays.append(battle.replay)
+
+    # Participants are named by their pick index
+    damage = [0] * size
+    hits = []
+    for name, value in battle.hits:
+        index = int(name[1:])
+        damage[index] += value
+        hits.append((picks[index].label, value))
+
+    row = {
+        'seed'     : seed,
+        'rounds'   : battle.result['rounds'],
+        'draw'     : battle.result['draw'],
+        'loadouts' : [x.label for x in picks],
+        'placing'  : [int(x[1:]) for x in battle.result['placing']],
+        'damage'   : damage
+    }
+    return row, hits
+
+
+def run_chunk(loadouts, start, count, size=2, defend=0.0, bucket=10):
+    """ Run the battles seeded start to start + count, returning their rows and a tally """
+    arena = Arena()
+    tally = Tally(bucket)
+    rows = []
+    for seed in range(start, start + count):
+        row, hits = fight(arena, loadouts, seed, size, defend)
+        tally.add(row, hits)
+        rows.append(row)
+    return rows, tally
+
+
+def run(loadouts, battles, size=2, seed=0, workers=None, chunk=1000, defend=0.0, bucket=10, write=None):
+    """ Run battles over a process pool, passing each row to write as chunks finish
+
+        Only a few chunks are queued per worker at a time, so memory stays flat for huge runs.
+        Results only depend on the seed, not the worker count. 0 workers runs everything in process.
+    """
+    tally = Tally(bucket)
+    chunks = ((x, min(chunk, seed + battles - x)) for x in range(seed, seed + battles, chunk))
+    args = (size, defend, bucket)
+
+    def collect(rows, result):
+        tally.merge(result)
+        if write:
+            for row in rows:
+                write(row)
+
+    if workers == 0:
+        for start, count in chunks:
+            collect(*run_chunk(loadouts, start, count, *args))
+        return tally
+
+    with ProcessPoolExecutor(workers) as pool:
+        pending = set()
+        limit = 2 * (workers or os.cpu_count() or 1)
+        for start, count in chunks:
+            pending.add(pool.submit(run_chunk, loadouts, start, count, *args))
+            if len(pending) >= limit:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(*future.result())
+        for future in pending:
+            collect(*future.result())
+
+    return tally
+
+
+class JsonWriter():
+    """ Writes a row per line """
+    def __init__(self, file):
+        self.file = file
+
+    def __call__(self, row):
+        self.file.write(json.dumps(row) + '\n')
+
+
+class CsvWriter():
+    """ Writes a row per battle, joining the per participant lists with ; """
+    columns = ['seed', 'rounds', 'draw', 'loadouts', 'placing', 'damage']
+
+    def __init__(self, file):
+        self.writer = csv.writer(file)
+        self.writer.writerow(self.columns)
+
+    def __call__(self, row):
+        self.writer.writerow([
+            row['seed'], row['rounds'], int(row['draw']),
+            ';'.join(row['loadouts']),
+            ';'.join(str(x) for x in row['placing']),
+            ';'.join(str(x) for x in row['damage'])])
+
+
+def report(summary, out=sys.stdout):
+    """ Print a readable summary """
+    print(f"{summary['battles']} battles, {summary['draws']} draws", file=out)
+    print(f"{'loadout':<32} {'battles':>10} {'win rate':>10} {'attacks':>10} {'mean damage':>12}", file=out)
+    for label, entry in summary['loadouts'].items():
+        print(f"{label:<32} {entry['battles']:>10} {entry['win_rate']:>10.3f} "
+              f"{entry['attacks']:>10} {entry['mean_damage']:>12.1f}", file=out)
+
+    print("rounds", file=out)
+    total = summary['battles'] or 1
+    for rounds, count in summary['rounds'].items():
+        print(f"{rounds:>6} {count:>10} {'#' * max(1, round(50 * count / total)) if count else ''}", file=out)
+
+
+def main(argv=None):
+    """ Command line entry point """
+    parser = argparse.ArgumentParser(prog="python -m bot.sim", description=__doc__.splitlines()[0].strip())
+    parser.add_argument('--battles', type=int, default=10000, help="Number of battles to run")
+    parser.add_argument('--size', type=int, default=2, help="Participants per battle")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the first battle, each battle uses the next")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes, 0 runs in process")
+    parser.add_argument('--chunk', type=int, default=1000, help="Battles per worker task")
+    parser.add_argument('--defend', type=float, default=0.0, help="Chance of defending instead of attacking")
+    parser.add_argument('--bucket', type=int, default=10, help="Damage histogram bucket width")
+    parser.add_argument('--loadout', action='append', default=[],
+                        help="'weapon name:body=N,mind=N,agility=N', defaults to every shop weapon and unarmed")
+    parser.add_argument('--data', default=os.getenv('DATA_PATH', 'data'), help="Item data directory")
+    parser.add_argument('--output', help="Stream every battle to this .jsonl or .csv file")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help="Output format, defaults to the file extension")
+    parser.add_argument('--summary', help="Also write the summary as json to this file")
+    args = parser.parse_args(argv)
+
+    if args.size < 2:
+        parser.error("Battles need at least 2 participants")
+
+    # The shop registers the item catalog
+    os.environ['DATA_PATH'] = args.data
+    shop = bot.api.shop.ShopAPI(Arena())
+    if args.loadout:
+        loadouts = [Loadout.parse(x, shop.weapons) for x in args.loadout]
+    else:
+        loadouts = [Loadout()] + [Loadout(x.to_dict()) for x in shop.weapons]
+
+    file = None
+    write = None
+    if args.output:
+        fmt = args.format or ('csv' if args.output.endswith('.csv') else 'jsonl')
+        file = open(args.output, 'w', newline='')
+        write = CsvWriter(file) if fmt == 'csv' else JsonWriter(file)
+
+    try:
+        tally = run(loadouts, args.battles, args.size, args.seed, args.workers, args.chunk,
+                    args.defend, args.bucket, write)
+    finally:
+        if file:
+            file.close()
+
+    summary = tally.summary()
+    report(summary)
+    if args.summary:
+        with open(args.summary, 'w') as out:
+            json.dump(summary, out, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -61,11 +61,15 @@ def test_start_join_stop(env): # pylint: disable=redefined-outer-name,unused-arg
     env.api.battle.join(user1)
     assert len(env.api.battle.participants) == 2
 
+    # Participants can't be evicted from the character cache mid battle
+    assert env.api.character.cache.pinned == {'user1', 'user2'}
+
     env.api.battle.start()
     assert env.api.battle.is_round_wait
 
     env.api.battle.stop()
     assert env.api.battle.is_stopped
+    assert not env.api.character.cache.pinned
 
 #@pytest.mark.skip(reason="implementing")
 def test_attack_defend(env): # pylint: disable=redefined-outer-name,unused-argument
@@ -97,3 +101,115 @@ def test_attack_defend(env): # pylint: disable=redefined-outer-name,unused-argum
     assert user1.life.current < user1.life.base
 
     env.api.battle.stop()
+
+#@pytest.mark.skip(reason="implementing")
+def test_concurrent_battles(env): # pylint: disable=redefined-outer-name,unused-argument
+    """ Battles in different channels run independently, but users can only be in one """
+    class FakeChannel():
+        def __init__(self, id):
+            self.id = id
+
+    class FakeContext():
+        def __init__(self, id):
+            self.channel = FakeChannel(id)
+            self.author = None
+
+    env.api.character.create("User3")
+    env.api.character.create("User4")
+    ctx1, ctx2 = FakeContext(1), FakeContext(2)
+    battle1 = env.api.battles.get(ctx1)
+    battle2 = env.api.battles.get(ctx2)
+    assert battle1 is not battle2
+    assert env.api.battles.get(ctx1) is battle1
+
+    battle1.new(ctx1)
+    battle2.new(ctx2)
+    battle1.join(env.api.character.get('user1'))
+    battle1.join(env.api.character.get('user2'))
+    battle2.join(env.api.character.get('user3'))
+
+    # Already fighting in the first channel
+    battle2.join(env.api.character.get('user1'))
+    assert 'user1' not in battle2.participants
+    assert env.api.battles.battle_of('user1') is battle1
+
+    battle2.join(env.api.character.get('user4'))
+    battle1.start()
+    battle2.start()
+    assert battle1.is_round_wait and battle2.is_round_wait
+    assert len(env.api.battles) == 2
+
+    # Stale timer events don't touch a different battle
+    assert env.api.battles.find(ctx1, battle2.id) is None
+
+    # Stopping a battle frees the channel and it's participants
+    battle1.stop()
+    assert len(env.api.battles) == 1
+    assert env.api.battles.battle_of('user1') is None
+    assert env.api.battles.find(ctx1) is None
+    assert env.api.battles.get(ctx1) is not battle1
+    assert battle2.is_round_wait
+    battle2.stop()
+
+    # Looking for a battle in a channel without one never creates it
+    for i in range(100):
+        with pytest.raises(bot.api.errors.CommandError):
+            env.api.battles.current(FakeContext(100 + i))
+    assert env.api.battles.current(ctx1).is_stopped
+    env.api.battles.remove(env.api.battles.current(ctx1))
+    assert len(env.api.battles) == 0
+
+#@pytest.mark.skip(reason="implementing")
+def test_checkpoint_restore(env): # pylint: disable=redefined-outer-name,unused-argument
+    """ Battles in progress are resumed by a restarted bot """
+    class FakeUser():
+        id = 42
+        name = 'starter'
+
+    starter = FakeUser()
+    env.ctx.author = starter
+    battle = env.api.battle
+    battle.new(env.ctx)
+    user1 = env.api.character.get('user1')
+    user2 = env.api.character.get('user2')
+    battle.join(user1)
+    battle.join(user2)
+    battle.start()
+    battle.submit_action(user1, 'attack', target=user2)
+    battle.submit_action(user2, 'defend')
+    battle.submit_action(user1, 'attack', target=user2)
+    env.api.checkpoints.flush()
+    env.api.checkpoints.sync()
+    life = user2.life.current
+    due = battle.timer_due
+
+    # Whoever started it can't be messaged if they can't be found
+    unresolved, = bot.api.API().battles.restore(resolve_user={}.get)
+    assert unresolved.ctx.author is None
+
+    # Pretend the bot crashed and came back up
+    api = bot.api.API()
+    restored, = api.battles.restore(resolve_user={starter.id: starter}.get)
+    assert restored.ctx.author is starter
+    assert restored.is_round_wait
+    assert restored.round == 2
+    assert list(restored.participants) == list(battle.participants)
+    assert restored.participants[user2.name].life.current == life
+    assert list(restored.actions) == [user1.name]
+    assert restored.timer_name == 'round_timeout'
+    assert restored.timer_due == pytest.approx(due, abs=1)
+    assert api.battles.battle_of('user1') is restored
+    assert api.character.cache.pinned == {'user1', 'user2'}
+
+    # The restored battle plays out exactly like the original would have
+    battle.submit_action(user2, 'defend')
+    restored.submit_action(restored.participants[user2.name], 'defend')
+    assert restored.round == 3
+    assert restored.participants[user2.name].life.current == user2.life.current
+    assert restored.rng.getstate() == battle.rng.getstate()
+
+    # Stopped battles are forgotten
+    restored.stop()
+    api.checkpoints.sync()
+    assert not api.checkpoints.load_all()
+    battle.stop()
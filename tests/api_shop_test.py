@@ -26,11 +26,11 @@ def env():
             self.api = bot.api.API()
             self.api.character.create("User")
 
-            self.api.shop.create(**self.weapon.__dict__)
-            self.api.shop.create(**self.armor.__dict__)
-            self.api.shop.create(**self.accessory.__dict__)
-            self.api.shop.create(**self.item.__dict__)
-            self.api.shop.create(**self.spell.__dict__)
+            self.api.shop.create(**self.weapon.to_dict())
+            self.api.shop.create(**self.armor.to_dict())
+            self.api.shop.create(**self.accessory.to_dict())
+            self.api.shop.create(**self.item.to_dict())
+            self.api.shop.create(**self.spell.to_dict())
 
     yield Fixture()
 
@@ -0,0 +1,73 @@
+""" Tests the caching components """
+import pytest
+from bot.components.cache import LRUCache
+
+#@pytest.mark.skip(reason="implementing")
+def test_lru():
+    """ Least recently used entries are evicted first """
+    evicted = []
+    cache = LRUCache(3, on_evict=lambda key, value: evicted.append(key))
+    cache['a'] = 1
+    cache['b'] = 2
+    cache['c'] = 3
+    assert cache['a'] == 1 # a is now the most recently used
+    cache['d'] = 4
+    assert evicted == ['b']
+    assert 'b' not in cache
+    assert len(cache) == 3
+
+    with pytest.raises(KeyError):
+        cache['b'] # pylint: disable=pointless-statement
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['evictions'] == 1
+
+#@pytest.mark.skip(reason="implementing")
+def test_peek():
+    """ Peeking isn't a use, it's not counted and doesn't save an entry from eviction """
+    evicted = []
+    cache = LRUCache(2, on_evict=lambda key, value: evicted.append(key))
+    cache['a'] = 1
+    cache['b'] = 2
+    assert cache.peek('a') == 1
+    assert cache.peek('c') is None
+    cache['c'] = 3
+    assert evicted == ['a']
+    assert cache.stats()['hits'] == 0
+    assert cache.stats()['misses'] == 0
+
+#@pytest.mark.skip(reason="implementing")
+def test_pinning():
+    """ Pinned entries are never evicted """
+    evicted = []
+    cache = LRUCache(2, on_evict=lambda key, value: evicted.append(key))
+    cache['a'] = 1
+    cache.pin('a')
+    cache['b'] = 2
+    cache['c'] = 3
+    assert evicted == ['b']
+
+    # Everything pinned lets the cache grow past it's limit until unpinned
+    cache.pin('c')
+    cache.pin('d')
+    cache['d'] = 4
+    assert len(cache) == 3
+    cache['e'] = 5
+    assert evicted == ['b']
+    assert len(cache) == 4
+
+    # The entry just added is never the one evicted
+    cache.unpin('a')
+    assert evicted == ['b', 'a', 'e']
+    assert len(cache) == 2
+
+#@pytest.mark.skip(reason="implementing")
+def test_unbounded():
+    """ A max size of 0 never evicts """
+    cache = LRUCache()
+    for i in range(1000):
+        cache[i] = i
+    assert len(cache) == 1000
+    assert cache.stats()['evictions'] == 0
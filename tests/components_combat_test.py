@@ -0,0 +1,97 @@
+""" Tests the batch combat engine against resolving actions one at a time """
+import os
+import random
+import shutil
+import pytest
+from bot.components import stuff
+import bot.api
+
+pytest.importorskip("numpy")
+
+@pytest.fixture
+def env():
+    """ Configures the environment before and after tests """
+    try:
+        shutil.rmtree('/tmp/discord_bot')
+    except FileNotFoundError:
+        pass
+    os.makedirs('/tmp/discord_bot/test')
+    os.environ["DATA_PATH"] = '/tmp/discord_bot/test'
+
+    yield
+
+    shutil.rmtree('/tmp/discord_bot')
+
+
+class FakeContext():
+    channel = None
+    author = None
+
+
+def run_battle(threshold, seed, count=60, changes=False):
+    """ Runs a battle where everyone randomly attacks or defends, returning every rounds outcome
+
+        With changes, some participants get stronger or pick up a weapon between rounds
+    """
+    rng = random.Random(seed)
+    api = bot.api.API()
+    battle = api.battle
+    battle.batch_threshold = threshold
+
+    # Fixed factor weapons make the damage deterministic, so both engines must agree exactly
+    weapon = stuff.Weapon(name="test blade", desc="You should never see this", type="sword",
+                          power=400, min_factor=1.0, max_factor=1.0, value=10)
+    battle.new(FakeContext())
+    for i in range(count):
+        api.character.create(f"User{i}")
+        user = api.character.get(f"user{i}")
+        user.body.upgrade(rng.randint(1, 5))
+        user.agility.upgrade(rng.randint(1, 9))
+        if rng.random() < 0.7:
+            user.give(weapon)
+            user.equip(weapon)
+        battle.join(user)
+    battle.start()
+
+    history = []
+    while battle.is_round_wait:
+        alive = [x for x in battle.turn_order if x not in battle.death_order]
+        for name in alive:
+            source = battle.participants[name]
+            if rng.random() < 0.2:
+                battle.submit_action(source, 'defend')
+            else:
+                target = rng.choice([x for x in alive if x != name])
+                battle.submit_action(source, 'attack', target=battle.participants[target])
+        history.append((list(battle.death_order), {k: v.life.current for k, v in battle.participants.items()}))
+
+        if changes and battle.is_round_wait:
+            user = battle.participants[rng.choice(battle.turn_order)]
+            user.body.upgrade(rng.randint(1, 5))
+            if not user.weapon:
+                user.give(weapon)
+                user.equip(weapon)
+    return history
+
+
+#@pytest.mark.skip(reason="implementing")
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_matches_scalar(env, seed): # pylint: disable=redefined-outer-name,unused-argument
+    """ The batch engine has the same outcome as resolving one action at a time """
+    scalar = run_battle(0, seed)
+    shutil.rmtree('/tmp/discord_bot/test')
+    os.makedirs('/tmp/discord_bot/test')
+    batch = run_battle(1, seed)
+    assert len(scalar) > 1
+    assert batch == scalar
+
+#@pytest.mark.skip(reason="implementing")
+@pytest.mark.parametrize("seed", [1, 2])
+def test_changes_mid_battle(env, seed): # pylint: disable=redefined-outer-name,unused-argument
+    """ Both engines use the stats and gear participants have in each round """
+    scalar = run_battle(0, seed, changes=True)
+    shutil.rmtree('/tmp/discord_bot/test')
+    os.makedirs('/tmp/discord_bot/test')
+    batch = run_battle(1, seed, changes=True)
+    assert len(scalar) > 1
+    assert batch == scalar
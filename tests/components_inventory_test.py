@@ -0,0 +1,35 @@
+""" Tests the inventory component """
+import pytest
+from bot.components import stuff
+from bot.components.inventory import Inventory
+
+#@pytest.mark.skip(reason="implementing")
+def test_inventory():
+    """ Stacking, removing and ordering inventory entries """
+    sword = stuff.Sword(name="test sword", desc="You should never see this", power=1, value=10)
+    armor = stuff.Armor(name="test armor", desc="You should never see this", toughness=1, value=10)
+    item = stuff.Item(name="test item", desc="You should never see this", value=10)
+
+    inventory = Inventory()
+    inventory.add(sword)
+    inventory.add(armor, 2)
+    inventory.add(item)
+    inventory.add(sword, 4)
+    assert len(inventory) == 3
+    assert [x['item'].name for x in inventory] == ["test sword", "test armor", "test item"]
+    assert inventory.get("test sword")['quantity'] == 5
+    assert inventory[1] == {'item': armor, 'quantity': 2}
+    assert "test item" in inventory
+    assert inventory.get("foobar") is None
+
+    # Can't remove more than you have
+    assert not inventory.remove("test armor", 3)
+    assert not inventory.remove("foobar")
+    assert inventory.remove("test armor", 1)
+    assert inventory.get("test armor")['quantity'] == 1
+
+    # The last one removed drops the entry, re-adding puts it at the end
+    assert inventory.remove("test armor")
+    assert "test armor" not in inventory
+    inventory.add(armor)
+    assert [x['item'].name for x in inventory] == ["test sword", "test item", "test armor"]
@@ -0,0 +1,148 @@
+""" Tests the discord logger """
+import asyncio
+import pytest
+from discord import Embed
+from bot.components.logging import DiscordLogger, pack
+
+
+class Message():
+    """ Sent message that records it's edits """
+    def __init__(self, target):
+        self.target = target
+
+    async def edit(self, embed=None):
+        self.target.edits.append(embed.title)
+
+
+class Target():
+    """ Records each message it's sent as a list of embed titles """
+    def __init__(self, id):
+        self.id = id
+        self.messages = []
+        self.edits = []
+
+    async def send(self, embed=None, embeds=None):
+        self.messages.append([x.title for x in embeds or [embed]])
+        return Message(self)
+
+#@pytest.mark.skip(reason="implementing")
+def test_pack():
+    """ Messages hold up to 10 embeds and 6000 characters, oversized embeds go alone """
+    small = [Embed(title=str(i)) for i in range(25)]
+    assert [len(x) for x in pack(small)] == [10, 10, 5]
+
+    big = [Embed(title='a', description='x' * 2500) for _ in range(5)]
+    assert [len(x) for x in pack(big)] == [2, 2, 1]
+
+    huge = Embed(description='x' * 7000)
+    assert pack([small[0], huge, small[1]]) == [[small[0]], [huge], [small[1]]]
+    assert pack([]) == []
+
+#@pytest.mark.skip(reason="implementing")
+def test_send_buffer():
+    """ Ready entries are grouped by target into as few messages as possible, in the order they were made """
+    channel = Target(1)
+    user = Target(2)
+    logger = DiscordLogger()
+
+    pending = logger.entry()
+    for i in range(12):
+        out = logger.entry()
+        out.title(str(i))
+        out.buffer(channel if i % 3 else user)
+
+    asyncio.run(logger.send_buffer())
+    assert channel.messages == [['1', '2', '4', '5', '7', '8', '10', '11']]
+    assert user.messages == [['0', '3', '6', '9']]
+    assert logger.entries == 12
+    assert logger.messages == 2
+    assert not logger.root.ready
+    assert not pending.ready
+
+#@pytest.mark.skip(reason="implementing")
+def test_single_embed_targets():
+    """ Targets that only send one embed a message get a message an entry """
+    class OldTarget(Target):
+        async def send(self, embed=None):
+            self.messages.append([embed.title])
+            return Message(self)
+
+    channel = OldTarget(1)
+    logger = DiscordLogger()
+    for i in range(3):
+        out = logger.entry()
+        out.title(str(i))
+        out.buffer(channel)
+
+    asyncio.run(logger.send_buffer())
+    assert channel.messages == [['0'], ['1'], ['2']]
+    assert logger.messages == 3
+
+#@pytest.mark.skip(reason="implementing")
+def test_scopes():
+    """ Commands running at the same time only send what they logged themselves """
+    channel = Target(1)
+    logger = DiscordLogger()
+
+    async def command(name, steps):
+        with logger.scope():
+            for i in range(steps):
+                out = logger.entry()
+                out.title(f'{name}{i}')
+                out.buffer(channel)
+                await asyncio.sleep(0)
+            await logger.send_buffer()
+
+    async def run():
+        await asyncio.gather(command('a', 3), command('b', 1))
+
+        # Entries left in a scope move out to the one around it
+        with logger.scope() as scope:
+            out = logger.entry()
+            out.title('left')
+            out.buffer(channel)
+            assert list(scope.ready) == [out]
+        assert list(logger.root.ready) == [out]
+        await logger.send_buffer()
+
+    asyncio.run(run())
+    assert channel.messages == [['b0'], ['a0', 'a1', 'a2'], ['left']]
+    assert not logger.root.ready
+
+#@pytest.mark.skip(reason="implementing")
+def test_live():
+    """ Live messages are sent once, then a burst of updates is one edit, and closing edits straight away """
+    channel = Target(1)
+    logger = DiscordLogger()
+    state = {'count': 0, 'renders': 0}
+
+    def render():
+        state['renders'] += 1
+        out = logger.entry()
+        out.title(str(state['count']))
+        return out
+
+    async def run():
+        status = logger.live(channel, render, 0.05)
+        status.update()
+        await asyncio.sleep(0.01)
+        for _ in range(10):
+            state['count'] += 1
+            status.update()
+        await asyncio.sleep(0.1)
+
+        state['count'] += 1
+        status.update()
+        final = logger.entry()
+        final.title('over')
+        status.close(final)
+        status.update()
+        await asyncio.sleep(0.01)
+        return status
+
+    status = asyncio.run(run())
+    assert channel.messages == [['0']]
+    assert channel.edits == ['10', 'over']
+    assert state['renders'] == 2
+    assert (status.updates, status.sends, status.edits) == (12, 1, 2)
+    assert (logger.live_sends, logger.live_edits) == (1, 2)
@@ -0,0 +1,28 @@
+""" Tests the battle participant registry """
+import pytest
+from bot.components.users import User
+from bot.components.participants import Participants
+
+#@pytest.mark.skip(reason="implementing")
+def test_participants():
+    """ Liveness and who's still to act are kept up to date as the battle goes """
+    participants = Participants()
+    for name in ('a', 'b', 'c', 'd'):
+        participants.add(User.create(name))
+    assert list(participants) == ['a', 'b', 'c', 'd']
+    assert participants.alive == {'a', 'b', 'c', 'd'}
+
+    participants.start_round(['d', 'c', 'b', 'a'])
+    participants.submit('c')
+    assert list(participants.waiting) == ['d', 'b', 'a']
+
+    # The dead stop being waited on, and only die once
+    assert participants.kill('b')
+    assert not participants.kill('b')
+    assert participants.is_dead('b') and not participants.is_alive('b')
+    assert list(participants.waiting) == ['d', 'a']
+    assert participants.death_order == ['b']
+    assert participants.living() == ['a', 'c', 'd']
+
+    participants.start_round(['d', 'c', 'b', 'a'])
+    assert list(participants.waiting) == ['d', 'c', 'a']
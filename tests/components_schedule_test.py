@@ -0,0 +1,82 @@
+""" Tests the scheduled event store """
+import os
+import shutil
+import pytest
+from bot.components.schedule import EventStore
+from bot.components.timer import TimerWheel, WheelTimer, VirtualClock
+
+### FIXTURES ###
+@pytest.fixture
+def env():
+    """ Configures the environment before and after tests """
+    try:
+        shutil.rmtree('/tmp/discord_bot')
+    except FileNotFoundError:
+        pass
+    os.makedirs('/tmp/discord_bot/test')
+
+    class Fixture():
+        filename = '/tmp/discord_bot/test/events.db'
+        clock = VirtualClock(1000.0)
+        fired = []
+
+        def wheel(self, store):
+            return TimerWheel(
+                lambda name, *args: self.fired.append((name, args)), clock=self.clock, wall=self.clock, store=store)
+
+    yield Fixture()
+
+    shutil.rmtree('/tmp/discord_bot')
+
+
+### TESTS ###
+#@pytest.mark.skip(reason="implementing")
+def test_store(env): # pylint: disable=redefined-outer-name
+    """ Events are saved by key and queried by due time """
+    store = EventStore(env.filename)
+    store.save('a', 30.0, 'join_timeout', (1, 2))
+    store.save('b', 10.0, 'round_timeout', (3, 4))
+    store.save('a', 20.0, 'join_timeout', (5, 6))
+    store.save('c', 40.0, 'round_timeout')
+    store.delete('c')
+
+    assert store.load() == [
+        ('b', 10.0, 'round_timeout', [3, 4], {}),
+        ('a', 20.0, 'join_timeout', [5, 6], {})]
+    assert store.count(before=15.0) == 1
+    assert [x[0] for x in store.load(before=15.0)] == ['b']
+    store.close()
+
+#@pytest.mark.skip(reason="implementing")
+def test_reload(env): # pylint: disable=redefined-outer-name
+    """ Keyed timers survive a restart, and the overdue ones fire together """
+    store = EventStore(env.filename)
+    wheel = env.wheel(store)
+    for i in range(100):
+        WheelTimer(wheel, 'round_timeout', 1 + i, (i,), key=f'battle/{i}').start()
+    WheelTimer(wheel, 'unsaved', 5).start()
+
+    # Restarting a keyed timer replaces it, and fired or canceled timers are forgotten
+    WheelTimer(wheel, 'join_timeout', 500, (0,), key='battle/0').start()
+    wheel.find('battle/1').cancel()
+    assert wheel.fast_forward(5) == 4
+    assert env.fired == [('round_timeout', (2,)), ('round_timeout', (3,)), ('round_timeout', (4,)), ('unsaved', ())]
+    store.close()
+
+    # Down for a minute
+    env.clock.advance(60)
+    store = EventStore(env.filename)
+    assert store.count() == 96
+    wheel = env.wheel(store)
+    assert wheel.reload() == (96, 60)
+    assert wheel.find('battle/0').name == 'join_timeout'
+
+    del env.fired[:]
+    assert wheel.fast_forward(0.1) == 60
+    assert env.fired == [('round_timeout', (i,)) for i in range(5, 65)]
+    assert wheel.fast_forward(500) == 36
+    store.close()
+
+    store = EventStore(env.filename)
+    assert not store.count()
+    store.close()
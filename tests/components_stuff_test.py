@@ -44,7 +44,7 @@ def test_sword(environment): # pylint: disable=redefined-outer-name,unused-argum
     filename = os.path.join(os.getenv('DATA_PATH'), 'test_sword.json')
     weapon.save(filename)
     weapon2 = stuff.Sword.load(filename)
-    assert weapon.__dict__ == weapon2.__dict__
+    assert weapon.to_dict() == weapon2.to_dict()
 
 #@pytest.mark.skip(reason="implementing")
 def test_axe(environment):# pylint: disable=redefined-outer-name,unused-argument
@@ -64,7 +64,7 @@ def test_axe(environment):# pylint: disable=redefined-outer-name,unused-argument
     filename = os.path.join(os.getenv('DATA_PATH'), 'test_axe.json')
     weapon.save(filename)
     weapon2 = stuff.Axe.load(filename)
-    assert weapon.__dict__ == weapon2.__dict__
+    assert weapon.to_dict() == weapon2.to_dict()
 
 #@pytest.mark.skip(reason="implementing")
 def test_bow(environment): # pylint: disable=redefined-outer-name,unused-argument
@@ -84,7 +84,7 @@ def test_bow(environment): # pylint: disable=redefined-outer-name,unused-argumen
     filename = os.path.join(os.getenv('DATA_PATH'), 'test_bow.json')
     weapon.save(filename)
     weapon2 = stuff.Bow.load(filename)
-    assert weapon.__dict__ == weapon2.__dict__
+    assert weapon.to_dict() == weapon2.to_dict()
 
 
 #@pytest.mark.skip(reason="implementing")
@@ -104,7 +104,28 @@ def test_armor(environment): # pylint: disable=redefined-outer-name,unused-argum
     filename = os.path.join(os.getenv('DATA_PATH'), 'test_armor.json')
     armor.save(filename)
     armor2 = stuff.Armor.load(filename)
-    assert armor.__dict__ == armor2.__dict__
+    assert armor.to_dict() == armor2.to_dict()
+
+#@pytest.mark.skip(reason="implementing")
+def test_catalog(environment): # pylint: disable=redefined-outer-name,unused-argument
+    """ Catalog items are shared, immutable instances """
+    sword = stuff.register(stuff.Sword(name="catalog sword", desc="A shared sword", power=10, value=5))
+    try:
+        # Rebuilding a catalog item from it's dictionary hands back the shared instance
+        assert stuff.factory(**sword.to_dict()) is sword
+        with pytest.raises(AttributeError):
+            sword.power = 99
+
+        # Modified and unique items are their own instances
+        better = sword.modified(power=20)
+        assert better is not sword
+        assert better.power == 20
+        assert sword.power == 10
+        assert stuff.factory(**better.to_dict()) is not sword
+        better.power = 30
+        assert better.power == 30
+    finally:
+        stuff.CATALOG.pop("catalog sword")
 
 @pytest.mark.skip(reason="implementing")
 def test_accessory(environment): # pylint: disable=redefined-outer-name,unused-argument
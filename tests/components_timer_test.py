@@ -0,0 +1,64 @@
+""" Tests the timer components """
+import asyncio
+import pytest
+from bot.components.timer import TimerWheel, WheelTimer, VirtualClock, TimerFactory
+
+#@pytest.mark.skip(reason="implementing")
+def test_wheel():
+    """ Timers fire once their timeout passes, in the order they were due """
+    fired = []
+    wheel = TimerWheel(lambda name, *args: fired.append((name, args)), clock=VirtualClock(), slots=8)
+    factory = TimerFactory(WheelTimer, wheel)
+
+    late = factory("late", 30, args=(1,))
+    soon = factory("soon", 10, args=(2,))
+    canceled = factory("canceled", 10)
+    for timer in (late, soon, canceled):
+        timer.start()
+    assert len(wheel) == 3
+
+    canceled.cancel()
+    assert not canceled.is_running()
+    with pytest.raises(Exception):
+        canceled.cancel()
+
+    assert wheel.fast_forward(9.9) == 0
+    assert wheel.fast_forward(0.1) == 1
+    assert fired == [("soon", (2,))]
+    assert not soon.is_running()
+    assert late.is_running()
+
+    # Restarting a timer reschedules it from now
+    late.start()
+    assert wheel.fast_forward(25) == 0
+    assert wheel.fast_forward(5) == 1
+    assert fired[-1] == ("late", (1,))
+    assert not len(wheel)
+
+#@pytest.mark.skip(reason="implementing")
+def test_wheel_batch():
+    """ Everything that expires together fires together, even far past a full turn of the wheel """
+    fired = []
+    wheel = TimerWheel(lambda name: fired.append(name), clock=VirtualClock(), slots=8)
+    for i in range(100):
+        WheelTimer(wheel, i, 100 - i).start()
+
+    assert wheel.fast_forward(50) == 50
+    assert fired == list(range(99, 49, -1))
+    assert wheel.fast_forward(1000) == 50
+    assert wheel.fired == 100
+
+#@pytest.mark.skip(reason="implementing")
+def test_wheel_task():
+    """ A single task drives every timer on a real event loop """
+    async def run():
+        fired = []
+        wheel = TimerWheel(lambda name: fired.append(name), asyncio.get_running_loop(), resolution=0.01)
+        for i in range(10):
+            WheelTimer(wheel, i, 0.02).start()
+        await asyncio.sleep(0.1)
+        task = wheel._task # pylint: disable=protected-access
+        task.cancel()
+        return fired
+
+    assert asyncio.run(run()) == list(range(10))
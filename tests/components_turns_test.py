@@ -0,0 +1,26 @@
+""" Tests the battle turn order """
+import pytest
+from bot.components.turns import TurnOrder
+
+#@pytest.mark.skip(reason="implementing")
+def test_turn_order():
+    """ Slowest go first, ties go to whoever joined first """
+    turns = TurnOrder()
+    for name, speed in [('a', 5), ('b', 3), ('c', 5), ('d', 1), ('e', 3)]:
+        turns.add(name, speed)
+    assert turns.order() == ['d', 'b', 'e', 'a', 'c']
+
+    # The same snapshot is reused until something changes
+    order = turns.order()
+    assert turns.order() is order
+
+    turns.remove('e')
+    assert turns.order() == ['d', 'b', 'a', 'c']
+    assert order == ['d', 'b', 'e', 'a', 'c']
+    assert 'e' not in turns and len(turns) == 4
+
+    # Changing speed keeps the original join order for ties
+    turns.update('c', 1)
+    assert turns.order() == ['c', 'd', 'b', 'a']
+    turns.update('d', 5)
+    assert turns.order() == ['c', 'b', 'a', 'd']
@@ -2,7 +2,7 @@
 import os
 import shutil
 import pytest
-from bot.components import users
+from bot.components import users, stuff
 
 @pytest.fixture
 def env():
@@ -90,3 +90,13 @@ def test_level(env):
     assert user.life.base == old_life
     assert user.mana.base == old_mana
     assert user.speed.base == old_speed
+
+def test_compact(env):
+    """ Users, stats and stuff have no per instance dictionary """
+    user = users.User.create("compact")
+    user.give(stuff.Sword(name="compact sword", desc="You should never see this", power=1))
+    for obj in [user, user.body, user.life, user.inventory, user.inventory[0]['item']]:
+        assert not hasattr(obj, '__dict__')
+
+    with pytest.raises(AttributeError):
+        user.foobar = 1